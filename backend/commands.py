@@ -0,0 +1,125 @@
+"""
+运维命令（flask CLI）
+
+用法（在 backend 目录下，FLASK_APP=app.py）：
+    flask search-reindex    重建代码全文索引
+    flask repair-counters   重算分类/标签/代码上的计数列
+    flask db-upgrade        执行未执行的数据库迁移（补列、建索引）
+    flask db-explain        对热点查询执行 EXPLAIN，报告全表扫描
+    flask bench-json        CodeList 一页的 JSON 序列化耗时与压缩后字节数
+    flask blobs-migrate     把内联 base64 图片转存为文件并改写为短 URL
+    flask backup PATH       全量备份为 NDJSON（.zst / .gz 后缀自动压缩）
+    flask restore PATH      从备份恢复到空数据库（可用于 SQLite → MySQL 迁移）
+"""
+import click
+
+from models import db
+
+
+def register_commands(app):
+    """注册所有 CLI 命令"""
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """重建代码全文索引（SQLite FTS5 / MySQL FULLTEXT）"""
+        from utils.search import ensure_search_index, rebuild_search_index
+
+        with db.engine.begin() as connection:
+            ensure_search_index(connection)
+            if connection.dialect.name == 'sqlite':
+                total = rebuild_search_index(connection)
+                click.echo(f'已重建全文索引：{total} 条代码')
+            else:
+                click.echo('全文索引已就绪（由数据库自动维护）')
+
+    @app.cli.command('repair-counters')
+    def repair_counters_command():
+        """以 GROUP BY 重算 code_count / comment_count / favorite_count"""
+        from utils.counters import repair_counters
+
+        for counter, fixed in repair_counters().items():
+            click.echo(f'{counter}: 修正 {fixed} 行')
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """创建缺失的表并执行未执行的迁移（见 utils/migrations.py）"""
+        from utils.migrations import upgrade
+
+        db.create_all()
+        done = upgrade(log=click.echo)
+        click.echo(f'迁移完成：执行 {len(done)} 个版本' if done else '数据库已是最新版本')
+
+    @app.cli.command('db-explain')
+    @click.option('--verbose', '-v', is_flag=True, help='输出每条查询的完整执行计划')
+    def db_explain(verbose):
+        """对热点查询执行 EXPLAIN；存在全表扫描时以退出码 1 结束"""
+        from utils.index_advisor import analyze_hot_queries
+
+        with db.engine.connect() as connection:
+            report = analyze_hot_queries(connection)
+
+        problems = 0
+        for item in report:
+            status = 'FULL SCAN' if item['full_scans'] else ('SORT' if item['sorts'] else 'OK')
+            click.echo(f"[{status}] {item['name']}")
+            for line in (item['plan'] if verbose else item['full_scans'] + item['sorts']):
+                click.echo(f'    {line}')
+            problems += bool(item['full_scans'])
+
+        if problems:
+            click.echo(f'{problems} 条查询仍在全表扫描')
+            raise SystemExit(1)
+
+    @app.cli.command('bench-json')
+    @click.option('--items', default=20, show_default=True, help='每页条数')
+    @click.option('--repeat', default=200, show_default=True, help='重复次数')
+    def bench_json(items, repeat):
+        """CodeList 一页的序列化耗时与传输字节数（见 utils/payload_benchmark.py）"""
+        from utils.payload_benchmark import run_benchmark, sample_code_page
+
+        page = sample_code_page(items)
+        click.echo(f'CodeList {items} 条/页，重复 {repeat} 次')
+        click.echo(f"{'项目':<32}{'耗时(ms)':>10}{'字节':>10}")
+        for name, ms, size in run_benchmark(page, repeat):
+            click.echo(f'{name:<32}{ms:>10.3f}{size:>10}')
+
+    @app.cli.command('blobs-migrate')
+    @click.option('--batch-size', default=50, show_default=True, help='每批读取的行数')
+    @click.option('--dry-run', is_flag=True, help='只统计不提交（图片文件仍会写入存储）')
+    def blobs_migrate(batch_size, dry_run):
+        """把 codes/results 中的 data:image base64 转存到图片存储（见 utils/blob_store.py）"""
+        from utils.blob_store import get_blob_store, migrate_inline_images
+        from utils.cache import invalidate_cache
+
+        stats = migrate_inline_images(get_blob_store(), batch_size=batch_size, dry_run=dry_run, log=click.echo)
+        if stats['images'] and not dry_run:
+            invalidate_cache()
+        click.echo(f"代码 {stats['codes']} 行、结果 {stats['results']} 行，共 {stats['images']} 张图片"
+                   + ('（dry-run，未提交）' if dry_run else ''))
+
+    @app.cli.command('backup')
+    @click.argument('path')
+    @click.option('--chunk-size', default=1000, show_default=True, help='每次从游标读取的行数')
+    def backup_command(path, chunk_size):
+        """把全部业务表流式写入 NDJSON 备份（见 utils/backup.py）"""
+        from utils.backup import BackupError, dump
+
+        try:
+            counts = dump(path, chunk_size=chunk_size, log=click.echo)
+        except BackupError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'备份完成：{sum(counts.values())} 行 → {path}')
+
+    @app.cli.command('restore')
+    @click.argument('path')
+    @click.option('--batch-size', default=1000, show_default=True, help='每批插入的行数')
+    @click.option('--truncate', is_flag=True, help='先清空目标表（默认要求目标表为空）')
+    def restore_command(path, batch_size, truncate):
+        """从 NDJSON 备份恢复（分批 executemany，写入期间关闭外键检查）"""
+        from utils.backup import BackupError, restore
+
+        try:
+            counts = restore(path, batch_size=batch_size, truncate=truncate, log=click.echo)
+        except BackupError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'恢复完成：{sum(counts.values())} 行')
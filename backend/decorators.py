@@ -1,26 +1,17 @@
 from functools import wraps
 from flask import request, jsonify, current_app
-from flask_limiter import RateLimitExceeded
+from utils.rate_limiter import RATE_LIMITS, limiter
 
-def rate_limit(limit_string):
-    """API限流装饰器"""
-    def decorator(f):
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
-            try:
-                limiter = current_app.extensions.get('limiter')
-                if limiter:
-                    # 检查限流
-                    limiter.check()
-                return f(*args, **kwargs)
-            except RateLimitExceeded:
-                return {'message': '请求过于频繁，请稍后再试', 'error': 'rate_limit_exceeded'}, 429
-            except Exception as e:
-                # 限流器异常时不阻断正常请求
-                current_app.logger.warning(f"Rate limiter error: {e}")
-                return f(*args, **kwargs)
-        return decorated_function
-    return decorator
+def rate_limit(limit):
+    """
+    API限流装饰器
+    - limit 为 RATE_LIMITS 中的分级名（auth/upload/search/api）时，同级接口共享一份配额
+    - 也可以直接传入限流字符串，如 "5 per minute"
+    超限时返回 429；限流存储故障时不阻断请求（见 utils/rate_limiter.py）
+    """
+    if limit in RATE_LIMITS:
+        return limiter.shared_limit(RATE_LIMITS[limit], scope=limit, error_message='请求过于频繁，请稍后再试')
+    return limiter.limit(limit, error_message='请求过于频繁，请稍后再试')
 
 def validate_input(schema):
     """输入验证装饰器"""
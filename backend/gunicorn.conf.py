@@ -0,0 +1,17 @@
+"""
+Gunicorn 配置
+supervisord 通过 `gunicorn -c gunicorn.conf.py app:app` 启动，命令行参数可覆盖此处设置。
+"""
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+
+def child_exit(server, worker):
+    # Prometheus 多进程模式：清理已退出 worker 的 live gauge 文件
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
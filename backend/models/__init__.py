@@ -1,7 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from utils.db_routing import RoutingSession
 
-# 创建SQLAlchemy实例
-db = SQLAlchemy()
+# 创建SQLAlchemy实例（配置只读副本时按 utils/db_routing.py 读写分离）
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # 导入所有模型，确保它们被注册
 from .user import User
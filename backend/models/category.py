@@ -7,6 +7,7 @@ class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)  # 分类名称，如单细胞、CNV、WES
     description = db.Column(db.String(200), nullable=True)
+    code_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 代码数（写代码时维护）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -18,6 +19,7 @@ class Category(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
+            'code_count': self.code_count or 0,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
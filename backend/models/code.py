@@ -1,4 +1,6 @@
 from datetime import datetime
+from sqlalchemy import case
+from sqlalchemy.orm import joinedload, load_only, selectinload
 from . import db
 
 class Code(db.Model):
@@ -21,13 +23,91 @@ class Code(db.Model):
     views = db.Column(db.Integer, default=0)
     likes = db.Column(db.Integer, default=0)
     downloads = db.Column(db.Integer, default=0)
+    comment_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 评论数（写评论时维护）
+    favorite_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 收藏数（收藏/取消收藏时维护）
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关系
     results = db.relationship('Result', backref='code', lazy=True, cascade='all, delete-orphan')
     tags = db.relationship('Tag', secondary='code_tags', backref=db.backref('codes', lazy='dynamic'))
+
+    # 与列表查询形状对应的复合索引（已有数据库执行 flask db-upgrade 创建）
+    __table_args__ = (
+        db.Index('idx_codes_status_created', 'status', 'created_at', 'id'),  # 公开列表、审核筛选
+        db.Index('idx_codes_created', 'created_at', 'id'),  # 管理员列表、游标分页
+        db.Index('idx_codes_author_created', 'author_id', 'created_at'),  # 我的代码
+        db.Index('idx_codes_category_created', 'category_id', 'created_at'),  # 按分类筛选
+        db.Index('idx_codes_user_category_created', 'user_category_id', 'created_at'),  # 按用户分类筛选
+        db.Index('idx_codes_language_created', 'language', 'created_at'),  # 按语言筛选
+    )
     
+    # 列表卡片所需的列
+    SUMMARY_COLUMNS = (
+        'id', 'title', 'description', 'language', 'category_id', 'user_category_id',
+        'author_id', 'license', 'status', 'views', 'likes', 'downloads',
+        'comment_count', 'favorite_count', 'created_at', 'updated_at',
+    )
+
+    @classmethod
+    def visible_filter(cls, user_id=None):
+        """
+        非管理员的可见性条件：已审核的代码，登录用户还能看到自己的代码。
+        登录用户写成单个 CASE 而不是 author_id = ? OR status = ?：OR 会被拆成两次索引查找后再排序
+        （SQLite USE TEMP B-TREE / MySQL filesort），CASE 让优化器沿 (created_at, id) 索引顺序扫描，取满一页即停。
+        """
+        if user_id is None:
+            return cls.status == 'approved'
+        return case((cls.author_id == user_id, 1), (cls.status == 'approved', 1), else_=0) == 1
+
+    @classmethod
+    def list_options(cls, summary=False):
+        """
+        列表查询的加载选项。
+        - full：预加载 to_dict 依赖的全部关系
+        - summary：只取卡片需要的列（content/environment 不出库），不加载 results
+        """
+        from .user import User
+
+        if not summary:
+            return (
+                joinedload(cls.category),
+                joinedload(cls.author),
+                selectinload(cls.tags),
+                selectinload(cls.results),
+                selectinload(cls.user_category),
+            )
+        return (
+            load_only(*(getattr(cls, name) for name in cls.SUMMARY_COLUMNS)),
+            joinedload(cls.category),
+            joinedload(cls.author).load_only(User.id, User.username),
+            selectinload(cls.tags),
+        )
+
+    def to_summary_dict(self):
+        """列表卡片序列化：不含 content/environment/results"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'language': self.language,
+            'category_id': self.category_id,
+            'category': self.category.to_dict() if self.category else {'name': '未分类'},
+            'user_category_id': self.user_category_id,
+            'author_id': self.author_id,
+            'author_username': self.author.username if self.author else '未知用户',
+            'license': self.license,
+            'status': self.status,
+            'views': self.views,
+            'likes': self.likes,
+            'downloads': self.downloads,
+            'comment_count': self.comment_count or 0,
+            'favorite_count': self.favorite_count or 0,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'tags': [tag.name for tag in self.tags],
+        }
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -50,6 +130,8 @@ class Code(db.Model):
             'views': self.views,
             'likes': self.likes,
             'downloads': self.downloads,
+            'comment_count': self.comment_count or 0,
+            'favorite_count': self.favorite_count or 0,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'tags': [tag.name for tag in self.tags],
@@ -5,3 +5,6 @@ class CodeTag(db.Model):
     
     code_id = db.Column(db.Integer, db.ForeignKey('codes.id'), primary_key=True)
     tag_id = db.Column(db.Integer, db.ForeignKey('tags.id'), primary_key=True)
+    
+    # 主键 (code_id, tag_id) 覆盖按代码取标签；按标签筛选代码需要反向索引
+    __table_args__ = (db.Index('idx_code_tags_tag', 'tag_id', 'code_id'),)
@@ -11,6 +11,12 @@ class Comment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_comments_code_created', 'code_id', 'created_at', 'id'),  # 评论列表游标分页
+        db.Index('idx_comments_created', 'created_at', 'id'),  # 管理员评论列表
+        db.Index('idx_comments_author', 'author_id', 'created_at'),  # 按作者查评论、删除用户时的外键检查
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
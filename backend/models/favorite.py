@@ -10,7 +10,11 @@ class Favorite(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 联合唯一约束，确保用户不能重复收藏同一代码
-    __table_args__ = (db.UniqueConstraint('user_id', 'code_id', name='_user_code_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'code_id', name='_user_code_uc'),
+        db.Index('idx_favorites_user_created', 'user_id', 'created_at'),  # 收藏列表
+        db.Index('idx_favorites_code', 'code_id'),  # 按代码统计收藏
+    )
     
     def to_dict(self):
         return {
@@ -5,18 +5,21 @@ class Result(db.Model):
     __tablename__ = 'results'
     
     id = db.Column(db.Integer, primary_key=True)
-    code_id = db.Column(db.Integer, db.ForeignKey('codes.id'), nullable=False)
+    code_id = db.Column(db.Integer, db.ForeignKey('codes.id'), nullable=False, index=True)
     type = db.Column(db.String(20), nullable=False)  # image, text, chart, table
     content = db.Column(db.Text, nullable=False)  # 结果内容，图片URL、文本或图表数据
     description = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
+        # 图片结果附带尺寸变体 URL（thumb/detail，见 utils/image_variants.py）；按命名规则计算，不访问文件系统
+        from utils.image_variants import variant_urls
         return {
             'id': self.id,
             'code_id': self.code_id,
             'type': self.type,
             'content': self.content,
             'description': self.description,
+            'variants': variant_urls(self.content) if self.type == 'image' else None,
             'created_at': self.created_at.isoformat()
         }
@@ -7,6 +7,7 @@ class Tag(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)  # 标签名称，如#单细胞分析 #CNV检测
     description = db.Column(db.String(200), nullable=True)
+    code_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 使用该标签的代码数
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -14,5 +15,6 @@ class Tag(db.Model):
             'id': self.id,
             'name': self.name,
             'description': self.description,
+            'code_count': self.code_count or 0,
             'created_at': self.created_at.isoformat()
         }
@@ -15,6 +15,10 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_users_role_active', 'role', 'is_active'),  # 按角色/状态筛选用户
+    )
+
     # 关系
     codes = db.relationship('Code', foreign_keys='Code.author_id', backref='author', lazy=True)
     reviewed_codes = db.relationship('Code', foreign_keys='Code.reviewed_by', backref='reviewer', lazy=True)
@@ -9,6 +9,7 @@ class UserCategory(db.Model):
     description = db.Column(db.String(200), nullable=True)  # 分类描述
     color = db.Column(db.String(20), default='#409EFF')  # 分类颜色标识
     sort_order = db.Column(db.Integer, default=0)  # 排序顺序
+    code_count = db.Column(db.Integer, default=0, nullable=False, server_default='0')  # 分类下的代码数（写代码时维护）
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # 所属用户
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -19,6 +20,7 @@ class UserCategory(db.Model):
     # 唯一约束：同一用户下的分类名称不能重复
     __table_args__ = (
         db.UniqueConstraint('user_id', 'name', name='uq_user_category_name'),
+        db.Index('idx_user_categories_user_sort', 'user_id', 'sort_order'),  # 分类列表排序
     )
     
     def to_dict(self):
@@ -29,7 +31,7 @@ class UserCategory(db.Model):
             'color': self.color,
             'sort_order': self.sort_order,
             'user_id': self.user_id,
-            'code_count': len(self.codes) if self.codes else 0,
+            'code_count': self.code_count or 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -1,36 +1,39 @@
 from datetime import datetime
 
 from flask import current_app, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
 from sqlalchemy import or_
-from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm import joinedload
 
 from models import db
 from models.code import Code
 from models.comment import Comment
 from models.user import User
+from utils.cache import invalidate_code, invalidate_tags
+from utils.counters import adjust_counter
+from utils.identity import current_user_id, invalidate_user_role, is_admin
+from utils.pagination import add_pagination_arguments, paginate_query
+from utils.query_budget import query_budget
 
 
-def _require_admin() -> User:
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    if not user or user.role != 'admin':
+def _require_admin():
+    """当前用户为管理员时返回其 ID，否则返回 None（角色来自令牌声明/角色缓存，不查库）"""
+    if not is_admin():
         return None
-    return user
+    return current_user_id()
 
 
 class AdminUsers(Resource):
     method_decorators = [jwt_required()]
 
     def get(self):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         parser = reqparse.RequestParser()
-        parser.add_argument('page', type=int, default=1, location='args')
-        parser.add_argument('per_page', type=int, default=20, location='args')
+        add_pagination_arguments(parser, default_per_page=20)
         parser.add_argument('keyword', type=str, location='args')
         args = parser.parse_args()
 
@@ -39,15 +42,11 @@ class AdminUsers(Resource):
             pattern = f"%{args['keyword']}%"
             query = query.filter(or_(User.username.like(pattern), User.email.like(pattern)))
 
-        pagination = query.order_by(User.created_at.desc()).paginate(
-            page=args['page'], per_page=args['per_page'], error_out=False
-        )
+        items, meta = paginate_query(query, User, args)
 
         return {
-            'users': [u.to_dict() for u in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page,
+            'users': [u.to_dict() for u in items],
+            **meta,
         }, 200
 
 
@@ -55,8 +54,8 @@ class AdminUserDetail(Resource):
     method_decorators = [jwt_required()]
 
     def patch(self, user_id: int):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         user = User.query.get(user_id)
@@ -77,6 +76,9 @@ class AdminUserDetail(Resource):
 
         try:
             db.session.commit()
+            # 角色变化会影响该用户可见的列表与权限判断
+            invalidate_tags(f"user:{user.id}")
+            invalidate_user_role(user.id)
             return {'message': 'Updated', 'user': user.to_dict()}, 200
         except Exception:
             db.session.rollback()
@@ -87,24 +89,21 @@ class AdminUserDetail(Resource):
 class AdminCodes(Resource):
     method_decorators = [jwt_required()]
 
+    @query_budget(7)
     def get(self):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         parser = reqparse.RequestParser()
-        parser.add_argument('page', type=int, default=1, location='args')
-        parser.add_argument('per_page', type=int, default=20, location='args')
+        add_pagination_arguments(parser, default_per_page=20)
         parser.add_argument('keyword', type=str, location='args')
         parser.add_argument('status', type=str, location='args')
+        parser.add_argument('fields', type=str, default='full', choices=('full', 'summary'), location='args')
         args = parser.parse_args()
 
-        query = Code.query.options(
-            joinedload(Code.category),
-            joinedload(Code.author),
-            selectinload(Code.tags),
-            selectinload(Code.results),
-        )
+        summary = args['fields'] == 'summary'
+        query = Code.query.options(*Code.list_options(summary=summary))
 
         if args['keyword']:
             pattern = f"%{args['keyword']}%"
@@ -113,15 +112,11 @@ class AdminCodes(Resource):
         if args['status']:
             query = query.filter(Code.status == args['status'])
 
-        pagination = query.order_by(Code.created_at.desc()).paginate(
-            page=args['page'], per_page=args['per_page'], error_out=False
-        )
+        items, meta = paginate_query(query, Code, args)
 
         return {
-            'codes': [c.to_dict() for c in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page,
+            'codes': [c.to_summary_dict() if summary else c.to_dict() for c in items],
+            **meta,
         }, 200
 
 
@@ -129,8 +124,8 @@ class AdminCodeReview(Resource):
     method_decorators = [jwt_required()]
 
     def patch(self, code_id: int):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         code = Code.query.get(code_id)
@@ -154,11 +149,12 @@ class AdminCodeReview(Resource):
             code.status = 'disabled'
             code.review_reason = reason or ''
 
-        code.reviewed_by = admin.id
+        code.reviewed_by = admin_id
         code.reviewed_at = datetime.utcnow()
 
         try:
             db.session.commit()
+            invalidate_code(code)
             return {'message': 'Updated', 'code': code.to_dict()}, 200
         except Exception:
             db.session.rollback()
@@ -170,30 +166,25 @@ class AdminComments(Resource):
     method_decorators = [jwt_required()]
 
     def get(self):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         parser = reqparse.RequestParser()
-        parser.add_argument('page', type=int, default=1, location='args')
-        parser.add_argument('per_page', type=int, default=20, location='args')
+        add_pagination_arguments(parser, default_per_page=20)
         parser.add_argument('keyword', type=str, location='args')
         args = parser.parse_args()
 
-        query = Comment.query
+        query = Comment.query.options(joinedload(Comment.author).load_only(User.id, User.username))
         if args['keyword']:
             pattern = f"%{args['keyword']}%"
             query = query.filter(Comment.content.like(pattern))
 
-        pagination = query.order_by(Comment.created_at.desc()).paginate(
-            page=args['page'], per_page=args['per_page'], error_out=False
-        )
+        items, meta = paginate_query(query, Comment, args)
 
         return {
-            'comments': [c.to_dict() for c in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page,
+            'comments': [c.to_dict() for c in items],
+            **meta,
         }, 200
 
 
@@ -201,8 +192,8 @@ class AdminCommentDetail(Resource):
     method_decorators = [jwt_required()]
 
     def delete(self, comment_id: int):
-        admin = _require_admin()
-        if not admin:
+        admin_id = _require_admin()
+        if not admin_id:
             return {'message': 'Permission denied'}, 403
 
         comment = Comment.query.get(comment_id)
@@ -211,7 +202,9 @@ class AdminCommentDetail(Resource):
 
         try:
             db.session.delete(comment)
+            adjust_counter(Code, comment.code_id, 'comment_count', -1)
             db.session.commit()
+            invalidate_tags(f"code:{comment.code_id}")
             return {'message': 'Deleted'}, 200
         except Exception:
             db.session.rollback()
@@ -0,0 +1,92 @@
+import os
+
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required
+from flask import current_app, request, send_file
+from decorators import rate_limit
+from utils.blob_store import CONTENT_TYPES, BlobError, blob_mimetype, blob_url, get_blob_store
+from utils.image_variants import ensure_variant, schedule_variants
+from utils.rate_limiter import limiter
+
+#############################
+# Blob API（图片）
+#
+# 该文件提供图片上传与下载：
+# - 上传图片（需要登录），返回 /api/blobs/<sha256>.<ext> 短 URL
+# - 下载图片（公开），包括尺寸变体 <sha256>.<thumb|detail>.<webp|jpg>
+#
+# 关键点：
+# - 内容寻址：文件名即 SHA-256，同一图片只存一份，URL 对应的内容永不改变
+# - 缓存：Cache-Control: public, max-age=1年, immutable
+# - 配置 BLOB_ACCEL_REDIRECT 时由 nginx 通过 X-Accel-Redirect 直接发送文件（支持 Range），
+#   worker 不读文件；未配置时由 send_file 发送（同样支持 Range / If-None-Match）
+# - 变体：上传后即在进程池中后台生成；首次访问时若仍不存在则等待生成（同一文件只生成一次）
+#############################
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+
+class BlobUpload(Resource):
+    #############################
+    # POST /api/uploads/images
+    #
+    # 上传图片：multipart/form-data，字段名 image。
+    # 返回 {url, name, size, content_type}；类型按文件头识别（PNG/JPEG/GIF/WebP）。
+    #############################
+    @rate_limit('upload')
+    @jwt_required()
+    def post(self):
+        file = request.files.get('image')
+        if file is None:
+            return {'message': 'image is required'}, 400
+
+        store = get_blob_store()
+        data = file.read(store.max_size + 1)
+        try:
+            name, _ = store.put(data)
+        except BlobError as e:
+            return {'message': str(e)}, 400
+        except OSError:
+            current_app.logger.exception('Failed to store image')
+            return {'message': 'Internal server error'}, 500
+
+        schedule_variants(store, name, logger=current_app.logger)
+        ext = name.rsplit('.', 1)[1]
+        return {
+            'url': blob_url(name),
+            'name': name,
+            'size': len(data),
+            'content_type': CONTENT_TYPES[ext],
+        }, 201
+
+
+class BlobFile(Resource):
+    #############################
+    # GET /api/blobs/<name>
+    #
+    # 下载图片。图片加载频繁，不计入默认限流配额。
+    #############################
+    decorators = [limiter.exempt]
+
+    def get(self, name):
+        store = get_blob_store()
+        mimetype = blob_mimetype(name)
+        if mimetype is None:
+            return {'message': 'Image not found'}, 404
+        if not os.path.exists(store.path_for(name)) and ensure_variant(store, name) is None:
+            return {'message': 'Image not found'}, 404
+
+        accel_prefix = current_app.config.get('BLOB_ACCEL_REDIRECT')
+        if accel_prefix:
+            response = current_app.response_class(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + store.relative_path(name).replace('\\', '/')
+        else:
+            response = send_file(
+                store.path_for(name),
+                mimetype=mimetype,
+                conditional=True,
+                etag=name.split('.')[0],
+            )
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
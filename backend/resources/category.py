@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required
 from flask import current_app
 from models.category import Category
 from models import db
+from utils.cache import CATEGORY_ALL_TAG, invalidate_tags
+from utils.db_routing import replica_read
 
 #############################
 # Category API
@@ -22,6 +24,7 @@ class CategoryList(Resource):
     #
     # 获取分类列表。
     #############################
+    @replica_read
     def get(self):
         # 获取分类列表
         categories = Category.query.all()
@@ -61,6 +64,7 @@ class CategoryDetail(Resource):
     #
     # 获取分类详情。
     #############################
+    @replica_read
     def get(self, category_id):
         # 获取分类详情
         category = Category.query.get(category_id)
@@ -92,6 +96,8 @@ class CategoryDetail(Resource):
         
         try:
             db.session.commit()
+            # 列表中的代码带有分类名称
+            invalidate_tags(f"category:{category_id}", CATEGORY_ALL_TAG)
             return category.to_dict(), 200
         except Exception as e:
             db.session.rollback()
@@ -113,6 +119,7 @@ class CategoryDetail(Resource):
         try:
             db.session.delete(category)
             db.session.commit()
+            invalidate_tags(f"category:{category_id}", CATEGORY_ALL_TAG)
             return {'message': 'Category deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
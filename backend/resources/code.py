@@ -1,14 +1,32 @@
+import json
+import os
+
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
-from flask import request, current_app
-from sqlalchemy import or_
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from flask import Response, request, current_app, stream_with_context
+from sqlalchemy import select, update
 from sqlalchemy.orm import joinedload, selectinload
 from models.code import Code
 from models.result import Result
 from models.tag import Tag
-from models.user import User
 from models import db
-from utils.cache import cached_response, CACHE_TTL, invalidate_cache
+from decorators import rate_limit
+from utils.cache import cached_response, CACHE_TTL, CATEGORY_ALL_TAG, invalidate_code, invalidate_tags
+from utils.search import search_codes
+from utils.pagination import add_pagination_arguments, is_cursor_mode, paginate_query
+from utils.view_counter import get_view_counter
+from utils.tags import resolve_tags
+from utils.query_budget import query_budget
+from utils.counters import code_counter_keys, update_code_counters
+from utils.identity import current_user_id, is_admin
+from utils.db_routing import replica_read
+from utils.blob_store import BLOB_NAME_RE, BLOB_URL_PREFIX, externalize_data_urls, get_blob_store
+from utils.image_variants import schedule_variants
+from utils.code_export import CodeArchive
+from utils.bulk_ingest import ingest_codes
+from schemas.validation import normalize_language
+from utils.conditional import conditional_list, is_not_modified, make_etag, not_modified, validator_headers
 
 #############################
 # Code API
@@ -16,7 +34,7 @@ from utils.cache import cached_response, CACHE_TTL, invalidate_cache
 # 该文件提供“代码分享”相关接口：
 # - 代码列表：分页、筛选、搜索
 # - 代码创建：绑定作者、写入标签与结果
-# - 代码详情：读取并自增浏览量
+# - 代码详情：读取并记录浏览量（缓冲后批量写回）
 # - 代码更新/删除：仅作者可操作
 #
 # 关键点：
@@ -24,120 +42,119 @@ from utils.cache import cached_response, CACHE_TTL, invalidate_cache
 # - 安全：写接口要求 JWT；更新/删除校验 author_id 防止越权；异常仅记录日志不回传细节
 #############################
 
+def _code_list_tags(data, kwargs):
+    """列表页缓存的依赖标签：页内每条代码及其作者 + 所筛选的分类/标签"""
+    tags = set()
+    for code in data.get('codes', []):
+        tags.add(f"code:{code['id']}")
+        tags.add(f"user:{code['author_id']}")
+    category_id = request.args.get('category_id')
+    tags.add(f"category:{category_id}" if category_id else CATEGORY_ALL_TAG)
+    if request.args.get('tag'):
+        # 标签改名/删除后，按旧名、新名筛选的列表都要失效
+        tags.add(f"tag:{request.args['tag']}")
+    return tags
+
+def _externalize_images(text):
+    """内联 base64 图片转存为文件，文本中只保留短 URL"""
+    return externalize_data_urls(text, get_blob_store())[0]
+
+def _schedule_image_variants(results):
+    """图片结果提交后台生成缩略图/详情图变体（见 utils/image_variants.py）"""
+    store = get_blob_store()
+    for result in results:
+        content = result.content or ''
+        name = content[len(BLOB_URL_PREFIX):]
+        if result.type == 'image' and content.startswith(BLOB_URL_PREFIX) and BLOB_NAME_RE.match(name):
+            schedule_variants(store, name, logger=current_app.logger)
+
+def _add_filter_arguments(parser):
+    """列表与导出共用的筛选参数"""
+    parser.add_argument('keyword', type=str, location='args', help='Search keyword')
+    parser.add_argument('language', type=str, location='args', help='Programming language')
+    parser.add_argument('category_id', type=int, location='args', help='Category ID')
+    parser.add_argument('user_category_id', type=int, location='args', help='User Category ID')
+    parser.add_argument('tag', type=str, location='args', help='Tag name')
+
+def _filter_codes(query, args, user_id, order_by_relevance=False):
+    """可见性（非管理员只能看到已审核或自己的代码）与筛选条件"""
+    if not is_admin():
+        query = query.filter(Code.visible_filter(user_id))
+    
+    if args['keyword']:
+        # 全文检索：SQLite FTS5 / MySQL FULLTEXT(ngram)，不可用时回退 LIKE
+        query = search_codes(query, args['keyword'], order_by_relevance=order_by_relevance)
+    
+    if args['language']:
+        query = query.filter_by(language=normalize_language(args['language']) or args['language'])
+    
+    if args['category_id']:
+        query = query.filter_by(category_id=args['category_id'])
+    
+    if args['user_category_id']:
+        query = query.filter_by(user_category_id=args['user_category_id'])
+    
+    if args['tag']:
+        # tag 筛选需要 join 多对多关系
+        query = query.join(Code.tags).filter(Tag.name == args['tag'])
+    
+    return query
+
 class CodeList(Resource):
     #############################
     # GET /api/codes
     #
     # 代码列表接口：支持分页与筛选。
-    # - page/per_page：分页参数
-    # - keyword：标题/描述模糊搜索
+    # - page/per_page：分页参数；cursor=（可选）启用游标分页，with_total=1 时附带 total
+    # - keyword：标题/描述全文检索（见 utils/search.py）
+    # - sort：latest（默认，按发布时间）/ relevance（按相关度，需配合 keyword）
     # - language/category_id/tag：筛选条件
+    # - fields：full（默认，完整数据）/ summary（列表卡片，不含 content/environment/results）
     #
     # 性能说明：
     # - 使用预加载，避免序列化时产生大量额外 SQL
+    # - 响应按 code:<id>/category:<id>/user:<id> 打标签缓存，写接口按标签精确失效
+    # - 配置只读副本时查询发往副本（见 utils/db_routing.py）
+    # - ETag 由列表版本号生成，If-None-Match 命中时直接返回 304（见 utils/conditional.py）
     #############################
-    @cached_response(ttl=CACHE_TTL['MEDIUM'], key_prefix="code_list")
+    @rate_limit('search')
+    @conditional_list('code_list', ttl=CACHE_TTL['MEDIUM'], items_key='codes')
+    @cached_response(ttl=CACHE_TTL['MEDIUM'], key_prefix="code_list", tags=_code_list_tags)
+    @replica_read
+    @query_budget(6)
     def get(self):
         # 获取代码列表，支持筛选和分页
         parser = reqparse.RequestParser()
-        parser.add_argument('page', type=int, default=1, location='args', help='Page number')
-        parser.add_argument('per_page', type=int, default=10, location='args', help='Items per page')
-        parser.add_argument('keyword', type=str, location='args', help='Search keyword')
-        parser.add_argument('language', type=str, location='args', help='Programming language')
-        parser.add_argument('category_id', type=int, location='args', help='Category ID')
-        parser.add_argument('user_category_id', type=int, location='args', help='User Category ID')
-        parser.add_argument('tag', type=str, location='args', help='Tag name')
+        add_pagination_arguments(parser, default_per_page=10)
+        _add_filter_arguments(parser)
+        parser.add_argument('sort', type=str, default='latest', choices=('latest', 'relevance'), location='args', help='Sort order')
+        parser.add_argument('fields', type=str, default='full', choices=('full', 'summary'), location='args', help='Serialization mode')
         args = parser.parse_args()
 
-        user_id = None
-        is_admin = False
-        try:
-            verify_jwt_in_request(optional=True)
-            user_id = get_jwt_identity()
-        except Exception:
-            user_id = None
-
-        if user_id is not None:
-            user = User.query.get(user_id)
-            is_admin = bool(user and user.role == 'admin')
+        # 游标分页依赖 (created_at, id) 排序，不能与相关度排序同时使用
+        if is_cursor_mode(args) and args['sort'] == 'relevance':
+            return {'message': 'cursor pagination requires sort=latest'}, 400
+
+        # 身份在请求内只解析一次（见 utils/identity.py），管理员判断不查库
+        user_id = current_user_id()
         
         # 构建查询
         # 预加载关联：category/author 使用 joinedload；tags/results 使用 selectinload
-        query = Code.query.options(
-            joinedload(Code.category),
-            joinedload(Code.author),
-            selectinload(Code.tags),
-            selectinload(Code.results),
-        )
+        # fields=summary 时只取卡片所需列，content/environment/results 不出库
+        summary = args['fields'] == 'summary'
+        query = Code.query.options(*Code.list_options(summary=summary))
 
-        if not is_admin:
-            if user_id is None:
-                query = query.filter(or_(Code.status == 'approved', Code.status.is_(None)))
-            else:
-                query = query.filter(
-                    or_(
-                        Code.author_id == user_id,
-                        Code.status == 'approved',
-                        Code.status.is_(None),
-                    )
-                )
-        
-        if args['keyword']:
-            # 优化搜索：使用多种搜索策略
-            keyword = args['keyword'].strip()
-            if len(keyword) >= 2:  # 避免过短关键词
-                # 1. 精确匹配优先级最高
-                exact_condition = or_(
-                    Code.title == keyword,
-                    Code.description.contains(keyword)
-                )
-                
-                # 2. 前缀匹配
-                prefix_condition = or_(
-                    Code.title.like(f"{keyword}%"),
-                    Code.description.like(f"{keyword}%")
-                )
-                
-                # 3. 包含匹配（原LIKE逻辑）
-                contains_condition = or_(
-                    Code.title.like(f"%{keyword}%"),
-                    Code.description.like(f"%{keyword}%")
-                )
-                
-                # 组合查询条件，按优先级排序
-                query = query.filter(or_(exact_condition, prefix_condition, contains_condition))
-            else:
-                # 短关键词只做精确匹配
-                query = query.filter(
-                    or_(
-                        Code.title.contains(keyword),
-                        Code.description.contains(keyword)
-                    )
-                )
-        
-        if args['language']:
-            query = query.filter_by(language=args['language'])
-        
-        if args['category_id']:
-            query = query.filter_by(category_id=args['category_id'])
-        
-        if args['user_category_id']:
-            query = query.filter_by(user_category_id=args['user_category_id'])
-        
-        if args['tag']:
-            # tag 筛选需要 join 多对多关系
-            query = query.join(Code.tags).filter(Tag.name == args['tag'])
-        
-        # 分页
-        pagination = query.order_by(Code.created_at.desc()).paginate(page=args['page'], per_page=args['per_page'], error_out=False)
+        query = _filter_codes(query, args, user_id, order_by_relevance=args['sort'] == 'relevance')
+
+        # 分页：默认页码模式；传入 cursor= 时使用 keyset 游标分页（不执行 COUNT）
+        codes, meta = paginate_query(query, Code, args)
         
         return {
-            'codes': [code.to_dict() for code in pagination.items],
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': pagination.page
+            'codes': [code.to_summary_dict() if summary else code.to_dict() for code in codes],
+            **meta
         }, 200
     
+    @rate_limit('upload')
     @jwt_required()
     def post(self):
         #############################
@@ -150,6 +167,8 @@ class CodeList(Resource):
         # 注意：
         # - tags/results 是在同一事务中写入
         # - 异常时回滚事务并记录日志
+        # - content/结果中内联的 base64 图片存入图片存储，替换为 /api/blobs/ 短 URL
+        # - 图片结果提交后在进程池中后台生成 thumb/detail 变体
         #############################
         # 创建新代码 - 直接从 JSON 获取数据
         data = request.get_json()
@@ -159,33 +178,30 @@ class CodeList(Resource):
         for field in required_fields:
             if not data.get(field):
                 return {'message': f'{field} is required'}, 400
+        # 语言名不区分大小写，与批量导入（CodeCreateSchema）同一规则
+        language = normalize_language(data['language'])
+        if language is None:
+            return {'message': 'language is not supported'}, 400
         
         # 获取当前用户ID
-        current_user_id = get_jwt_identity()
+        user_id = current_user_id()
         
         # 创建代码
         code = Code(
             title=data['title'],
             description=data['description'],
-            content=data['content'],
-            language=data['language'],
+            content=_externalize_images(data['content']),
+            language=language,
             category_id=data['category_id'],
             user_category_id=data.get('user_category_id'),  # 用户自定义分类（可选）
-            author_id=current_user_id,
+            author_id=user_id,
             environment=data.get('environment', ''),
             license=data.get('license', 'MIT'),
             status='pending',
         )
         
-        # 添加标签
-        tags = data.get('tags', [])
-        for tag_name in tags:
-            # 标签不存在则创建（后续可考虑：统一小写/去空格/限制长度）
-            tag = Tag.query.filter_by(name=tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.session.add(tag)
-            code.tags.append(tag)
+        # 添加标签：一次 IN 查询 + 批量 upsert 解析全部标签（见 utils/tags.py）
+        code.tags = resolve_tags(data.get('tags', []))
         
         # 添加结果
         results = data.get('results', [])
@@ -194,63 +210,201 @@ class CodeList(Resource):
             result = Result(
                 code=code,
                 type=result_data.get('type', 'text'),
-                content=result_data.get('content', ''),
+                content=_externalize_images(result_data.get('content', '')),
                 description=result_data.get('description', '')
             )
             db.session.add(result)
         
         try:
             db.session.add(code)
+            update_code_counters(after=code_counter_keys(code))
             db.session.commit()
+            invalidate_code(code)
+            _schedule_image_variants(code.results)
             return code.to_dict(), 201
         except Exception as e:
             db.session.rollback()
             current_app.logger.exception('Failed to create code')
             return {'message': 'Internal server error'}, 500
 
+BULK_MAX_ITEMS = int(os.getenv('CODES_BULK_MAX_ITEMS', 1000))
+BULK_CHUNK_SIZE = int(os.getenv('CODES_BULK_CHUNK_SIZE', 200))
+
+def _read_bulk_items():
+    """JSON 数组，或 NDJSON（application/x-ndjson，每行一条）；无法解析的行记为 None"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonlines'):
+        items = []
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    data = request.get_json(silent=True)
+    return data if isinstance(data, list) else None
+
+class CodeBulk(Resource):
+    #############################
+    # POST /api/codes/bulk
+    #
+    # 批量发布代码（流程引擎一次提交数百条）。
+    # - 入参：JSON 数组，或 NDJSON（Content-Type: application/x-ndjson）；每条字段同 CodeCreateSchema
+    # - 单次最多 CODES_BULK_MAX_ITEMS 条（默认 1000）
+    # - 返回逐条状态 items: [{index, status: created, id} | {index, status: error, errors}]；
+    #   全部成功 201，部分成功 207，全部失败 400
+    #
+    # 性能说明：
+    # - 标签一次解析；codes/results/code_tags 以 Core executemany 分批写入（见 utils/bulk_ingest.py）
+    # - 每 CODES_BULK_CHUNK_SIZE 条（默认 200）一个事务，计数列按批合并更新
+    #############################
+    @rate_limit('upload')
+    @jwt_required()
+    def post(self):
+        items = _read_bulk_items()
+        if not items:
+            return {'message': 'a non-empty JSON array or NDJSON body is required'}, 400
+        if len(items) > BULK_MAX_ITEMS:
+            return {'message': f'at most {BULK_MAX_ITEMS} codes per request'}, 413
+
+        user_id = current_user_id()
+        statuses, image_results = ingest_codes(items, user_id, chunk_size=BULK_CHUNK_SIZE, logger=current_app.logger)
+
+        created = [status for status in statuses if status['status'] == 'created']
+        if created:
+            invalidate_tags(
+                CATEGORY_ALL_TAG,
+                f'user:{user_id}',
+                *{f"category:{items[status['index']]['category_id']}" for status in created},
+            )
+            _schedule_image_variants(image_results)
+
+        if len(created) == len(statuses):
+            code = 201
+        elif created:
+            code = 207
+        else:
+            code = 400
+        return {'created': len(created), 'failed': len(statuses) - len(created), 'items': statuses}, code
+
+EXPORT_BATCH_SIZE = 100
+
+class CodeExport(Resource):
+    #############################
+    # GET /api/codes/export
+    #
+    # 批量导出为 ZIP：ids=1,2,3 指定代码，或使用与 GET /api/codes 相同的筛选参数
+    # （keyword/language/category_id/user_category_id/tag），两者可同时使用。
+    # 可见性与列表一致：非管理员只能导出已审核或自己的代码。
+    #
+    # 性能说明：
+    # - 查询以 yield_per 分批读取，ZIP 逐条生成并流式返回（见 utils/code_export.py），
+    #   内存占用与导出数量无关
+    # - 全部写出后用一条 UPDATE 为本次导出的代码累加 downloads
+    #############################
+    @rate_limit('export')
+    def get(self):
+        parser = reqparse.RequestParser()
+        parser.add_argument('ids', type=str, location='args', help='Comma separated code IDs')
+        _add_filter_arguments(parser)
+        args = parser.parse_args()
+
+        query = Code.query.options(*Code.list_options())
+        if args['ids']:
+            try:
+                ids = {int(value) for value in args['ids'].split(',') if value.strip()}
+            except ValueError:
+                return {'message': 'ids must be comma separated integers'}, 400
+            query = query.filter(Code.id.in_(ids))
+
+        query = _filter_codes(query, args, current_user_id()).order_by(Code.id)
+        archive = CodeArchive(store=get_blob_store())
+
+        def generate():
+            yield from archive.iter_bytes(query.yield_per(EXPORT_BATCH_SIZE))
+            if archive.exported_ids:
+                db.session.execute(
+                    update(Code)
+                    .where(Code.id.in_(archive.exported_ids))
+                    # 下载不是内容修改：保留 updated_at（下载数已参与详情 ETag）
+                    .values(downloads=Code.downloads + 1, updated_at=Code.updated_at)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+
+        filename = f"codes_export_{datetime.utcnow().strftime('%Y%m%d')}.zip"
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-store',
+                # nginx 不缓冲，边生成边发送
+                'X-Accel-Buffering': 'no',
+            },
+        )
+
+def _detail_etag(code):
+    """详情 ETag：updated_at + 响应中的计数列（计数 UPDATE 保留 updated_at，需单独参与）"""
+    return make_etag('code', code.id, code.updated_at.isoformat(), code.comment_count, code.favorite_count, code.downloads)
+
 class CodeDetail(Resource):
     #############################
     # GET /api/codes/<code_id>
     #
-    # 获取代码详情，并在同一请求中自增浏览量。
+    # 获取代码详情，并记录一次浏览。
     # 性能：预加载序列化所需关系
-    # 注意：高并发下 views 自增可能产生写竞争（后续可改为原子更新或异步计数）
+    # 注意：浏览量先写入缓冲，定时/达到阈值时合并为一条 UPDATE，读请求不再持有写锁
+    # 条件请求：先只查 updated_at 与计数列，ETag 未变化时返回 304，不加载关系、不序列化
     #############################
+    @replica_read
+    @query_budget(7)
     def get(self, code_id):
         # 获取代码详情
+        row = db.session.execute(
+            select(
+                Code.id, Code.status, Code.author_id, Code.updated_at,
+                Code.comment_count, Code.favorite_count, Code.downloads,
+            ).where(Code.id == code_id)
+        ).first()
+        if not row:
+            return {'message': 'Code not found'}, 404
+
+        # 身份在请求内只解析一次（见 utils/identity.py），管理员判断不查库
+        user_id = current_user_id()
+
+        if not is_admin():
+            if row.status != 'approved':
+                if user_id is None or row.author_id != user_id:
+                    return {'message': 'Code not found'}, 404
+
+        # 增加浏览量：写入缓冲，由后台批量合并写回（见 utils/view_counter.py）。
+        # 只在全部查询完成后记录：副本故障时 @replica_read 会在主库上重新执行整个方法
+        view_counter = get_view_counter()
+
+        etag = _detail_etag(row)
+        # 计数变化不体现在 updated_at 中，只按 ETag 判断（不使用 If-Modified-Since）
+        if is_not_modified(etag):
+            view_counter.record(row.id)
+            return not_modified(etag, row.updated_at)
+
         code = Code.query.options(
             joinedload(Code.category),
             joinedload(Code.author),
             selectinload(Code.tags),
             selectinload(Code.results),
+            selectinload(Code.user_category),
         ).get(code_id)
         if not code:
             return {'message': 'Code not found'}, 404
-
-        user_id = None
-        is_admin = False
-        try:
-            verify_jwt_in_request(optional=True)
-            user_id = get_jwt_identity()
-        except Exception:
-            user_id = None
-
-        if user_id is not None:
-            user = User.query.get(user_id)
-            is_admin = bool(user and user.role == 'admin')
-
-        if not is_admin:
-            is_approved = (code.status == 'approved') or (code.status is None)
-            if not is_approved:
-                if user_id is None or code.author_id != user_id:
-                    return {'message': 'Code not found'}, 404
-        
-        # 增加浏览量
-        code.views += 1
-        db.session.commit()
         
-        return code.to_dict(), 200
+        data = code.to_dict()
+        view_counter.record(code.id)
+        data['views'] = (code.views or 0) + view_counter.pending_for(code.id)
+        return data, 200, validator_headers(_detail_etag(code), code.updated_at)
     
+    @rate_limit('upload')
     @jwt_required()
     def put(self, code_id):
         #############################
@@ -266,8 +420,8 @@ class CodeDetail(Resource):
             return {'message': 'Code not found'}, 404
         
         # 检查权限
-        current_user_id = get_jwt_identity()
-        if code.author_id != current_user_id:
+        user_id = current_user_id()
+        if code.author_id != user_id:
             return {'message': 'Permission denied'}, 403
         
         parser = reqparse.RequestParser()
@@ -278,8 +432,14 @@ class CodeDetail(Resource):
         parser.add_argument('category_id', type=int, help='Category ID')
         parser.add_argument('environment', type=str, help='Environment configuration')
         parser.add_argument('license', type=str, help='License')
-        parser.add_argument('tags', type=list, help='Tags list')
+        parser.add_argument('tags', type=str, action='append', help='Tags list')
         args = parser.parse_args()
+        language = normalize_language(args['language']) if args['language'] else None
+        if args['language'] and language is None:
+            return {'message': 'language is not supported'}, 400
+        
+        old_category_id = code.category_id
+        before = code_counter_keys(code)
         
         # 更新字段
         if args['title']:
@@ -287,9 +447,9 @@ class CodeDetail(Resource):
         if args['description']:
             code.description = args['description']
         if args['content']:
-            code.content = args['content']
-        if args['language']:
-            code.language = args['language']
+            code.content = _externalize_images(args['content'])
+        if language:
+            code.language = language
         if args['category_id']:
             code.category_id = args['category_id']
         if args['environment']:
@@ -299,16 +459,15 @@ class CodeDetail(Resource):
         
         # 更新标签
         if args['tags']:
-            code.tags.clear()
-            for tag_name in args['tags']:
-                tag = Tag.query.filter_by(name=tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.session.add(tag)
-                code.tags.append(tag)
+            code.tags = resolve_tags(args['tags'])
+
+        # 只改标签时 codes 行本身没有变化，显式刷新 updated_at（详情 ETag 依赖它）
+        code.updated_at = datetime.utcnow()
         
         try:
+            update_code_counters(before, code_counter_keys(code))
             db.session.commit()
+            invalidate_code(code, f"category:{old_category_id}")
             return code.to_dict(), 200
         except Exception as e:
             db.session.rollback()
@@ -328,13 +487,15 @@ class CodeDetail(Resource):
             return {'message': 'Code not found'}, 404
         
         # 检查权限
-        current_user_id = get_jwt_identity()
-        if code.author_id != current_user_id:
+        user_id = current_user_id()
+        if code.author_id != user_id:
             return {'message': 'Permission denied'}, 403
         
         try:
+            update_code_counters(before=code_counter_keys(code))
             db.session.delete(code)
             db.session.commit()
+            invalidate_code(code)
             return {'message': 'Code deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
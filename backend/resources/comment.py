@@ -1,8 +1,18 @@
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask import current_app
+from sqlalchemy.orm import joinedload
 from models.comment import Comment
+from models.code import Code
+from models.user import User
 from models import db
+from decorators import rate_limit
+from utils.cache import invalidate_tags
+from utils.counters import adjust_counter
+from utils.identity import current_user_id
+from utils.pagination import add_pagination_arguments, paginate_query
+from utils.query_budget import query_budget
+from utils.db_routing import replica_read
 
 #############################
 # Comment API
@@ -16,19 +26,43 @@ from models import db
 # - 权限：写接口均要求 JWT
 # - 越权防护：更新/删除时校验 comment.author_id
 # - 安全：异常仅记录日志，不回传内部错误信息
+# - 性能：列表按 (created_at, id) 游标分页，作者随评论一次 JOIN 取回；
+#   总数来自 codes.comment_count（创建/删除评论时在同一事务内维护），不执行 COUNT(*)
 #############################
 
 class CommentList(Resource):
     #############################
     # GET /api/codes/<code_id>/comments
     #
-    # 获取指定 code 的评论列表（按时间倒序）。
+    # 获取指定 code 的评论列表（按时间倒序，游标分页）。
+    # - per_page：每页条数（默认 50，上限 100）
+    # - cursor：上一页响应头 X-Next-Cursor 的值；不传则返回第一页
+    # 响应体仍为评论数组；X-Total-Count 为评论总数，X-Next-Cursor 为空表示没有更多。
     #############################
+    @replica_read
+    @query_budget(2)
     def get(self, code_id):
-        # 获取代码的所有评论
-        comments = Comment.query.filter_by(code_id=code_id).order_by(Comment.created_at.desc()).all()
-        return [comment.to_dict() for comment in comments], 200
+        parser = reqparse.RequestParser()
+        add_pagination_arguments(parser, default_per_page=50)
+        args = parser.parse_args()
+        args['cursor'] = args['cursor'] or ''
+        args['with_total'] = False
+
+        total = db.session.query(Code.comment_count).filter(Code.id == code_id).scalar()
+        if total is None:
+            return {'message': 'Code not found'}, 404
+
+        query = Comment.query.filter_by(code_id=code_id).options(
+            joinedload(Comment.author).load_only(User.id, User.username)
+        )
+        comments, meta = paginate_query(query, Comment, args)
+        headers = {
+            'X-Total-Count': str(total),
+            'X-Next-Cursor': meta['next_cursor'] or '',
+        }
+        return [comment.to_dict() for comment in comments], 200, headers
     
+    @rate_limit('api')
     @jwt_required()
     def post(self, code_id):
         #############################
@@ -41,17 +75,22 @@ class CommentList(Resource):
         parser.add_argument('content', type=str, required=True, help='Content is required')
         args = parser.parse_args()
         
-        current_user_id = get_jwt_identity()
+        user_id = current_user_id()
+        if not db.session.query(Code.id).filter(Code.id == code_id).scalar():
+            return {'message': 'Code not found'}, 404
         
         comment = Comment(
             content=args['content'],
-            author_id=current_user_id,
+            author_id=user_id,
             code_id=code_id
         )
         
         try:
             db.session.add(comment)
+            adjust_counter(Code, code_id, 'comment_count', 1)
             db.session.commit()
+            # 列表卡片显示评论数
+            invalidate_tags(f"code:{code_id}")
             return comment.to_dict(), 201
         except Exception as e:
             db.session.rollback()
@@ -60,6 +99,7 @@ class CommentList(Resource):
             return {'message': 'Internal server error'}, 500
 
 class CommentDetail(Resource):
+    @rate_limit('api')
     @jwt_required()
     def put(self, comment_id):
         #############################
@@ -73,8 +113,8 @@ class CommentDetail(Resource):
             return {'message': 'Comment not found'}, 404
         
         # 检查权限
-        current_user_id = get_jwt_identity()
-        if comment.author_id != current_user_id:
+        user_id = current_user_id()
+        if comment.author_id != user_id:
             return {'message': 'Permission denied'}, 403
         
         parser = reqparse.RequestParser()
@@ -105,13 +145,15 @@ class CommentDetail(Resource):
             return {'message': 'Comment not found'}, 404
         
         # 检查权限
-        current_user_id = get_jwt_identity()
-        if comment.author_id != current_user_id:
+        user_id = current_user_id()
+        if comment.author_id != user_id:
             return {'message': 'Permission denied'}, 403
         
         try:
             db.session.delete(comment)
+            adjust_counter(Code, comment.code_id, 'comment_count', -1)
             db.session.commit()
+            invalidate_tags(f"code:{comment.code_id}")
             return {'message': 'Comment deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
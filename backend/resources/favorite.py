@@ -1,10 +1,14 @@
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import current_app
-from sqlalchemy.orm import joinedload, selectinload
+from flask_jwt_extended import jwt_required
+from flask import current_app, request
 from models.favorite import Favorite
 from models.code import Code
 from models import db
+from decorators import rate_limit
+from utils.cache import invalidate_tags
+from utils.counters import adjust_counter
+from utils.identity import current_user_id
+from utils.query_budget import query_budget
 
 #############################
 # Favorite API
@@ -29,12 +33,15 @@ class FavoriteList(Resource):
     # 性能说明：
     # - 先查 favorites 拿到 code_id 集合
     # - 再用 IN(...) 一次性拉取 codes，并预加载 to_dict 依赖的关系
+    # - fields=summary 时只取卡片字段，不加载 content/environment/results
     #############################
     @jwt_required()
+    @query_budget(6)
     def get(self):
         # 获取当前用户的所有收藏
-        current_user_id = get_jwt_identity()
-        favorites = Favorite.query.filter_by(user_id=current_user_id).all()
+        user_id = current_user_id()
+        summary = request.args.get('fields') == 'summary'
+        favorites = Favorite.query.filter_by(user_id=user_id).all()
 
         # 将 favorites 映射到 code_ids，避免后续循环逐个查 Code（N+1）
         code_ids = [f.code_id for f in favorites]
@@ -42,12 +49,7 @@ class FavoriteList(Resource):
         if code_ids:
             # 预加载关联，避免 Code.to_dict() 中访问关系时触发额外查询
             codes = (
-                Code.query.options(
-                    joinedload(Code.category),
-                    joinedload(Code.author),
-                    selectinload(Code.tags),
-                    selectinload(Code.results),
-                )
+                Code.query.options(*Code.list_options(summary=summary))
                 .filter(Code.id.in_(code_ids))
                 .all()
             )
@@ -57,12 +59,13 @@ class FavoriteList(Resource):
         return [
             {
                 'favorite_id': f.id,
-                'code': codes_by_id[f.code_id].to_dict(),
+                'code': codes_by_id[f.code_id].to_summary_dict() if summary else codes_by_id[f.code_id].to_dict(),
             }
             for f in favorites
             if f.code_id in codes_by_id
         ], 200
     
+    @rate_limit('api')
     @jwt_required()
     def post(self):
         #############################
@@ -77,7 +80,7 @@ class FavoriteList(Resource):
         parser.add_argument('code_id', type=int, required=True, help='Code ID is required')
         args = parser.parse_args()
         
-        current_user_id = get_jwt_identity()
+        user_id = current_user_id()
         
         # 检查代码是否存在
         code = Code.query.get(args['code_id'])
@@ -85,17 +88,20 @@ class FavoriteList(Resource):
             return {'message': 'Code not found'}, 404
         
         # 检查是否已经收藏
-        if Favorite.query.filter_by(user_id=current_user_id, code_id=args['code_id']).first():
+        if Favorite.query.filter_by(user_id=user_id, code_id=args['code_id']).first():
             return {'message': 'Code already favorited'}, 400
         
         favorite = Favorite(
-            user_id=current_user_id,
+            user_id=user_id,
             code_id=args['code_id']
         )
         
         try:
             db.session.add(favorite)
+            adjust_counter(Code, favorite.code_id, 'favorite_count', 1)
             db.session.commit()
+            # 列表卡片显示收藏数
+            invalidate_tags(f"code:{favorite.code_id}")
             return favorite.to_dict(), 201
         except Exception as e:
             db.session.rollback()
@@ -118,13 +124,15 @@ class FavoriteDetail(Resource):
             return {'message': 'Favorite not found'}, 404
         
         # 检查权限
-        current_user_id = get_jwt_identity()
-        if favorite.user_id != current_user_id:
+        user_id = current_user_id()
+        if favorite.user_id != user_id:
             return {'message': 'Permission denied'}, 403
         
         try:
             db.session.delete(favorite)
+            adjust_counter(Code, favorite.code_id, 'favorite_count', -1)
             db.session.commit()
+            invalidate_tags(f"code:{favorite.code_id}")
             return {'message': 'Favorite deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
@@ -1,13 +1,19 @@
 """
 健康检查API资源
-提供应用状态和系统信息
+- /api/health：应用状态、数据库与系统信息（系统信息来自后台采样，不阻塞）
+- /api/health/live：存活探针
+- /api/health/ready：就绪探针（数据库 SELECT 1，带超时）
 """
 from flask import current_app
 from flask_restful import Resource
 from models import db
 from sqlalchemy import text
+from utils.system_sampler import system_sampler
+from utils.db_engine import pool_stats
+from utils.db_routing import get_replicas
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import os
-import psutil
+import threading
 import time
 from datetime import datetime
 
@@ -27,7 +33,14 @@ class HealthCheck(Resource):
             
             # 获取系统信息
             system_info = self._get_system_info()
+
+            # 浏览量缓冲中待写回的增量
+            view_counter = current_app.extensions.get('view_counter')
+            view_counter_stats = view_counter.stats() if view_counter else None
             
+            # 只读副本健康状态（未配置时为 None）
+            replicas = get_replicas()
+
             # 检查响应时间
             response_time = round((time.time() - start_time) * 1000, 2)
             
@@ -37,7 +50,10 @@ class HealthCheck(Resource):
                 'version': '1.0.0',
                 'environment': current_app.config.get('ENV', 'development'),
                 'database': db_status,
+                'database_pool': pool_stats(db.engine),
+                'database_replicas': replicas.stats() if replicas else None,
                 'system': system_info,
+                'view_counter': view_counter_stats,
                 'response_time_ms': response_time
             }, 200
             
@@ -77,28 +93,55 @@ class HealthCheck(Resource):
             }
     
     def _get_system_info(self):
-        """获取系统信息"""
+        """获取系统信息（读取后台采样快照，不阻塞请求线程）"""
+        return system_sampler.snapshot()
+
+
+def _ping_database(app):
+    """在独立线程中执行 SELECT 1（使用连接池中的连接）"""
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+
+# 就绪检查使用单线程执行器：数据库卡住时不会为每次探测新开线程
+_ready_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='health-ready')
+_ready_future = None
+_ready_lock = threading.Lock()
+
+
+class HealthLive(Resource):
+    """存活探针：进程能响应即可，不访问数据库"""
+
+    def get(self):
+        return {'status': 'alive'}, 200
+
+
+class HealthReady(Resource):
+    """就绪探针：连接池 SELECT 1，超时（HEALTH_DB_TIMEOUT 秒）视为未就绪"""
+
+    def get(self):
+        global _ready_future
+        start_time = time.time()
+        timeout = float(os.getenv('HEALTH_DB_TIMEOUT', 2))
+
+        with _ready_lock:
+            # 上一次检查仍未返回，说明数据库仍然卡住，直接判定未就绪
+            if _ready_future is not None and not _ready_future.done():
+                return {'status': 'not_ready', 'database': 'timeout'}, 503
+            _ready_future = _ready_executor.submit(_ping_database, current_app._get_current_object())
+            future = _ready_future
+
         try:
-            # CPU和内存使用率
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            return {
-                'cpu_usage_percent': cpu_percent,
-                'memory': {
-                    'total_mb': round(memory.total / 1024 / 1024, 2),
-                    'available_mb': round(memory.available / 1024 / 1024, 2),
-                    'used_percent': memory.percent
-                },
-                'disk': {
-                    'total_gb': round(disk.total / 1024 / 1024 / 1024, 2),
-                    'free_gb': round(disk.free / 1024 / 1024 / 1024, 2),
-                    'used_percent': round((disk.used / disk.total) * 100, 2)
-                },
-                'uptime_seconds': time.time() - psutil.boot_time()
-            }
-        except Exception:
-            return {
-                'error': 'Unable to retrieve system information'
-            }
+            future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return {'status': 'not_ready', 'database': 'timeout'}, 503
+        except Exception as e:
+            current_app.logger.warning(f"Readiness check failed: {e}")
+            return {'status': 'not_ready', 'database': 'disconnected'}, 503
+
+        return {
+            'status': 'ready',
+            'database': 'connected',
+            'response_time_ms': round((time.time() - start_time) * 1000, 2)
+        }, 200
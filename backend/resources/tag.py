@@ -2,7 +2,11 @@ from flask_restful import Resource, reqparse
 from flask_jwt_extended import jwt_required
 from flask import current_app
 from models.tag import Tag
+from models.code_tag import CodeTag
 from models import db
+from utils.cache import invalidate_tags
+from utils.tags import tag_id_cache
+from utils.db_routing import replica_read
 
 #############################
 # Tag API
@@ -16,12 +20,18 @@ from models import db
 # - 异常仅记录日志，不向客户端泄露内部错误信息
 #############################
 
+def _code_cache_tags(tag_id):
+    """使用该标签的代码对应的缓存标签（列表卡片带有标签名）"""
+    code_ids = db.session.query(CodeTag.code_id).filter(CodeTag.tag_id == tag_id).all()
+    return [f"code:{code_id}" for code_id, in code_ids]
+
 class TagList(Resource):
     #############################
     # GET /api/tags
     #
     # 获取标签列表。
     #############################
+    @replica_read
     def get(self):
         # 获取标签列表
         tags = Tag.query.all()
@@ -61,6 +71,7 @@ class TagDetail(Resource):
     #
     # 获取标签详情。
     #############################
+    @replica_read
     def get(self, tag_id):
         # 获取标签详情
         tag = Tag.query.get(tag_id)
@@ -85,13 +96,17 @@ class TagDetail(Resource):
         parser.add_argument('description', type=str, help='Description')
         args = parser.parse_args()
         
+        old_name = tag.name
         if args['name']:
             tag.name = args['name']
         if args['description']:
             tag.description = args['description']
         
         try:
+            code_tags = _code_cache_tags(tag.id)
             db.session.commit()
+            tag_id_cache.invalidate(old_name, tag.name)
+            invalidate_tags(*code_tags, f"tag:{old_name}", f"tag:{tag.name}")
             return tag.to_dict(), 200
         except Exception as e:
             db.session.rollback()
@@ -111,8 +126,12 @@ class TagDetail(Resource):
             return {'message': 'Tag not found'}, 404
         
         try:
+            tag_name = tag.name
+            code_tags = _code_cache_tags(tag.id)
             db.session.delete(tag)
             db.session.commit()
+            tag_id_cache.invalidate(tag_name)
+            invalidate_tags(*code_tags, f"tag:{tag_name}")
             return {'message': 'Tag deleted successfully'}, 200
         except Exception as e:
             db.session.rollback()
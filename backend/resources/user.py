@@ -7,15 +7,17 @@ FilePath: /代码分享平台/backend/resources/user.py
 Description: 这是默认设置,请设置`customMade`, 打开koroFileHeader查看配置 进行设置: https://github.com/OBKoro1/koro1FileHeader/wiki/%E9%85%8D%E7%BD%AE
 '''
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
+from flask_jwt_extended import jwt_required, create_access_token
 from werkzeug.security import check_password_hash
-from flask import current_app
-from sqlalchemy.orm import joinedload, selectinload
+from flask import current_app, request
 from models.user import User
 from models.code import Code
 from models.favorite import Favorite
 from models import db
-from utils.rate_limiter import RATE_LIMITS
+from decorators import rate_limit
+from utils.cache import invalidate_tags
+from utils.identity import current_user_id
+from utils.query_budget import query_budget
 
 #############################
 # User API
@@ -37,14 +39,10 @@ class UserRegister(Resource):
     # POST /api/register
     #
     # 用户注册：校验 username/email 唯一性后创建用户。
+    # 限流：auth 分级（与登录共享配额）
     #############################
+    @rate_limit('auth')
     def post(self):
-        # 应用限流：注册接口每分钟最多10次
-        from flask import current_app
-        limiter = current_app.extensions.get('limiter')
-        if limiter:
-            limiter.limit(RATE_LIMITS['auth'])(lambda: None)()
-        
         parser = reqparse.RequestParser()
         parser.add_argument('username', type=str, required=True, help='Username is required')
         parser.add_argument('email', type=str, required=True, help='Email is required')
@@ -76,7 +74,9 @@ class UserLogin(Resource):
     # POST /api/login
     #
     # 用户登录：验证邮箱+密码，成功后签发 JWT access_token。
+    # 限流：auth 分级（与注册共享配额）
     #############################
+    @rate_limit('auth')
     def post(self):
         parser = reqparse.RequestParser()
         parser.add_argument('email', type=str, required=True, help='Email is required')
@@ -93,7 +93,8 @@ class UserLogin(Resource):
             return {'message': 'Account disabled'}, 403
         
         # 创建访问令牌
-        access_token = create_access_token(identity=str(user.id))
+        # role 写入令牌声明，普通用户的权限判断无需查库（见 utils/identity.py）
+        access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
         
         return {
             'access_token': access_token,
@@ -104,27 +105,25 @@ class UserLogin(Resource):
 class UserCodes(Resource):
     """获取用户发布的代码"""
     @jwt_required()
+    @query_budget(5)
     def get(self):
         #############################
         # GET /api/user/codes
         #
         # 获取当前登录用户发布的代码列表。
         # - 性能：预加载 category/author/tags/results，避免序列化时 N+1
+        # - fields=summary：仅返回卡片字段（批量导出需要完整数据，默认 full）
         #############################
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
+        summary = request.args.get('fields') == 'summary'
         try:
             codes = (
-                Code.query.options(
-                    joinedload(Code.category),
-                    joinedload(Code.author),
-                    selectinload(Code.tags),
-                    selectinload(Code.results),
-                )
+                Code.query.options(*Code.list_options(summary=summary))
                 .filter_by(author_id=int(user_id))
                 .order_by(Code.created_at.desc())
                 .all()
             )
-            return {'codes': [code.to_dict() for code in codes]}, 200
+            return {'codes': [code.to_summary_dict() if summary else code.to_dict() for code in codes]}, 200
         except Exception as e:
             current_app.logger.exception('Failed to get user codes')
             return {'message': 'Internal server error'}, 500
@@ -153,7 +152,7 @@ class UserProfile(Resource):
         #
         # 获取当前用户资料。
         #############################
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         user = User.query.get(user_id)
         if not user:
             return {'message': 'User not found'}, 404
@@ -168,7 +167,7 @@ class UserProfile(Resource):
         # - 越权：只允许改自己的资料（由 JWT identity 保证）
         # - 唯一性：username 需要排除自己后检查冲突
         #############################
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         user = User.query.get(user_id)
         if not user:
             return {'message': 'User not found'}, 404
@@ -190,6 +189,8 @@ class UserProfile(Resource):
         
         try:
             db.session.commit()
+            # 列表中展示 author_username，用户名变化需清理其代码所在的缓存页
+            invalidate_tags(f"user:{user.id}")
             return {'message': 'Profile updated', 'user': user.to_dict()}, 200
         except Exception as e:
             db.session.rollback()
@@ -206,7 +207,7 @@ class UserPassword(Resource):
         #
         # 修改当前用户密码：先校验 old_password，再写入新密码哈希。
         #############################
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         user = User.query.get(user_id)
         if not user:
             return {'message': 'User not found'}, 404
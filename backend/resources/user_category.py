@@ -1,8 +1,10 @@
 from flask_restful import Resource, reqparse
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
 from flask import current_app
+from sqlalchemy import case, select, update
 from models.user_category import UserCategory
 from models import db
+from utils.identity import current_user_id
 
 #############################
 # UserCategory API
@@ -22,7 +24,7 @@ class UserCategoryList(Resource):
     @jwt_required()
     def get(self):
         """获取当前用户的分类列表"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         categories = UserCategory.query.filter_by(user_id=user_id).order_by(UserCategory.sort_order.asc()).all()
         return [category.to_dict() for category in categories], 200
     
@@ -35,7 +37,7 @@ class UserCategoryList(Resource):
         parser.add_argument('color', type=str, help='分类颜色')
         args = parser.parse_args()
         
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         
         # 检查同名分类是否存在
         existing = UserCategory.query.filter_by(user_id=user_id, name=args['name']).first()
@@ -66,7 +68,7 @@ class UserCategoryDetail(Resource):
     @jwt_required()
     def get(self, category_id):
         """获取分类详情"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         category = UserCategory.query.filter_by(id=category_id, user_id=user_id).first()
         if not category:
             return {'message': '分类不存在'}, 404
@@ -75,7 +77,7 @@ class UserCategoryDetail(Resource):
     @jwt_required()
     def put(self, category_id):
         """更新分类信息"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         category = UserCategory.query.filter_by(id=category_id, user_id=user_id).first()
         if not category:
             return {'message': '分类不存在'}, 404
@@ -111,14 +113,14 @@ class UserCategoryDetail(Resource):
     @jwt_required()
     def delete(self, category_id):
         """删除分类"""
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
         category = UserCategory.query.filter_by(id=category_id, user_id=user_id).first()
         if not category:
             return {'message': '分类不存在'}, 404
         
-        # 检查是否有代码引用此分类
-        if category.codes:
-            return {'message': f'无法删除，该分类下还有 {len(category.codes)} 个代码'}, 400
+        # 检查是否有代码引用此分类（读取计数列，不加载代码行）
+        if category.code_count:
+            return {'message': f'无法删除，该分类下还有 {category.code_count} 个代码'}, 400
         
         try:
             db.session.delete(category)
@@ -130,24 +132,73 @@ class UserCategoryDetail(Resource):
             return {'message': '删除分类失败'}, 500
 
 class UserCategorySortOrder(Resource):
+    #############################
+    # POST /api/user/categories/sort
+    #
+    # 调整分类排序，两种请求体：
+    # - {"category_orders": [3, 1, 2]}：整体排序；未列出的分类保持原相对顺序排在其后
+    # - {"id": 3, "after_id": 1}：把分类 3 移到分类 1 之后；after_id 为 null 时移到最前
+    #
+    # 性能：一次 SELECT 取出当前用户的分类顺序，在内存中校验并计算新顺序，
+    # 只对 sort_order 发生变化的行执行一条 UPDATE ... CASE id WHEN ... END。
+    #############################
     @jwt_required()
     def post(self):
         """批量更新分类排序"""
         parser = reqparse.RequestParser()
-        parser.add_argument('category_orders', type=list, required=True, help='分类排序列表必填')
+        parser.add_argument('category_orders', type=list, location='json', help='分类排序列表')
+        parser.add_argument('id', type=int, location='json', help='要移动的分类ID')
+        parser.add_argument('after_id', type=int, location='json', help='移动到该分类之后（为空则移到最前）')
         args = parser.parse_args()
         
-        user_id = get_jwt_identity()
+        user_id = current_user_id()
+        rows = db.session.execute(
+            select(UserCategory.id, UserCategory.sort_order)
+            .where(UserCategory.user_id == user_id)
+            .order_by(UserCategory.sort_order.asc(), UserCategory.id.asc())
+        ).all()
+        current = [row.id for row in rows]
+        owned = set(current)
+        
+        if args['category_orders'] is not None:
+            try:
+                ids = [int(category_id) for category_id in args['category_orders']]
+            except (TypeError, ValueError):
+                return {'message': '分类排序列表格式错误'}, 400
+            if len(set(ids)) != len(ids):
+                return {'message': '分类排序列表存在重复项'}, 400
+            if not owned.issuperset(ids):
+                return {'message': '分类不存在'}, 404
+            listed = set(ids)
+            order = ids + [category_id for category_id in current if category_id not in listed]
+        elif args['id'] is not None:
+            moved, after_id = args['id'], args['after_id']
+            if moved not in owned or (after_id is not None and after_id not in owned):
+                return {'message': '分类不存在'}, 404
+            if moved == after_id:
+                return {'message': '不能移动到自身之后'}, 400
+            order = [category_id for category_id in current if category_id != moved]
+            order.insert(order.index(after_id) + 1 if after_id is not None else 0, moved)
+        else:
+            return {'message': '分类排序列表必填'}, 400
+        
+        old_sort = {row.id: row.sort_order for row in rows}
+        changed = {
+            category_id: index + 1
+            for index, category_id in enumerate(order)
+            if old_sort[category_id] != index + 1
+        }
         
         try:
-            # 批量更新排序
-            for index, category_id in enumerate(args['category_orders']):
-                category = UserCategory.query.filter_by(id=category_id, user_id=user_id).first()
-                if category:
-                    category.sort_order = index + 1
-            
+            if changed:
+                db.session.execute(
+                    update(UserCategory)
+                    .where(UserCategory.user_id == user_id, UserCategory.id.in_(list(changed)))
+                    .values(sort_order=case(changed, value=UserCategory.id))
+                    .execution_options(synchronize_session=False)
+                )
             db.session.commit()
-            return {'message': '排序更新成功'}, 200
+            return {'message': '排序更新成功', 'category_orders': order}, 200
         except Exception as e:
             db.session.rollback()
             current_app.logger.exception('Failed to update category sort order')
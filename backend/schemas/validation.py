@@ -1,6 +1,27 @@
 from marshmallow import Schema, fields, validate, ValidationError
 import re
 
+# 与发布页（CodePublishView.vue）的语言选项一致，另保留原有的 JavaScript / Java
+LANGUAGES = (
+    'Python', 'R', 'Shell', 'Perl', 'Rust', 'MATLAB', 'Julia', 'Nextflow', 'Snakemake',
+    'WDL', 'AWK', 'JavaScript', 'Java',
+)
+_LANGUAGE_NAMES = {name.lower(): name for name in LANGUAGES}
+
+def normalize_language(value):
+    """语言名不区分大小写，返回规范写法（如 python -> Python）；不支持时返回 None"""
+    if not isinstance(value, str):
+        return None
+    return _LANGUAGE_NAMES.get(value.strip().lower())
+
+class LanguageField(fields.Str):
+    """编程语言：按 normalize_language 规范化，不支持的语言校验失败"""
+    def _deserialize(self, value, attr, data, **kwargs):
+        language = normalize_language(super()._deserialize(value, attr, data, **kwargs))
+        if language is None:
+            raise ValidationError("不支持的编程语言")
+        return language
+
 class UserRegistrationSchema(Schema):
     username = fields.Str(
         required=True, 
@@ -38,10 +59,7 @@ class CodeCreateSchema(Schema):
         required=True, 
         validate=validate.Length(min=1, max=50000, error="代码内容长度不能超过50000字符")
     )
-    language = fields.Str(
-        required=True, 
-        validate=validate.OneOf(['Python', 'R', 'Shell', 'JavaScript', 'Java'], error="不支持的编程语言")
-    )
+    language = LanguageField(required=True)
     category_id = fields.Int(required=True, validate=validate.Range(min=1, error="分类ID无效"))
     user_category_id = fields.Int(missing=None, validate=validate.Range(min=1, error="用户分类ID无效"))
     environment = fields.Str(missing="", validate=validate.Length(max=5000, error="环境配置过长"))
@@ -0,0 +1,124 @@
+"""
+后端测试夹具
+- 应用在导入时读取环境变量，因此先设置临时 SQLite 库、进程内缓存/浏览量缓冲/限流存储，再导入 app
+- 每个用例前重建表结构（含 FTS 表），写入管理员 alice、普通用户 bob 和一个分类，并清空缓存与限流计数
+"""
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix='bio-code-tests-')
+
+os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(TMP_DIR, 'test.db')
+os.environ['JWT_SECRET_KEY'] = 'test-secret-key-for-pytest-only-000000'
+os.environ['CACHE_BACKEND'] = 'memory'
+os.environ['VIEW_COUNTER_BACKEND'] = 'memory'
+os.environ['RATE_LIMIT_STORAGE_URI'] = 'memory://'
+os.environ['BLOB_STORAGE_DIR'] = os.path.join(TMP_DIR, 'blobs')
+os.environ.pop('REDIS_URL', None)
+os.environ.pop('DATABASE_REPLICA_URIS', None)
+
+sys.path.insert(0, BACKEND_DIR)
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import app as flask_app, limiter  # noqa: E402
+from models import db  # noqa: E402
+from models.category import Category  # noqa: E402
+from models.user import User  # noqa: E402
+from utils.cache import get_cache  # noqa: E402
+from utils.search import FTS_TABLE, _fts_ready  # noqa: E402
+from utils.tags import tag_id_cache  # noqa: E402
+from utils.view_counter import get_view_counter  # noqa: E402
+
+flask_app.config['TESTING'] = True
+
+# 低迭代次数的哈希，避免每个用例都执行一次 scrypt
+PASSWORD_HASH = generate_password_hash('password123', method='pbkdf2:sha256:1000')
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.session.remove()
+        db.drop_all()
+        # FTS 虚拟表不在 metadata 中，drop_all 不会删除
+        with db.engine.begin() as connection:
+            connection.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+        _fts_ready.clear()
+        db.create_all()
+        get_cache().clear()
+        tag_id_cache.clear()
+        get_view_counter().buffer.drain()
+        limiter.reset()
+    # 不在用例期间保持应用上下文：请求复用外层上下文会共享 g（身份、查询记录）
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+    """alice（管理员）、bob 与分类；返回 id 与请求头"""
+    with app.app_context():
+        return _seed()
+
+
+def _seed():
+    alice = User(username='alice', email='alice@example.com', role='admin')
+    alice.password_hash = PASSWORD_HASH
+    bob = User(username='bob', email='bob@example.com')
+    bob.password_hash = PASSWORD_HASH
+    category = Category(name='单细胞测序')
+    db.session.add_all([alice, bob, category])
+    db.session.commit()
+    return SimpleNamespace(
+        alice_id=alice.id,
+        bob_id=bob.id,
+        category_id=category.id,
+        admin=_auth(alice.id),
+        bob=_auth(bob.id),
+    )
+
+
+def _auth(user_id):
+    return {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+
+
+@pytest.fixture
+def make_code(client, seed):
+    """通过 POST /api/codes 发布代码并由管理员审核通过，返回代码 id"""
+    def _make_code(headers=None, approve=True, **fields):
+        payload = {
+            'title': 'Seurat 聚类流程',
+            'description': '单细胞转录组降维与聚类',
+            'content': 'library(Seurat)',
+            'language': 'R',
+            'category_id': seed.category_id,
+            'tags': ['scRNA-seq'],
+        }
+        payload.update(fields)
+        response = client.post('/api/codes', json=payload, headers=headers or seed.bob)
+        assert response.status_code == 201, response.get_json()
+        code_id = response.get_json()['id']
+        if approve:
+            review = client.patch(f'/api/admin/codes/{code_id}/review', json={'action': 'approve'}, headers=seed.admin)
+            assert review.status_code == 200, review.get_json()
+        return code_id
+    return _make_code
@@ -0,0 +1,173 @@
+import gzip
+import json
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+
+from models import db
+from models.code import Code
+from utils import backup
+from utils.backup import BackupError, backup_tables, dump, restore
+
+
+@pytest.fixture
+def populated(app, client, seed, make_code):
+    """两条代码（含标签、结果）、一条评论与一条收藏"""
+    first = make_code(title='Seurat 聚类', tags=['scRNA-seq', 'Seurat'], results=[{'type': 'text', 'content': 'ok'}])
+    second = make_code(title='DESeq2 差异分析', tags=['RNA-seq'])
+    client.post(f'/api/codes/{first}/comments', json={'content': '赞'}, headers=seed.admin)
+    client.post('/api/favorites', json={'code_id': second}, headers=seed.admin)
+    return first, second
+
+
+@pytest.fixture
+def target(tmp_path):
+    """恢复目标：独立的空 SQLite 库"""
+    engine = create_engine('sqlite:///' + str(tmp_path / 'target.db'))
+    yield engine
+    engine.dispose()
+
+
+def _counts(engine):
+    with engine.connect() as connection:
+        return {
+            table.name: connection.execute(select(func.count()).select_from(table)).scalar()
+            for table in backup_tables()
+        }
+
+
+def _quiet(message):
+    pass
+
+
+@pytest.mark.parametrize('suffix', ['.ndjson', '.ndjson.gz', '.ndjson.zst'])
+def test_round_trip_preserves_rows(app, populated, target, tmp_path, suffix):
+    if suffix.endswith('.zst') and backup.zstandard is None:
+        pytest.skip('zstandard is not installed')
+    path = str(tmp_path / ('backup' + suffix))
+
+    with app.app_context():
+        counts = dump(path, chunk_size=2, log=_quiet)
+        source = _counts(db.engine)
+        code = db.session.get(Code, populated[0])
+        expected = (code.title, code.created_at, sorted(tag.name for tag in code.tags), code.comment_count)
+
+        assert counts == source
+        assert restore(path, batch_size=2, log=_quiet, engine=target) == source
+
+    assert _counts(target) == source
+    with target.connect() as connection:
+        row = connection.execute(
+            select(Code.title, Code.created_at, Code.comment_count).where(Code.id == populated[0])
+        ).one()
+        tags = connection.execute(text(
+            'SELECT t.name FROM tags t JOIN code_tags ct ON ct.tag_id = t.id WHERE ct.code_id = :id ORDER BY t.name'
+        ), {'id': populated[0]}).scalars().all()
+        # 全文索引在恢复后重建
+        fts = connection.execute(text("SELECT rowid FROM codes_fts WHERE codes_fts MATCH 'Seurat'")).scalars().all()
+    assert (row.title, row.created_at, tags, row.comment_count) == expected
+    assert isinstance(row.created_at, datetime)
+    assert fts == [populated[0]]
+
+
+def test_restore_requires_empty_target_unless_truncate(app, populated, tmp_path):
+    path = str(tmp_path / 'backup.ndjson')
+    with app.app_context():
+        source = dump(path, log=_quiet)
+        with pytest.raises(BackupError, match='not empty'):
+            restore(path, log=_quiet)
+        assert restore(path, truncate=True, log=_quiet) == source
+        assert _counts(db.engine) == source
+
+
+def _lines(path):
+    with open(path, 'rb') as f:
+        return f.readlines()
+
+
+def test_backup_truncated_before_end_marker(app, populated, target, tmp_path):
+    path = str(tmp_path / 'backup.ndjson')
+    with app.app_context():
+        dump(path, log=_quiet)
+    lines = _lines(path)
+    assert json.loads(lines[-1])['end'] is True
+    truncated = str(tmp_path / 'truncated.ndjson')
+    with open(truncated, 'wb') as f:
+        f.writelines(lines[:-1])
+
+    with app.app_context():
+        with pytest.raises(BackupError, match='truncated'):
+            restore(truncated, batch_size=1, log=_quiet, engine=target)
+    # 已提交的批次保留，外键检查已恢复
+    assert _counts(target)['users'] == 2
+    with target.connect() as connection:
+        assert connection.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+
+
+def test_backup_cut_mid_line_or_mid_stream(app, populated, target, tmp_path):
+    path = str(tmp_path / 'backup.ndjson')
+    with app.app_context():
+        dump(path, log=_quiet)
+    data = b''.join(_lines(path))
+
+    cut = str(tmp_path / 'cut.ndjson')
+    with open(cut, 'wb') as f:
+        f.write(data[:len(data) // 2])
+    with gzip.open(path + '.gz', 'wb') as f:
+        f.write(data)
+    gz_cut = str(tmp_path / 'cut.ndjson.gz')
+    with open(path + '.gz', 'rb') as src, open(gz_cut, 'wb') as f:
+        f.write(src.read()[:-20])
+
+    with app.app_context():
+        for broken in (cut, gz_cut):
+            with pytest.raises(BackupError, match='truncated'):
+                restore(broken, truncate=True, log=_quiet, engine=target)
+
+
+def test_rejects_non_backup_files(app, seed, target, tmp_path):
+    path = str(tmp_path / 'codes.json')
+    with open(path, 'w') as f:
+        f.write('{"codes": []}\n')
+    with app.app_context():
+        with pytest.raises(BackupError, match='Not a backup file'):
+            restore(path, log=_quiet, engine=target)
+
+
+def test_restore_skips_unknown_tables_and_columns(app, target, tmp_path):
+    path = str(tmp_path / 'old.ndjson')
+    records = [
+        {'backup': 1, 'created_at': '2024-01-01T00:00:00', 'dialect': 'sqlite', 'tables': ['legacy', 'categories']},
+        {'table': 'legacy', 'columns': ['id'], 'count': 1},
+        [1],
+        {'table': 'categories', 'columns': ['id', 'name', 'created_at', 'icon_url'], 'count': 1},
+        [7, '宏基因组', '2024-01-01T08:00:00', 'x.png'],
+        {'end': True, 'counts': {'legacy': 1, 'categories': 1}},
+    ]
+    with open(path, 'w') as f:
+        f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+
+    messages = []
+    with app.app_context():
+        assert restore(path, log=messages.append, engine=target) == {'categories': 1}
+    assert '跳过未知表：legacy' in messages
+    assert 'categories: 忽略已不存在的列 icon_url' in messages
+    with target.connect() as connection:
+        assert connection.exec_driver_sql('SELECT id, name, code_count FROM categories').all() == [(7, '宏基因组', 0)]
+
+
+def test_cli_commands(app, populated, tmp_path):
+    path = str(tmp_path / 'cli.ndjson.gz')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['backup', path])
+    assert result.exit_code == 0, result.output
+    assert os.path.getsize(path) > 0
+
+    result = runner.invoke(args=['restore', path])
+    assert result.exit_code == 1
+    assert 'use --truncate' in result.output
+    result = runner.invoke(args=['restore', path, '--truncate', '--batch-size', '3'])
+    assert result.exit_code == 0, result.output
+    assert '恢复完成' in result.output
@@ -0,0 +1,185 @@
+import base64
+import hashlib
+import io
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, update
+
+from models import db
+from models.code import Code
+from models.result import Result
+from utils import image_variants
+from utils.blob_store import CONTENT_TYPES, get_blob_store
+from utils.image_variants import variant_name
+
+
+def _png(width=800, height=400):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (30, 120, 200)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# 只需通过文件头识别的最小“PNG”，不依赖 Pillow
+FAKE_PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def _upload(client, headers, data, filename='plot.png'):
+    return client.post(
+        '/api/uploads/images',
+        data={'image': (io.BytesIO(data), filename)},
+        content_type='multipart/form-data',
+        headers=headers,
+    )
+
+
+def _store_path(app, name):
+    with app.app_context():
+        return get_blob_store().path_for(name)
+
+
+def test_upload_is_content_addressed(app, client, seed):
+    response = _upload(client, seed.bob, FAKE_PNG)
+    assert response.status_code == 201
+    body = response.get_json()
+    sha = hashlib.sha256(FAKE_PNG).hexdigest()
+    assert body == {'url': f'/api/blobs/{sha}.png', 'name': f'{sha}.png', 'size': len(FAKE_PNG), 'content_type': 'image/png'}
+
+    path = _store_path(app, body['name'])
+    assert path.endswith(os.path.join(sha[:2], sha[2:4], f'{sha}.png'))
+    with open(path, 'rb') as f:
+        assert f.read() == FAKE_PNG
+
+    # 同一图片再次上传：同名，不产生新文件
+    assert _upload(client, seed.admin, FAKE_PNG, filename='other.png').get_json()['name'] == body['name']
+    assert [n for n in os.listdir(os.path.dirname(path)) if n.startswith(sha)] == [f'{sha}.png']
+
+
+@pytest.mark.parametrize('data', [
+    b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>',
+    b'plain text',
+    b'',
+])
+def test_upload_rejects_non_images(client, seed, data):
+    response = _upload(client, seed.bob, data, filename='plot.png')
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Unsupported image type'
+
+
+def test_upload_limits_and_auth(app, client, seed, monkeypatch):
+    with app.app_context():
+        monkeypatch.setattr(get_blob_store(), 'max_size', 32)
+    assert _upload(client, seed.bob, FAKE_PNG).status_code == 400
+    assert client.post('/api/uploads/images', data={}, headers=seed.bob).status_code == 400
+    assert _upload(client, {}, FAKE_PNG).status_code == 401
+
+
+def test_download_is_immutable_and_conditional(client, seed):
+    name = _upload(client, seed.bob, FAKE_PNG).get_json()['name']
+
+    response = client.get(f'/api/blobs/{name}')
+    assert response.status_code == 200
+    assert response.data == FAKE_PNG
+    assert response.mimetype == 'image/png'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    etag = response.headers['ETag']
+    assert name.split('.')[0] in etag
+
+    assert client.get(f'/api/blobs/{name}', headers={'If-None-Match': etag}).status_code == 304
+    partial = client.get(f'/api/blobs/{name}', headers={'Range': 'bytes=0-7'})
+    assert partial.status_code == 206
+    assert partial.data == FAKE_PNG[:8]
+
+
+@pytest.mark.parametrize('name', [
+    'a' * 64 + '.png',
+    'a' * 64 + '.svg',
+    '..%2F..%2Fapp.py',
+    'A' * 64 + '.png',
+    'a' * 64 + '.huge.webp',
+])
+def test_unknown_or_invalid_names_return_404(client, seed, name):
+    assert client.get(f'/api/blobs/{name}').status_code == 404
+
+
+def test_accel_redirect_hands_file_to_nginx(app, client, seed, monkeypatch):
+    name = _upload(client, seed.bob, FAKE_PNG).get_json()['name']
+    monkeypatch.setitem(app.config, 'BLOB_ACCEL_REDIRECT', '/_blobs/')
+
+    response = client.get(f'/api/blobs/{name}')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == f'/_blobs/{name[:2]}/{name[2:4]}/{name}'
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+@pytest.mark.skipif(not image_variants.ENABLED, reason='Pillow is not installed')
+def test_variants_are_generated_and_served(app, client, seed):
+    from PIL import Image
+
+    name = _upload(client, seed.bob, _png(800, 400)).get_json()['name']
+    thumb, detail = variant_name(name, 'thumb'), variant_name(name, 'detail')
+
+    # 上传后后台生成；访问时若仍不存在则等待生成
+    response = client.get(f'/api/blobs/{thumb}')
+    assert response.status_code == 200
+    assert response.mimetype == CONTENT_TYPES[image_variants.VARIANT_FORMAT]
+    with Image.open(io.BytesIO(response.data)) as im:
+        assert im.size == (320, 160)
+    # 只缩小不放大
+    with Image.open(io.BytesIO(client.get(f'/api/blobs/{detail}').data)) as im:
+        assert im.size == (800, 400)
+    assert os.path.exists(_store_path(app, thumb))
+
+
+@pytest.mark.skipif(not image_variants.ENABLED, reason='Pillow is not installed')
+def test_variant_of_missing_original_returns_404(client, seed):
+    assert client.get('/api/blobs/' + variant_name('b' * 64 + '.png', 'thumb')).status_code == 404
+
+
+def test_code_create_externalizes_inline_images(app, client, seed, make_code):
+    encoded = base64.b64encode(FAKE_PNG).decode()
+    code_id = make_code(
+        content=f'![plot](data:image/png;base64,{encoded})\nbroken: data:image/png;base64,!!!',
+        results=[{'type': 'image', 'content': f'data:image/png;base64,{encoded}'}],
+    )
+    sha = hashlib.sha256(FAKE_PNG).hexdigest()
+    data = client.get(f'/api/codes/{code_id}').get_json()
+    assert data['content'] == f'![plot](/api/blobs/{sha}.png)\nbroken: data:image/png;base64,!!!'
+    assert data['results'][0]['content'] == f'/api/blobs/{sha}.png'
+    assert os.path.exists(_store_path(app, f'{sha}.png'))
+
+
+def test_blobs_migrate_rewrites_existing_rows(app, seed, make_code):
+    code_id = make_code()
+    encoded = base64.b64encode(FAKE_PNG).decode()
+    inline = f'data:image/png;base64,{encoded}'
+    old = datetime(2024, 1, 1)
+    with app.app_context():
+        db.session.execute(update(Code).where(Code.id == code_id).values(content=f'![x]({inline})', updated_at=old))
+        db.session.execute(insert(Result).values(code_id=code_id, type='image', content=inline, created_at=old))
+        db.session.commit()
+
+    runner = app.test_cli_runner()
+    dry = runner.invoke(args=['blobs-migrate', '--dry-run'])
+    assert dry.exit_code == 0, dry.output
+    with app.app_context():
+        assert db.session.get(Code, code_id).content == f'![x]({inline})'
+
+    result = runner.invoke(args=['blobs-migrate', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert '共 2 张图片' in result.output
+    url = '/api/blobs/' + hashlib.sha256(FAKE_PNG).hexdigest() + '.png'
+    with app.app_context():
+        code = db.session.get(Code, code_id)
+        assert code.content == f'![x]({url})'
+        assert [r.content for r in code.results] == [url]
+        # 结果被改写：刷新 updated_at 使详情 ETag 失效
+        assert code.updated_at > old
+
+    # 可重复执行
+    assert '共 0 张图片' in runner.invoke(args=['blobs-migrate']).output
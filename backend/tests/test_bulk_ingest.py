@@ -0,0 +1,120 @@
+import json
+
+import resources.code
+from models import db
+from models.category import Category
+from models.code import Code
+from models.tag import Tag
+
+
+def _item(seed, **fields):
+    item = {
+        'title': 'DESeq2 差异表达',
+        'description': 'bulk RNA-seq 差异分析',
+        'content': 'library(DESeq2)',
+        'language': 'R',
+        'category_id': seed.category_id,
+        'tags': ['RNA-seq'],
+    }
+    item.update(fields)
+    return item
+
+
+def _bulk(client, seed, items):
+    return client.post('/api/codes/bulk', json=items, headers=seed.bob)
+
+
+def test_all_created_returns_201_and_resolves_tags(app, client, seed, make_code):
+    make_code(tags=['RNA-seq'])
+    items = [
+        _item(seed, title=f'流程 {i}', tags=['RNA-seq', ' DESeq2 ', 'DESeq2'])
+        for i in range(3)
+    ]
+
+    response = _bulk(client, seed, items)
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 3 and body['failed'] == 0
+    ids = [item['id'] for item in body['items']]
+
+    with app.app_context():
+        codes = Code.query.filter(Code.id.in_(ids)).order_by(Code.id).all()
+        assert [code.title for code in codes] == ['流程 0', '流程 1', '流程 2']
+        assert all(code.status == 'pending' and code.author_id == seed.bob_id for code in codes)
+        assert all(sorted(tag.name for tag in code.tags) == ['DESeq2', 'RNA-seq'] for code in codes)
+        # 已有标签复用，新标签只建一次
+        assert Tag.query.filter_by(name='RNA-seq').count() == 1
+        tags = {tag.name: tag.code_count for tag in Tag.query.all()}
+        assert tags == {'RNA-seq': 4, 'DESeq2': 3}
+        assert db.session.get(Category, seed.category_id).code_count == 4
+
+
+def test_partial_failure_returns_207_with_item_errors(app, client, seed):
+    items = [
+        _item(seed, title='有效'),
+        _item(seed, language='COBOL'),
+        _item(seed, category_id=999),
+        'not an object',
+        _item(seed, results=[{'type': 'video', 'content': 'x'}]),
+    ]
+
+    response = _bulk(client, seed, items)
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body['created'] == 1 and body['failed'] == 4
+    statuses = {item['index']: item for item in body['items']}
+    assert statuses[0]['status'] == 'created'
+    assert statuses[1]['errors'] == {'language': ['不支持的编程语言']}
+    assert statuses[2]['errors'] == {'category_id': ['分类不存在']}
+    assert statuses[3]['errors'] == {'_schema': ['item must be an object']}
+    assert 'results' in statuses[4]['errors']
+    with app.app_context():
+        assert Code.query.count() == 1
+
+
+def test_all_invalid_returns_400(app, client, seed):
+    response = _bulk(client, seed, [_item(seed, title=''), _item(seed, language='COBOL')])
+    assert response.status_code == 400
+    assert response.get_json()['created'] == 0
+    assert _bulk(client, seed, []).status_code == 400
+    with app.app_context():
+        assert Code.query.count() == 0
+
+
+def test_too_many_items_returns_413(client, seed, monkeypatch):
+    monkeypatch.setattr(resources.code, 'BULK_MAX_ITEMS', 2)
+    assert _bulk(client, seed, [_item(seed)] * 3).status_code == 413
+
+
+def test_ndjson_body_reports_unparsable_lines(client, seed):
+    body = '\n'.join([json.dumps(_item(seed)), '{broken', '', json.dumps(_item(seed))])
+    response = client.post(
+        '/api/codes/bulk', data=body, content_type='application/x-ndjson', headers=seed.bob,
+    )
+    assert response.status_code == 207
+    statuses = [item['status'] for item in response.get_json()['items']]
+    assert statuses == ['created', 'error', 'created']
+
+
+def test_language_case_is_normalized_in_both_create_paths(app, client, seed, make_code):
+    single_id = make_code(language='python', approve=False)
+    response = _bulk(client, seed, [_item(seed, language='SNAKEMAKE'), _item(seed, language=' julia ')])
+    assert response.status_code == 201
+    bulk_ids = [item['id'] for item in response.get_json()['items']]
+
+    with app.app_context():
+        assert db.session.get(Code, single_id).language == 'Python'
+        assert [db.session.get(Code, code_id).language for code_id in bulk_ids] == ['Snakemake', 'Julia']
+
+    payload = {'title': 't', 'description': 'd', 'content': 'c', 'language': 'COBOL', 'category_id': seed.category_id}
+    assert client.post('/api/codes', json=payload, headers=seed.bob).status_code == 400
+
+
+def test_bulk_statement_count_does_not_grow_per_item(client, seed):
+    items = [_item(seed, title=f'流程 {i}', tags=['RNA-seq', f'tag-{i % 5}']) for i in range(200)]
+
+    response = _bulk(client, seed, items)
+    assert response.status_code == 201
+    assert response.get_json()['created'] == 200
+    # 单条发布每条约十余条 SQL；批量导入的语句数与条目数无关
+    assert int(response.headers['X-Query-Count']) <= 20
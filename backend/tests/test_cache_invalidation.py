@@ -0,0 +1,109 @@
+import fakeredis
+import pytest
+
+from utils.cache import RedisCache, SimpleMemoryCache, init_cache
+
+
+@pytest.fixture
+def redis_cache(app):
+    """列表缓存使用 fakeredis（与生产相同的 RedisCache 标签实现）"""
+    cache = init_cache(app, client=fakeredis.FakeRedis())
+    assert isinstance(cache, RedisCache)
+    yield cache
+    init_cache(app)
+
+
+def _codes(client, **params):
+    response = client.get('/api/codes', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()['codes']
+
+
+def _tag_id(client, name):
+    tags = client.get('/api/tags').get_json()
+    return next(tag['id'] for tag in tags if tag['name'] == name)
+
+
+def test_list_is_served_from_cache(client, seed, make_code, redis_cache):
+    make_code()
+    assert len(_codes(client)) == 1
+    assert any(key.startswith('code_list') for key in redis_cache.keys())
+
+
+def test_tag_rename_invalidates_lists(client, seed, make_code, redis_cache):
+    code_id = make_code(tags=['scRNA-seq'])
+    assert [c['id'] for c in _codes(client, tag='scRNA-seq')] == [code_id]
+    assert _codes(client, tag='single-cell') == []
+    assert _codes(client)[0]['tags'] == ['scRNA-seq']
+
+    tag_id = _tag_id(client, 'scRNA-seq')
+    response = client.put(f'/api/tags/{tag_id}', json={'name': 'single-cell'}, headers=seed.admin)
+    assert response.status_code == 200
+
+    assert _codes(client, tag='scRNA-seq') == []
+    assert [c['id'] for c in _codes(client, tag='single-cell')] == [code_id]
+    assert _codes(client)[0]['tags'] == ['single-cell']
+
+
+def test_tag_delete_invalidates_lists(client, seed, make_code, redis_cache):
+    make_code(tags=['scRNA-seq'])
+    assert len(_codes(client, tag='scRNA-seq')) == 1
+
+    tag_id = _tag_id(client, 'scRNA-seq')
+    assert client.delete(f'/api/tags/{tag_id}', headers=seed.admin).status_code == 200
+
+    assert _codes(client, tag='scRNA-seq') == []
+    assert _codes(client)[0]['tags'] == []
+
+
+def test_category_rename_invalidates_lists(client, seed, make_code, redis_cache):
+    make_code()
+    assert _codes(client)[0]['category']['name'] == '单细胞测序'
+    assert _codes(client, category_id=seed.category_id)[0]['category']['name'] == '单细胞测序'
+
+    response = client.put(f'/api/categories/{seed.category_id}', json={'name': '单细胞组学'}, headers=seed.admin)
+    assert response.status_code == 200
+
+    assert _codes(client)[0]['category']['name'] == '单细胞组学'
+    assert _codes(client, category_id=seed.category_id)[0]['category']['name'] == '单细胞组学'
+
+
+def test_comments_and_favorites_invalidate_lists(client, seed, make_code, redis_cache):
+    code_id = make_code()
+    assert _codes(client)[0]['comment_count'] == 0
+
+    response = client.post(f'/api/codes/{code_id}/comments', json={'content': '很有用'}, headers=seed.bob)
+    assert response.status_code == 201
+    comment_id = response.get_json()['id']
+    assert _codes(client)[0]['comment_count'] == 1
+
+    response = client.post('/api/favorites', json={'code_id': code_id}, headers=seed.bob)
+    assert response.status_code == 201
+    favorite_id = response.get_json()['id']
+    assert _codes(client)[0]['favorite_count'] == 1
+
+    assert client.delete(f'/api/favorites/{favorite_id}', headers=seed.bob).status_code == 200
+    assert _codes(client)[0]['favorite_count'] == 0
+
+    assert client.delete(f'/api/admin/comments/{comment_id}', headers=seed.admin).status_code == 200
+    assert _codes(client)[0]['comment_count'] == 0
+
+
+def test_comment_delete_by_author_invalidates_lists(client, seed, make_code, redis_cache):
+    code_id = make_code()
+    comment_id = client.post(f'/api/codes/{code_id}/comments', json={'content': '收藏了'}, headers=seed.bob).get_json()['id']
+    assert _codes(client)[0]['comment_count'] == 1
+
+    assert client.delete(f'/api/comments/{comment_id}', headers=seed.bob).status_code == 200
+    assert _codes(client)[0]['comment_count'] == 0
+
+
+def test_oversized_set_drops_previous_value():
+    cache = SimpleMemoryCache(max_bytes=200)
+    cache.set('codes:list', {'codes': [1, 2]}, tags=['category:all'])
+    assert cache.get('codes:list') == {'codes': [1, 2]}
+
+    cache.set('codes:list', {'codes': list(range(100))}, tags=['category:all'])
+    assert cache.get('codes:list') is None
+    assert cache.keys() == []
+    assert cache._bytes == 0
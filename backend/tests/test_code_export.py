@@ -0,0 +1,155 @@
+import io
+import json
+import zipfile
+from types import SimpleNamespace
+
+from models import db
+from models.code import Code
+from utils.code_export import CodeArchive, environment_filename, sanitize_filename
+
+# 只需通过文件头识别的最小“PNG”
+FAKE_PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def _export(client, headers, **params):
+    response = client.get('/api/codes/export', query_string=params, headers=headers)
+    assert response.status_code == 200
+    return response.get_data()
+
+
+def test_export_counts_downloads_without_touching_updated_at(app, client, seed, make_code):
+    code_id = make_code()
+    with app.app_context():
+        before = db.session.get(Code, code_id).updated_at
+
+    _export(client, seed.bob, ids=str(code_id))
+
+    with app.app_context():
+        code = db.session.get(Code, code_id)
+        assert code.downloads == 1
+        assert code.updated_at == before
+
+
+def _archive(client, headers=None, **params):
+    return zipfile.ZipFile(io.BytesIO(_export(client, headers or {}, **params)))
+
+
+def _folders(zf):
+    return sorted({name.split('/')[1] for name in zf.namelist() if '/' in name})
+
+
+def test_export_writes_code_folders_and_results(app, client, seed, make_code):
+    name = client.post(
+        '/api/uploads/images',
+        data={'image': (io.BytesIO(FAKE_PNG), 'umap.png')},
+        content_type='multipart/form-data',
+        headers=seed.bob,
+    ).get_json()['name']
+    code_id = make_code(
+        title='UMAP 可视化',
+        environment='FROM python:3.11\nRUN pip install scanpy',
+        results=[
+            {'type': 'image', 'content': f'/api/blobs/{name}', 'description': 'UMAP 图'},
+            {'type': 'image', 'content': 'https://example.com/a.png'},
+            {'type': 'table', 'content': json.dumps({'columns': ['gene', 'logFC'], 'data': [{'gene': 'CD3E', 'logFC': 2.5}]})},
+            {'type': 'table', 'content': 'not json'},
+            {'type': 'markdown', 'content': '# 结论'},
+        ],
+    )
+    other_id = make_code(title='UMAP 可视化', language='python', environment='name: env\ndependencies:\n  - scanpy')
+
+    zf = _archive(client, ids=f'{code_id},{other_id}')
+    assert zf.testzip() is None
+    folder = f'单细胞测序/UMAP_可视化_{code_id}'
+    names = set(zf.namelist())
+    assert {
+        f'{folder}/UMAP_可视化.r',
+        f'{folder}/README.md',
+        f'{folder}/Dockerfile',
+        f'{folder}/results/01_UMAP_图.png',
+        f'{folder}/results/02_image.url.txt',
+        f'{folder}/results/03_table.csv',
+        f'{folder}/results/04_table.json',
+        f'{folder}/results/05_markdown.md',
+        f'单细胞测序/UMAP_可视化_{other_id}/environment.yml',
+        '导出信息.md',
+    } <= names
+    # 同名代码按 id 分目录
+    assert _folders(zf) == [f'UMAP_可视化_{code_id}', f'UMAP_可视化_{other_id}']
+    assert zf.read(f'{folder}/results/01_UMAP_图.png') == FAKE_PNG
+    assert zf.read(f'{folder}/results/03_table.csv').decode() == 'gene,logFC\r\nCD3E,2.5\r\n'
+    assert '- **作者**: bob' in zf.read(f'{folder}/README.md').decode()
+    assert '- **代码总数**: 2 个' in zf.read('导出信息.md').decode()
+
+
+def test_export_respects_visibility_and_filters(app, client, seed, make_code):
+    approved = make_code(title='已审核')
+    pending = make_code(title='待审核', approve=False)
+    admin_pending = make_code(title='管理员草稿', headers=seed.admin, approve=False)
+    shell = make_code(title='比对脚本', language='Shell')
+
+    def exported(headers=None, **params):
+        return {int(folder.rsplit('_', 1)[1]) for folder in _folders(_archive(client, headers, **params))}
+
+    assert exported() == {approved, shell}
+    assert exported(seed.bob) == {approved, pending, shell}
+    assert exported(seed.admin) == {approved, pending, admin_pending, shell}
+    assert exported(seed.bob, ids=f'{pending},{admin_pending}') == {pending}
+    assert exported(language='shell') == {shell}
+
+    response = client.get('/api/codes/export', query_string={'ids': '1,abc'})
+    assert response.status_code == 400
+
+
+def test_empty_export_is_a_valid_zip_and_counts_nothing(app, client, seed, make_code):
+    code_id = make_code(approve=False)
+    zf = _archive(client, ids=str(code_id))
+    assert zf.namelist() == ['导出信息.md']
+    with app.app_context():
+        assert db.session.get(Code, code_id).downloads == 0
+
+
+def test_archive_streams_one_chunk_per_code():
+    codes = [
+        SimpleNamespace(
+            id=i, title=f'脚本 {i}', language='R', content='x' * 1000, description='', environment='',
+            license='MIT', created_at=None, author=None, category=None, user_category=None, tags=[], results=[],
+        )
+        for i in range(5)
+    ]
+    consumed = []
+
+    def lazy_codes():
+        for code in codes:
+            consumed.append(code.id)
+            yield code
+
+    archive = CodeArchive()
+    chunks = archive.iter_bytes(lazy_codes())
+    first = next(chunks)
+    # 第一个条目写完即产出，之后的代码尚未读取
+    assert first and consumed == [0]
+    data = first + b''.join(chunks)
+    assert archive.exported_ids == [0, 1, 2, 3, 4]
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    assert zf.testzip() is None
+    assert len([name for name in zf.namelist() if name.endswith('.r')]) == 5
+
+
+def test_export_response_is_streamed(client, seed, make_code):
+    code_id = make_code()
+    response = client.get('/api/codes/export', query_string={'ids': str(code_id)})
+    assert response.is_streamed
+    assert response.mimetype == 'application/zip'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="codes_export_')
+    assert response.headers['X-Accel-Buffering'] == 'no'
+    response.get_data()
+
+
+def test_filename_helpers():
+    assert sanitize_filename('a/b:c  d?.') == 'a_b_c_d_'
+    assert sanitize_filename('...') == 'untitled'
+    assert sanitize_filename('x' * 150) == 'x' * 100
+    assert environment_filename('# base image\nFROM rocker/r-ver:4.3') == 'Dockerfile'
+    assert environment_filename('channels:\n  - bioconda') == 'environment.yml'
+    assert environment_filename('R 4.3, Seurat 5') == 'environment.txt'
@@ -0,0 +1,48 @@
+def _detail(client, code_id, **headers):
+    return client.get(f'/api/codes/{code_id}', headers=headers)
+
+
+def test_unchanged_detail_returns_304(client, make_code):
+    code_id = make_code()
+    etag = _detail(client, code_id).headers['ETag']
+
+    response = _detail(client, code_id, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_comment_and_favorite_change_detail_etag(client, seed, make_code):
+    code_id = make_code()
+    etag = _detail(client, code_id).headers['ETag']
+
+    assert client.post(f'/api/codes/{code_id}/comments', json={'content': '赞'}, headers=seed.bob).status_code == 201
+    response = _detail(client, code_id, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['comment_count'] == 1
+    etag = response.headers['ETag']
+
+    assert client.post('/api/favorites', json={'code_id': code_id}, headers=seed.bob).status_code == 201
+    response = _detail(client, code_id, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['favorite_count'] == 1
+
+
+def test_export_changes_detail_etag(client, seed, make_code):
+    code_id = make_code()
+    etag = _detail(client, code_id).headers['ETag']
+
+    client.get('/api/codes/export', query_string={'ids': str(code_id)}, headers=seed.bob).get_data()
+
+    response = _detail(client, code_id, **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['downloads'] == 1
+
+
+def test_if_modified_since_alone_does_not_hide_counter_changes(client, seed, make_code):
+    code_id = make_code()
+    last_modified = _detail(client, code_id).headers['Last-Modified']
+    client.post(f'/api/codes/{code_id}/comments', json={'content': '赞'}, headers=seed.bob)
+
+    response = _detail(client, code_id, **{'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+    assert response.get_json()['comment_count'] == 1
@@ -0,0 +1,56 @@
+from models import db
+from models.code import Code
+from utils.counters import adjust_counter
+
+
+def _updated_at(app, model, pk):
+    with app.app_context():
+        return db.session.get(model, pk).updated_at
+
+
+def test_comment_counter_keeps_updated_at(app, client, seed, make_code):
+    code_id = make_code()
+    before = _updated_at(app, Code, code_id)
+
+    with app.app_context():
+        adjust_counter(Code, code_id, 'comment_count', 2)
+        adjust_counter(Code, [code_id], 'comment_count', -1)
+        db.session.commit()
+        assert db.session.get(Code, code_id).comment_count == 1
+
+    assert _updated_at(app, Code, code_id) == before
+
+
+def test_comment_counter_never_negative(app, make_code):
+    code_id = make_code()
+    with app.app_context():
+        adjust_counter(Code, code_id, 'comment_count', -5)
+        db.session.commit()
+        assert db.session.get(Code, code_id).comment_count == 0
+
+
+def test_code_counts_and_repair_keep_updated_at(app, client, seed, make_code):
+    from models.category import Category
+    from models.user_category import UserCategory
+    from utils.counters import adjust_counters, repair_counters
+
+    response = client.post('/api/user/categories', json={'name': '我的流程'}, headers=seed.bob)
+    assert response.status_code == 201
+    user_category_id = response.get_json()['id']
+    make_code(user_category_id=user_category_id)
+
+    before = {
+        Category: _updated_at(app, Category, seed.category_id),
+        UserCategory: _updated_at(app, UserCategory, user_category_id),
+    }
+    with app.app_context():
+        adjust_counters(Category, 'code_count', {seed.category_id: 3})
+        adjust_counter(UserCategory, user_category_id, 'code_count', 1)
+        db.session.commit()
+        # 计数被改偏，repair 应改回 1 且不刷新 updated_at
+        assert repair_counters()['categories.code_count'] == 1
+        assert db.session.get(Category, seed.category_id).code_count == 1
+        assert db.session.get(UserCategory, user_category_id).code_count == 1
+
+    assert _updated_at(app, Category, seed.category_id) == before[Category]
+    assert _updated_at(app, UserCategory, user_category_id) == before[UserCategory]
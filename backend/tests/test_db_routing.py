@@ -0,0 +1,109 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from models import db
+from utils.db_routing import ReplicaSet
+from utils.view_counter import get_view_counter
+
+
+def _primary_path():
+    return db.engine.url.database
+
+
+@pytest.fixture
+def replica(app, seed, tmp_path):
+    """主库的 SQLite 拷贝作为只读副本；副本中的分类名称与主库不同，便于区分读到的是哪个库"""
+    replicas, path, engine = _make_replica(app, tmp_path)
+    yield replicas, path
+    app.extensions.pop('db_replicas', None)
+    engine.dispose()
+
+
+def _make_replica(app, tmp_path):
+    path = str(tmp_path / 'replica.db')
+    with app.app_context():
+        with db.engine.connect() as connection:
+            connection.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+        db.engine.dispose()
+        shutil.copyfile(_primary_path(), path)
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE categories SET name = '副本分类'")
+
+    engine = create_engine('sqlite:///' + path)
+    replicas = ReplicaSet([engine], check_interval=3600, retry_interval=3600)
+    app.extensions['db_replicas'] = replicas
+    return replicas, path, engine
+
+
+def _category_names(client):
+    response = client.get('/api/categories')
+    assert response.status_code == 200
+    return [category['name'] for category in response.get_json()]
+
+
+def test_reads_go_to_replica(client, replica):
+    assert _category_names(client) == ['副本分类']
+
+
+def test_falls_back_to_primary_on_operational_error(client, replica):
+    replicas, path = replica
+    assert _category_names(client) == ['副本分类']
+
+    # 副本中途故障：查询抛出 OperationalError，标记不可用并在主库上重试
+    with sqlite3.connect(path) as connection:
+        connection.execute('DROP TABLE categories')
+    replicas.engines[0].dispose()
+
+    assert _category_names(client) == ['单细胞测序']
+    assert replicas.stats()[0]['healthy'] is False
+    # 后续请求在重试间隔内直接走主库
+    assert _category_names(client) == ['单细胞测序']
+
+
+def test_fallback_records_detail_view_once(app, client, make_code, tmp_path):
+    code_id = make_code()
+    replicas, path, engine = _make_replica(app, tmp_path)
+    try:
+        # 详情的第一条查询在副本上成功，预加载结果时失败：整个方法在主库上重新执行
+        with sqlite3.connect(path) as connection:
+            connection.execute('DROP TABLE results')
+        response = client.get(f'/api/codes/{code_id}')
+        assert response.status_code == 200
+        assert replicas.stats()[0]['healthy'] is False
+        assert response.get_json()['views'] == 1
+        with app.app_context():
+            assert get_view_counter().pending_for(code_id) == 1
+    finally:
+        app.extensions.pop('db_replicas', None)
+        engine.dispose()
+
+
+def test_unreachable_replica_is_skipped(app, client, seed, tmp_path):
+    engine = create_engine('sqlite:///' + os.path.join(str(tmp_path), 'missing', 'replica.db'))
+    replicas = ReplicaSet([engine], check_interval=0, retry_interval=3600)
+    app.extensions['db_replicas'] = replicas
+    try:
+        assert _category_names(client) == ['单细胞测序']
+        assert replicas.stats()[0]['healthy'] is False
+    finally:
+        app.extensions.pop('db_replicas', None)
+        engine.dispose()
+
+
+def test_writes_go_to_primary(client, seed, replica):
+    response = client.post('/api/categories', json={'name': '空间转录组'}, headers=seed.admin)
+    assert response.status_code == 201
+    # 副本是静态拷贝，看不到新写入；主库中存在
+    assert '空间转录组' not in _category_names(client)
+    with sqlite3.connect(_primary_db(client)) as connection:
+        names = [row[0] for row in connection.execute('SELECT name FROM categories')]
+    assert '空间转录组' in names
+
+
+def _primary_db(client):
+    with client.application.app_context():
+        return _primary_path()
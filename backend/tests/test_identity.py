@@ -0,0 +1,113 @@
+from flask_jwt_extended import decode_token
+from sqlalchemy import event, update
+
+from models import db
+from models.user import User
+from utils.identity import current_role, current_user_id, invalidate_user_role, is_admin
+
+
+def _login(client, email):
+    response = client.post('/api/login', json={'email': email, 'password': 'password123'})
+    assert response.status_code == 200, response.get_json()
+    token = response.get_json()['access_token']
+    return token, {'Authorization': 'Bearer ' + token}
+
+
+def _admin_users(client, headers):
+    return client.get('/api/admin/users', headers=headers).status_code
+
+
+def _statements_during(app, headers, fn):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.test_request_context(headers=headers):
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+def test_login_token_carries_role_claim(app, client, seed):
+    token, _ = _login(client, 'alice@example.com')
+    with app.app_context():
+        claims = decode_token(token)
+    assert claims['role'] == 'admin'
+    assert claims['sub'] == str(seed.alice_id)
+
+
+def test_user_claim_is_trusted_without_query(app, client, seed):
+    _, headers = _login(client, 'bob@example.com')
+    (user_id, role), statements = _statements_during(app, headers, lambda: (current_user_id(), current_role()))
+    assert (user_id, role) == (seed.bob_id, 'user')
+    assert statements == []
+
+
+def test_admin_claim_is_checked_once_then_cached(app, client, seed):
+    _, headers = _login(client, 'alice@example.com')
+    admin, statements = _statements_during(app, headers, is_admin)
+    assert admin is True and len(statements) == 1
+    admin, statements = _statements_during(app, headers, is_admin)
+    assert admin is True and statements == []
+
+
+def test_admin_demoted_mid_token_loses_access_immediately(app, client, seed):
+    with app.app_context():
+        carol = User(username='carol', email='carol@example.com', role='admin')
+        carol.password_hash = db.session.get(User, seed.alice_id).password_hash
+        db.session.add(carol)
+        db.session.commit()
+    _, alice = _login(client, 'alice@example.com')
+    _, carol = _login(client, 'carol@example.com')
+    assert _admin_users(client, alice) == 200
+
+    # 角色缓存已记录 alice 为 admin；另一位管理员降级她之后，同一令牌立即失去权限
+    response = client.patch(f'/api/admin/users/{seed.alice_id}', json={'role': 'user'}, headers=carol)
+    assert response.status_code == 200
+    assert _admin_users(client, alice) == 403
+
+    # 禁用同样立即生效
+    client.patch(f'/api/admin/users/{seed.alice_id}', json={'role': 'admin', 'is_active': False}, headers=carol)
+    assert _admin_users(client, alice) == 403
+
+
+def test_direct_role_change_waits_for_cache_invalidation(app, client, seed):
+    _, alice = _login(client, 'alice@example.com')
+    assert _admin_users(client, alice) == 200
+    with app.app_context():
+        db.session.execute(update(User).where(User.id == seed.alice_id).values(role='user'))
+        db.session.commit()
+    # 绕过 AdminUserDetail 修改角色：缓存有效期内仍沿用旧角色
+    assert _admin_users(client, alice) == 200
+    with app.app_context():
+        invalidate_user_role(seed.alice_id)
+    assert _admin_users(client, alice) == 403
+
+
+def test_promotion_applies_on_next_login(client, seed):
+    _, bob = _login(client, 'bob@example.com')
+    assert client.patch(f'/api/admin/users/{seed.bob_id}', json={'role': 'admin'}, headers=seed.admin).status_code == 200
+    # 令牌中的 user 声明直接采用，不查库
+    assert _admin_users(client, bob) == 403
+    _, bob = _login(client, 'bob@example.com')
+    assert _admin_users(client, bob) == 200
+
+
+def test_tokens_without_role_claim_and_invalid_tokens(app, client, seed):
+    # 旧令牌（无 role 声明）走角色缓存/数据库
+    assert _admin_users(client, seed.admin) == 200
+    assert _admin_users(client, seed.bob) == 403
+    (user_id, role), _ = _statements_during(
+        app, {'Authorization': 'Bearer not-a-token'}, lambda: (current_user_id(), current_role()),
+    )
+    assert (user_id, role) == (None, None)
+
+
+def test_author_checks_compare_integer_ids(client, seed, make_code):
+    code_id = make_code()
+    assert client.put(f'/api/codes/{code_id}', json={'title': '新标题'}, headers=seed.bob).status_code == 200
+    assert client.put(f'/api/codes/{code_id}', json={'title': '越权'}, headers=seed.admin).status_code == 403
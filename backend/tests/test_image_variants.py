@@ -0,0 +1,92 @@
+import io
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils import image_variants
+from utils.blob_store import BlobStore
+from utils.image_variants import ensure_variant, variant_name
+
+pytestmark = pytest.mark.skipif(not image_variants.ENABLED, reason='Pillow is not installed')
+
+
+@pytest.fixture
+def original(tmp_path):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 400), (30, 120, 200)).save(buffer, format='PNG')
+    store = BlobStore(str(tmp_path))
+    name, _ = store.put(buffer.getvalue())
+    return store, name
+
+
+class _Executor:
+    def __init__(self):
+        self.shut_down = False
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def _failed_future(exception):
+    future = Future()
+    future.set_exception(exception)
+    return future
+
+
+def test_broken_pool_returns_none_and_discards_executor(original, monkeypatch):
+    store, name = original
+    executor = _Executor()
+    monkeypatch.setattr(image_variants, '_executor', executor)
+    monkeypatch.setattr(image_variants, '_submit', lambda *args: _failed_future(BrokenProcessPool('worker died')))
+
+    assert ensure_variant(store, variant_name(name, 'thumb')) is None
+    assert image_variants._executor is None
+    assert executor.shut_down
+
+
+def test_cancelled_future_returns_none(original, monkeypatch):
+    store, name = original
+    future = Future()
+    future.cancel()
+    monkeypatch.setattr(image_variants, '_submit', lambda *args: future)
+
+    assert ensure_variant(store, variant_name(name, 'thumb')) is None
+
+
+def test_pool_is_rebuilt_after_worker_exit(original):
+    store, name = original
+    # 工作进程直接退出，进程池进入损坏状态
+    broken = image_variants._get_executor()
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result(timeout=30)
+
+    path = ensure_variant(store, variant_name(name, 'thumb'))
+    assert path is not None and os.path.exists(path)
+    assert image_variants._executor is not broken
+
+
+def test_submit_does_not_deadlock_on_already_finished_future(original, monkeypatch):
+    store, name = original
+    done = Future()
+    done.set_exception(OSError('cannot identify image file'))
+
+    class _DoneExecutor(_Executor):
+        def submit(self, *args):
+            return done
+
+    monkeypatch.setattr(image_variants, '_executor', _DoneExecutor())
+    monkeypatch.setattr(image_variants, '_executor_pid', os.getpid())
+
+    # 回调在 add_done_callback 内同步执行；在线程中调用以便死锁时测试失败而不是挂起
+    results = []
+    thread = threading.Thread(target=lambda: results.append(ensure_variant(store, variant_name(name, 'thumb'))), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+    assert results == [None]
+    assert image_variants._inflight == {}
@@ -0,0 +1,9 @@
+from models import db
+from utils.index_advisor import analyze_hot_queries
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context(), db.engine.connect() as connection:
+        report = analyze_hot_queries(connection)
+    problems = {item['name']: item['full_scans'] + item['sorts'] for item in report if item['full_scans'] or item['sorts']}
+    assert problems == {}
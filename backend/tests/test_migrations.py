@@ -0,0 +1,84 @@
+from sqlalchemy import inspect, select, text
+
+from models import db
+from models.category import Category
+from models.code import Code
+from models.tag import Tag
+from utils.migrations import schema_migrations, upgrade
+
+
+def _downgrade(*columns):
+    """模拟执行计数列迁移之前的旧数据库：删除列并清空迁移记录"""
+    with db.engine.begin() as connection:
+        for table, column in columns:
+            connection.execute(text(f'ALTER TABLE {table} DROP COLUMN {column}'))
+        schema_migrations.drop(connection, checkfirst=True)
+
+
+def _columns(table):
+    return {column['name'] for column in inspect(db.engine).get_columns(table)}
+
+
+def test_upgrade_adds_and_backfills_comment_count(app, client, seed, make_code):
+    code_id = make_code()
+    for content in ('第一条', '第二条'):
+        client.post(f'/api/codes/{code_id}/comments', json={'content': content}, headers=seed.bob)
+
+    with app.app_context():
+        _downgrade(('codes', 'comment_count'))
+        assert 'comment_count' not in _columns('codes')
+
+        assert '0001_counter_columns' in upgrade(log=lambda _: None)
+        assert 'comment_count' in _columns('codes')
+        db.session.expire_all()
+        assert db.session.execute(select(Code.comment_count).where(Code.id == code_id)).scalar() == 2
+
+
+def test_upgrade_adds_and_backfills_code_and_favorite_counts(app, client, seed, make_code):
+    code_id = make_code(tags=['scRNA-seq', 'Seurat'])
+    make_code(tags=['Seurat'])
+    client.post('/api/favorites', json={'code_id': code_id}, headers=seed.bob)
+
+    with app.app_context():
+        _downgrade(('categories', 'code_count'), ('tags', 'code_count'), ('codes', 'favorite_count'))
+
+        upgrade(log=lambda _: None)
+        db.session.expire_all()
+        assert db.session.get(Category, seed.category_id).code_count == 2
+        counts = dict(db.session.execute(select(Tag.name, Tag.code_count)).all())
+        assert counts == {'scRNA-seq': 1, 'Seurat': 2}
+        assert db.session.get(Code, code_id).favorite_count == 1
+
+
+def test_upgrade_is_noop_when_columns_exist(app, seed):
+    # 执行过旧 SQL 脚本（或 create_all 新建）的数据库：列已存在，迁移只记录版本
+    with app.app_context():
+        _downgrade()
+        messages = []
+        upgrade(log=messages.append)
+        assert messages[0] == '0001_counter_columns: 无需变更（已是最新结构）'
+
+
+def test_upgrade_backfills_null_status(app, client, make_code):
+    code_id = make_code(approve=False)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('UPDATE codes SET status = NULL'))
+        assert client.get('/api/codes').get_json()['codes'] == []
+
+        _downgrade()
+        upgrade(log=lambda _: None)
+        assert db.session.get(Code, code_id).status == 'approved'
+
+
+def test_upgrade_creates_model_indexes(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP INDEX idx_comments_author'))
+            connection.execute(text('DROP INDEX idx_users_role_active'))
+        _downgrade()
+        upgrade(log=lambda _: None)
+
+        inspector = inspect(db.engine)
+        assert 'idx_comments_author' in {index['name'] for index in inspector.get_indexes('comments')}
+        assert 'idx_users_role_active' in {index['name'] for index in inspector.get_indexes('users')}
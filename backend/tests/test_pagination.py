@@ -0,0 +1,76 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import update
+
+from models import db
+from models.code import Code
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def _page(client, **params):
+    response = client.get('/api/codes', query_string={'fields': 'summary', **params})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 8, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+    assert '=' not in encode_cursor(created_at, 42)
+
+
+def test_cursor_walks_every_code_once_across_equal_timestamps(app, client, make_code):
+    ids = [make_code(title=f'流程 {i}') for i in range(7)]
+    # 同一时间戳的代码按 id 倒序分页，不能重复或遗漏
+    with app.app_context():
+        db.session.execute(update(Code).where(Code.id.in_(ids[2:6])).values(created_at=datetime(2024, 1, 1)))
+        db.session.commit()
+
+    seen = []
+    body = _page(client, cursor='', per_page=3, with_total=1)
+    assert body['total'] == 7
+    while True:
+        seen.extend(code['id'] for code in body['codes'])
+        if not body['has_more']:
+            assert body['next_cursor'] is None
+            break
+        body = _page(client, cursor=body['next_cursor'], per_page=3)
+        assert 'total' not in body
+    assert seen == [ids[6], ids[1], ids[0], ids[5], ids[4], ids[3], ids[2]]
+
+
+def test_cursor_mode_clamps_per_page(client, make_code):
+    for _ in range(3):
+        make_code()
+    assert len(_page(client, cursor='', per_page=0)['codes']) == 1
+    assert len(_page(client, cursor='', per_page=1000)['codes']) == 3
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!!',
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    _raw_cursor({'created_at': '2024-01-01'}),
+    _raw_cursor(['2024-01-01T00:00:00']),
+    _raw_cursor(['2024-01-01T00:00:00', 1, 2]),
+    _raw_cursor(['yesterday', 1]),
+    _raw_cursor([20240101, 1]),
+    _raw_cursor(['2024-01-01T00:00:00', 'abc']),
+    _raw_cursor(['2024-01-01T00:00:00', None]),
+    _raw_cursor(42),
+])
+def test_malformed_cursor_returns_400(client, seed, cursor):
+    response = client.get('/api/codes', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Invalid cursor'
+
+
+def test_cursor_cannot_combine_with_relevance_sort(client, seed):
+    response = client.get('/api/codes', query_string={'cursor': '', 'keyword': 'Seurat', 'sort': 'relevance'})
+    assert response.status_code == 400
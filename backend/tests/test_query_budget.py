@@ -0,0 +1,39 @@
+import pytest
+
+from models.code import Code
+from utils.query_budget import QueryBudgetExceeded, query_budget
+
+
+@query_budget(2)
+def _authors_lazy():
+    # 每条代码单独加载作者：典型 N+1
+    return [code.author.username for code in Code.query.all()]
+
+
+@query_budget(2)
+def _authors_eager():
+    return [code.author.username for code in Code.query.options(*Code.list_options(summary=True)).all()]
+
+
+def test_n_plus_one_exceeds_budget(app, make_code, seed):
+    for _ in range(3):
+        make_code(headers=seed.admin)
+        make_code(headers=seed.bob)
+
+    with app.test_request_context():
+        with pytest.raises(QueryBudgetExceeded):
+            _authors_lazy()
+    with app.test_request_context():
+        assert len(_authors_eager()) == 6
+
+
+def test_code_list_stays_within_budget(client, make_code, seed):
+    for _ in range(5):
+        make_code()
+        make_code(headers=seed.admin)
+
+    # 列表接口声明了 @query_budget，超出时 TESTING 下抛出 QueryBudgetExceeded
+    response = client.get('/api/codes', query_string={'per_page': 20})
+    assert response.status_code == 200
+    assert len(response.get_json()['codes']) == 10
+    assert int(response.headers['X-Query-Count']) <= 6
@@ -0,0 +1,20 @@
+from utils.rate_limiter import RATE_LIMITS
+
+
+def _login(client):
+    return client.post('/api/login', json={'email': 'bob@example.com', 'password': 'wrong-password'})
+
+
+def test_auth_limit_returns_429(client, seed):
+    limit = int(RATE_LIMITS['auth'].split()[0])
+    for _ in range(limit):
+        assert _login(client).status_code == 401
+    assert _login(client).status_code == 429
+
+
+def test_limits_are_per_tier(client, seed):
+    limit = int(RATE_LIMITS['auth'].split()[0])
+    for _ in range(limit + 1):
+        _login(client)
+    # 同一客户端的其他分级不受影响
+    assert client.get('/api/codes').status_code == 200
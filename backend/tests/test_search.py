@@ -0,0 +1,45 @@
+from sqlalchemy import text
+
+from models import db
+from utils.search import FTS_TABLE, _fts_available, _fts_ready
+
+
+def _titles(client, keyword):
+    response = client.get('/api/codes', query_string={'keyword': keyword, 'fields': 'summary'})
+    assert response.status_code == 200
+    return sorted(code['title'] for code in response.get_json()['codes'])
+
+
+def test_keyword_matches_bigrams(client, make_code):
+    make_code(title='单细胞聚类')
+    make_code(title='空间转录组', description='Visium 数据分析')
+
+    assert _titles(client, '聚类') == ['单细胞聚类']
+    assert _titles(client, 'Visium') == ['空间转录组']
+
+
+def test_single_cjk_character_mixed_with_other_terms(client, make_code):
+    make_code(title='Seurat 细胞注释')
+    make_code(title='Seurat 差异分析', description='DESeq2')
+
+    # “胞”只出现在二元组“细胞”“胞注”中，不能用 MATCH 命中
+    assert _titles(client, 'Seurat 胞') == ['Seurat 细胞注释']
+    assert _titles(client, '胞 注释') == ['Seurat 细胞注释']
+
+
+def test_fts_availability_is_not_cached_while_missing(app):
+    with app.app_context():
+        _check_fts_detection()
+
+
+def _check_fts_detection():
+    with db.engine.begin() as connection:
+        connection.execute(text(f'DROP TABLE {FTS_TABLE}'))
+    _fts_ready.clear()
+
+    with db.engine.begin() as connection:
+        assert not _fts_available(connection)
+        # 模拟另一个进程（flask search-reindex）建表：本进程的检测结果不能一直停留在“不可用”
+        connection.execute(text(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, description)"))
+    with db.engine.begin() as connection:
+        assert _fts_available(connection)
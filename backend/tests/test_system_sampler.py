@@ -0,0 +1,22 @@
+import threading
+
+from utils.system_sampler import SystemSampler
+
+
+def test_sampler_thread_starts_once():
+    sampler = SystemSampler(interval=3600)
+    barrier = threading.Barrier(8)
+
+    def snapshot():
+        barrier.wait()
+        sampler.snapshot()
+
+    before = {t for t in threading.enumerate() if t.name == 'system-sampler'}
+    workers = [threading.Thread(target=snapshot) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    started = {t for t in threading.enumerate() if t.name == 'system-sampler'} - before
+    assert len(started) == 1
+    assert 'cpu_usage_percent' in sampler.snapshot()
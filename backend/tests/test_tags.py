@@ -0,0 +1,128 @@
+from sqlalchemy import delete, event, update
+
+from models import db
+from models.code import Code
+from models.tag import Tag
+from utils import tags as tags_module
+from utils.tags import TagIdCache, resolve_tag_ids, resolve_tags, tag_id_cache
+
+
+class _Statements:
+    """统计 with 块内执行的 SQL"""
+    def __enter__(self):
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+
+def test_resolve_tags_reuses_creates_and_keeps_order(app, seed):
+    with app.app_context():
+        db.session.add(Tag(name='scRNA-seq'))
+        db.session.commit()
+        existing_id = Tag.query.filter_by(name='scRNA-seq').one().id
+
+        tags = resolve_tags([' Seurat', 'scRNA-seq', 'Seurat', '', None, 'UMAP'])
+        db.session.commit()
+
+        assert [tag.name for tag in tags] == ['Seurat', 'scRNA-seq', 'UMAP']
+        assert tags[1].id == existing_id
+        assert Tag.query.count() == 3
+        assert tag_id_cache.get_many(['Seurat', 'scRNA-seq', 'UMAP']) == {tag.name: tag.id for tag in tags}
+
+
+def test_cached_tags_skip_name_lookup(app, seed):
+    with app.app_context():
+        resolve_tags(['Seurat', 'UMAP'])
+        db.session.commit()
+
+        with _Statements() as log:
+            assert [tag.name for tag in resolve_tags(['UMAP', 'Seurat'])] == ['UMAP', 'Seurat']
+        # 只按 id 取 Tag 对象，不再按名称查询或插入
+        assert len(log.statements) == 1
+        assert 'INSERT' not in log.statements[0]
+
+
+def test_insert_conflict_with_concurrent_creator_is_ignored(app, seed, monkeypatch):
+    with app.app_context():
+        db.session.add(Tag(name='Seurat'))
+        db.session.commit()
+        tag_id = Tag.query.filter_by(name='Seurat').one().id
+
+        # 模拟并发：名称查询时标签尚不存在，插入时已被另一个请求创建
+        lookup = tags_module._lookup_ids
+        monkeypatch.setattr(
+            tags_module, '_lookup_ids',
+            lambda names, locking=False: lookup(names, locking) if locking else {},
+        )
+        assert [tag.id for tag in resolve_tags(['Seurat'])] == [tag_id]
+        db.session.commit()
+        assert Tag.query.filter_by(name='Seurat').count() == 1
+
+
+def test_stale_cache_after_delete_elsewhere_recreates_tag(app, seed):
+    with app.app_context():
+        old_id = resolve_tags(['Seurat'])[0].id
+        db.session.commit()
+        # 另一个 worker 删除了标签：本进程的缓存未失效
+        db.session.execute(delete(Tag).where(Tag.id == old_id))
+        db.session.commit()
+        assert tag_id_cache.get_many(['Seurat']) == {'Seurat': old_id}
+
+        tags = resolve_tags(['Seurat'])
+        db.session.commit()
+        assert [tag.name for tag in tags] == ['Seurat']
+        assert db.session.get(Tag, tags[0].id).name == 'Seurat'
+        assert tag_id_cache.get_many(['Seurat']) == {'Seurat': tags[0].id}
+
+
+def test_stale_cache_after_rename_elsewhere(app, seed):
+    with app.app_context():
+        old_id = resolve_tags(['Seurat'])[0].id
+        db.session.commit()
+        # 标签在别处改名：缓存中的 id 现在属于另一个名称
+        db.session.execute(update(Tag).where(Tag.id == old_id).values(name='Scanpy'))
+        db.session.commit()
+
+        assert [tag.name for tag in resolve_tags(['Seurat'])] == ['Seurat']
+        db.session.commit()
+        ids = resolve_tag_ids(['Seurat', 'Scanpy'])
+        assert ids['Scanpy'] == old_id and ids['Seurat'] != old_id
+
+        # resolve_tag_ids 同样校验缓存
+        db.session.execute(delete(Tag).where(Tag.id == ids['Seurat']))
+        db.session.commit()
+        new_ids = resolve_tag_ids(['Seurat'])
+        db.session.commit()
+        assert db.session.get(Tag, new_ids['Seurat']).name == 'Seurat'
+
+
+def test_tag_delete_and_rename_invalidate_cache(client, seed, make_code):
+    code_id = make_code(tags=['Seurat', 'UMAP'])
+    with client.application.app_context():
+        tag_ids = dict(db.session.query(Tag.name, Tag.id).all())
+
+    assert client.delete(f"/api/tags/{tag_ids['Seurat']}", headers=seed.admin).status_code == 200
+    response = client.put(f"/api/tags/{tag_ids['UMAP']}", json={'name': 't-SNE'}, headers=seed.admin)
+    assert response.status_code == 200
+    with client.application.app_context():
+        assert tag_id_cache.get_many(['Seurat', 'UMAP', 't-SNE']) == {}
+
+    other_id = make_code(tags=['Seurat', 'UMAP'])
+    with client.application.app_context():
+        names = {code.id: sorted(tag.name for tag in code.tags) for code in Code.query.all()}
+        assert names[other_id] == ['Seurat', 'UMAP']
+        assert names[code_id] == ['t-SNE']
+        assert Tag.query.filter_by(name='Seurat').one().id != tag_ids['Seurat']
+
+
+def test_cache_is_reset_when_full():
+    cache = TagIdCache(max_size=2)
+    cache.update({'a': 1, 'b': 2})
+    cache.update({'c': 3})
+    assert cache.get_many(['a', 'b', 'c']) == {'c': 3}
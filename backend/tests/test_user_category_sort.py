@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import update
+
+from models import db
+from models.user_category import UserCategory
+
+
+@pytest.fixture
+def categories(client, seed):
+    """bob 的四个分类，返回按创建顺序的 id"""
+    ids = []
+    for name in ('比对', '定量', '差异分析', '富集'):
+        response = client.post('/api/user/categories', json={'name': name}, headers=seed.bob)
+        assert response.status_code == 201
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def _sort(client, seed, body, headers=None):
+    return client.post('/api/user/categories/sort', json=body, headers=headers or seed.bob)
+
+
+def _stored_order(app, user_id):
+    with app.app_context():
+        rows = UserCategory.query.filter_by(user_id=user_id).order_by(UserCategory.sort_order).all()
+        return [row.id for row in rows], [row.sort_order for row in rows]
+
+
+def test_full_reorder_keeps_unlisted_after(app, client, seed, categories):
+    a, b, c, d = categories
+    response = _sort(client, seed, {'category_orders': [c, a]})
+    assert response.status_code == 200
+    assert response.get_json()['category_orders'] == [c, a, b, d]
+    assert _stored_order(app, seed.bob_id) == ([c, a, b, d], [1, 2, 3, 4])
+
+
+@pytest.mark.parametrize('moved, after, expected', [
+    ('c', 'd', 'abdc'),
+    ('a', 'c', 'bcad'),
+    ('d', None, 'dabc'),
+    ('d', 'missing', 'dabc'),
+    ('b', 'a', 'abcd'),
+])
+def test_partial_move(app, client, seed, categories, moved, after, expected):
+    named = dict(zip('abcd', categories))
+    body = {'id': named[moved]}
+    if after != 'missing':
+        # after_id 缺省与 null 一样表示移到最前
+        body['after_id'] = named[after] if after else None
+
+    response = _sort(client, seed, body)
+    assert response.status_code == 200
+    order = [named[name] for name in expected]
+    assert response.get_json()['category_orders'] == order
+    assert _stored_order(app, seed.bob_id) == (order, [1, 2, 3, 4])
+
+
+def test_partial_move_only_updates_changed_rows(app, client, seed, categories):
+    a, b, c, d = categories
+    # 排序值有间隔：移动后整体重排为 1..n，但已在正确位置的行不写
+    with app.app_context():
+        db.session.execute(update(UserCategory).where(UserCategory.id == d).values(sort_order=10))
+        db.session.commit()
+
+    response = _sort(client, seed, {'id': b, 'after_id': c})
+    assert response.status_code == 200
+    assert _stored_order(app, seed.bob_id) == ([a, c, b, d], [1, 2, 3, 4])
+
+    # 顺序未变化时不执行 UPDATE
+    with app.app_context():
+        before = {row.id: row.updated_at for row in UserCategory.query.all()}
+    assert _sort(client, seed, {'id': c, 'after_id': a}).status_code == 200
+    with app.app_context():
+        assert {row.id: row.updated_at for row in UserCategory.query.all()} == before
+
+
+def test_move_rejects_foreign_self_and_missing_ids(app, client, seed, categories):
+    a, b, c, d = categories
+    other = client.post('/api/user/categories', json={'name': '别人的'}, headers=seed.admin).get_json()['id']
+
+    assert _sort(client, seed, {'id': a, 'after_id': other}).status_code == 404
+    assert _sort(client, seed, {'id': other, 'after_id': a}).status_code == 404
+    assert _sort(client, seed, {'id': 999}).status_code == 404
+    assert _sort(client, seed, {'id': a, 'after_id': a}).status_code == 400
+    assert _sort(client, seed, {}).status_code == 400
+    assert _sort(client, seed, {'category_orders': [a, a]}).status_code == 400
+    assert _sort(client, seed, {'category_orders': [a, 'x']}).status_code == 400
+    assert _sort(client, seed, {'category_orders': [a, other]}).status_code == 404
+    assert _stored_order(app, seed.bob_id)[0] == [a, b, c, d]
+    assert _stored_order(app, seed.alice_id)[0] == [other]
@@ -0,0 +1,69 @@
+import threading
+
+import fakeredis
+import pytest
+
+from utils.view_counter import MemoryViewBuffer, RedisViewBuffer, ViewCounter
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def buffer(request):
+    if request.param == 'memory':
+        return MemoryViewBuffer()
+    return RedisViewBuffer(fakeredis.FakeRedis())
+
+
+def test_add_returns_running_total(buffer):
+    assert buffer.add(1) == 1
+    assert buffer.add(2, 3) == 4
+    assert buffer.add(1) == 5
+    assert buffer.pending() == 5
+    assert buffer.pending_for(1) == 2
+
+
+def test_drain_and_restore_keep_total(buffer):
+    buffer.add(1, 2)
+    buffer.add(2, 3)
+
+    counts = buffer.drain()
+    assert counts == {1: 2, 2: 3}
+    assert buffer.pending() == 0
+    assert buffer.add(3) == 1
+
+    buffer.restore(counts)
+    assert buffer.pending() == 6
+    assert buffer.drain() == {1: 2, 2: 3, 3: 1}
+    assert buffer.pending() == 0
+
+
+def test_flush_thread_starts_once():
+    counter = ViewCounter(MemoryViewBuffer(), flush_interval=3600)
+    barrier = threading.Barrier(8)
+
+    def record():
+        barrier.wait()
+        counter._ensure_thread()
+
+    before = {t for t in threading.enumerate() if t.name == 'view-counter-flush'}
+    workers = [threading.Thread(target=record) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    started = {t for t in threading.enumerate() if t.name == 'view-counter-flush'} - before
+    counter._stop.set()
+    assert len(started) == 1
+
+
+def test_flush_keeps_detail_etag(app, client, make_code):
+    code_id = make_code()
+    response = client.get(f'/api/codes/{code_id}')
+    etag = response.headers['ETag']
+
+    counter = app.extensions['view_counter']
+    counter.record(code_id)
+    assert counter.flush() >= 1
+
+    response = client.get(f'/api/codes/{code_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert client.get(f'/api/codes/{code_id}').get_json()['views'] >= 2
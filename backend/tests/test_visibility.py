@@ -0,0 +1,22 @@
+def _ids(client, headers=None):
+    response = client.get('/api/codes', headers=headers)
+    assert response.status_code == 200
+    return sorted(code['id'] for code in response.get_json()['codes'])
+
+
+def test_list_visibility(client, seed, make_code):
+    approved = make_code(headers=seed.admin)
+    own_pending = make_code(approve=False)
+    other_pending = make_code(headers=seed.admin, approve=False)
+
+    assert _ids(client) == [approved]
+    assert _ids(client, seed.bob) == sorted([approved, own_pending])
+    assert _ids(client, seed.admin) == sorted([approved, own_pending, other_pending])
+
+
+def test_detail_visibility(client, seed, make_code):
+    pending = make_code(approve=False)
+
+    assert client.get(f'/api/codes/{pending}').status_code == 404
+    assert client.get(f'/api/codes/{pending}', headers=seed.bob).status_code == 200
+    assert client.get(f'/api/codes/{pending}', headers=seed.admin).status_code == 200
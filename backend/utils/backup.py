@@ -0,0 +1,262 @@
+"""
+全量备份 / 恢复（NDJSON，`flask backup` / `flask restore`）
+- 文件格式：每行一个 JSON
+    {"backup": 1, "created_at": ..., "dialect": "sqlite", "tables": [...]}   文件头
+    {"table": "users", "columns": [...], "count": N}                          表头
+    [1, "alice", ...]                                                          行（按 columns 顺序）
+    {"end": true, "counts": {"users": N, ...}}                                 文件尾（缺失说明文件被截断）
+- 按后缀压缩：.zst（需要 zstandard）/ .gz / 其他为明文
+- 备份：按主键顺序读取，stream_results 使用服务端游标（MySQL SSCursor），yield_per 分块取行，
+  内存只与分块大小有关
+- 恢复：按外键依赖顺序建表写入，Core executemany 分批插入并逐批提交；
+  写入期间关闭外键检查（MySQL FOREIGN_KEY_CHECKS=0 / SQLite foreign_keys=OFF），完成后恢复
+- 日期时间以 ISO 8601 字符串保存，恢复时按列类型还原；可用于 SQLite → MySQL 迁移
+"""
+import gzip
+import io
+import json
+import time
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, func, select
+
+from models import db
+from utils.serialization import get_encoder, orjson
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 可选依赖
+    zstandard = None
+
+BACKUP_FORMAT_VERSION = 1
+BACKUP_TABLES = (
+    'users', 'categories', 'user_categories', 'tags', 'codes',
+    'results', 'code_tags', 'comments', 'favorites',
+)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class BackupError(Exception):
+    """备份文件无效或目标数据库不满足恢复条件"""
+
+
+def backup_tables():
+    """按外键依赖排序（被引用的表在前）"""
+    return [table for table in db.metadata.sorted_tables if table.name in BACKUP_TABLES]
+
+
+def open_backup(path, mode):
+    """按后缀选择压缩方式打开备份文件（mode 为 'rb' / 'wb'）"""
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise BackupError('zstd compression requires the zstandard package')
+        raw = open(path, mode)
+        if 'w' in mode:
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True))
+    if path.endswith('.gz'):
+        return gzip.open(path, mode, compresslevel=6)
+    return open(path, mode)
+
+
+class _Progress:
+    """每 interval 秒输出一次进度"""
+
+    def __init__(self, log, label, total, interval=2.0):
+        self.log = log
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.started = self.last = time.monotonic()
+
+    def update(self, done, force=False):
+        now = time.monotonic()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        rate = done / max(now - self.started, 1e-6)
+        total = f'/{self.total}' if self.total is not None else ''
+        self.log(f'{self.label}: {done}{total} 行（{rate:.0f} 行/秒）')
+
+
+def dump(path, chunk_size=1000, log=print, engine=None):
+    """把全部业务表写入备份文件，返回 {表名: 行数}"""
+    engine = engine or db.engine
+    dumps = get_encoder()[1]
+    tables = backup_tables()
+    counts = {}
+
+    with open_backup(path, 'wb') as out, engine.connect() as connection:
+        out.write(dumps({
+            'backup': BACKUP_FORMAT_VERSION,
+            'created_at': datetime.utcnow().isoformat(),
+            'dialect': connection.dialect.name,
+            'tables': [table.name for table in tables],
+        }) + b'\n')
+
+        for table in tables:
+            total = connection.execute(select(func.count()).select_from(table)).scalar()
+            columns = [column.name for column in table.columns]
+            out.write(dumps({'table': table.name, 'columns': columns, 'count': total}) + b'\n')
+
+            progress = _Progress(log, table.name, total)
+            result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+                select(*table.columns).order_by(*table.primary_key.columns)
+            )
+            done = 0
+            for rows in result.partitions():
+                out.write(b''.join(dumps(list(row)) + b'\n' for row in rows))
+                done += len(rows)
+                progress.update(done)
+            result.close()
+            progress.update(done, force=True)
+            counts[table.name] = done
+
+        out.write(dumps({'end': True, 'counts': counts}) + b'\n')
+    return counts
+
+
+def _converters(table, columns):
+    """按列类型把 JSON 值还原为 Python 值（日期时间）"""
+    converters = []
+    for name in columns:
+        if name is None:
+            converters.append(None)
+            continue
+        column_type = table.columns[name].type
+        if isinstance(column_type, DateTime):
+            converters.append(lambda v: datetime.fromisoformat(v) if isinstance(v, str) else v)
+        elif isinstance(column_type, Date):
+            converters.append(lambda v: date.fromisoformat(v) if isinstance(v, str) else v)
+        else:
+            converters.append(None)
+    return converters
+
+
+def _set_foreign_key_checks(connection, enabled):
+    dialect = connection.dialect.name
+    if dialect == 'mysql':
+        connection.exec_driver_sql(f'SET FOREIGN_KEY_CHECKS={1 if enabled else 0}')
+    elif dialect == 'sqlite':
+        # 必须在事务外执行
+        connection.exec_driver_sql(f'PRAGMA foreign_keys={"ON" if enabled else "OFF"}')
+    connection.commit()
+
+
+def _after_restore(connection, log):
+    """恢复后的收尾：回填旧备份中的 NULL 审核状态，重建 SQLite 全文索引，检查外键"""
+    from utils.migrations import backfill_code_status
+    from utils.search import ensure_search_index, rebuild_search_index
+
+    backfill_code_status(connection)
+    ensure_search_index(connection)
+    if connection.dialect.name == 'sqlite':
+        log(f'全文索引：{rebuild_search_index(connection)} 条代码')
+        violations = connection.exec_driver_sql('PRAGMA foreign_key_check').fetchall()
+        if violations:
+            log(f'警告：{len(violations)} 行外键引用不存在（见 PRAGMA foreign_key_check）')
+
+
+def restore(path, batch_size=1000, truncate=False, log=print, engine=None):
+    """
+    从备份文件恢复，返回 {表名: 行数}。
+    目标表必须为空；truncate=True 时先按依赖逆序清空。表结构由 db.create_all() 补齐。
+    """
+    engine = engine or db.engine
+    tables = {table.name: table for table in backup_tables()}
+    db.metadata.create_all(engine, tables=list(tables.values()))
+
+    with engine.connect() as connection:
+        existing = {
+            name: connection.execute(select(func.count()).select_from(table)).scalar()
+            for name, table in tables.items()
+        }
+        connection.commit()
+        if any(existing.values()) and not truncate:
+            busy = ', '.join(f'{name}={count}' for name, count in existing.items() if count)
+            raise BackupError(f'Target tables are not empty ({busy}); use --truncate to replace them')
+
+        _set_foreign_key_checks(connection, False)
+        try:
+            if truncate:
+                with connection.begin():
+                    for table in reversed(list(tables.values())):
+                        connection.execute(table.delete())
+            counts = _load(connection, path, tables, batch_size, log)
+        finally:
+            _set_foreign_key_checks(connection, True)
+
+        with connection.begin():
+            _after_restore(connection, log)
+    return counts
+
+
+def _load(connection, path, tables, batch_size, log):
+    try:
+        return _load_records(connection, path, tables, batch_size, log)
+    except (ValueError, EOFError) as e:
+        # 文件在行中间被截断（JSON 不完整）或压缩流不完整（gzip EOFError）
+        raise BackupError(f'Backup file is truncated or corrupt ({e}); committed batches were kept') from e
+
+
+def _load_records(connection, path, tables, batch_size, log):
+    counts = {}
+    finished = False
+    table = columns = converters = progress = None
+    skipping = False
+    batch = []
+
+    def flush():
+        if batch:
+            with connection.begin():
+                connection.execute(table.insert(), batch)
+            counts[table.name] += len(batch)
+            progress.update(counts[table.name])
+            batch.clear()
+
+    with open_backup(path, 'rb') as src:
+        header = _loads(src.readline() or b'null')
+        if not isinstance(header, dict) or header.get('backup') != BACKUP_FORMAT_VERSION:
+            raise BackupError('Not a backup file (missing or unsupported header)')
+
+        for line in src:
+            record = _loads(line)
+            if isinstance(record, list):
+                if table is None and not skipping:
+                    raise BackupError('Row before table header')
+                if not skipping:
+                    batch.append({
+                        name: (convert(value) if convert else value)
+                        for name, value, convert in zip(columns, record, converters)
+                        if name is not None
+                    })
+                    if len(batch) >= batch_size:
+                        flush()
+                continue
+
+            if table is not None:
+                flush()
+                progress.update(counts[table.name], force=True)
+            if record.get('end'):
+                finished = True
+                break
+
+            name = record['table']
+            table = tables.get(name)
+            skipping = table is None
+            if skipping:
+                log(f'跳过未知表：{name}')
+                continue
+            # 备份中有、当前结构中没有的列丢弃；当前结构新增的列使用默认值
+            unknown = [column for column in record['columns'] if column not in table.columns]
+            if unknown:
+                log(f'{name}: 忽略已不存在的列 {", ".join(unknown)}')
+            columns = [column if column in table.columns else None for column in record['columns']]
+            converters = _converters(table, columns)
+            counts[name] = 0
+            progress = _Progress(log, name, record.get('count'))
+
+    if not finished:
+        raise BackupError('Backup file is truncated (missing end marker); committed batches were kept')
+    return counts
@@ -0,0 +1,210 @@
+"""
+内容寻址的图片存储
+- 文件按 SHA-256 命名：<BLOB_STORAGE_DIR>/<前2位>/<3-4位>/<sha256>.<ext>，相同图片只存一份
+- 对外 URL：/api/blobs/<sha256>.<ext>；内容不可变，可以永久缓存
+- 类型按文件头识别（PNG/JPEG/GIF/WebP），不信任客户端声明；SVG 可内嵌脚本，不接受
+- 写入先落临时文件再原子改名，并发上传同一图片不会读到半个文件
+
+内联 base64（data:image/...;base64,...）在写入代码/结果时替换为短 URL（externalize_data_urls），
+历史数据用 `flask blobs-migrate` 分批迁移。
+"""
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import bindparam, select, update
+
+from models import db
+from models.code import Code
+from models.result import Result
+
+BLOB_URL_PREFIX = '/api/blobs/'
+BLOB_NAME_RE = re.compile(r'^[0-9a-f]{64}\.(png|jpg|gif|webp)$')
+# 尺寸变体（见 utils/image_variants.py）：<sha256>.<thumb|detail>.<webp|jpg>
+BLOB_VARIANT_RE = re.compile(r'^([0-9a-f]{64})\.(thumb|detail)\.(webp|jpg)$')
+DATA_URL_RE = re.compile(r'data:image/[a-zA-Z0-9.+-]+;base64,([A-Za-z0-9+/]+={0,2})')
+
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'jpg': 'image/jpeg',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+}
+
+
+class BlobError(ValueError):
+    """图片内容无效或超出大小限制"""
+
+
+def sniff_image_type(data):
+    """按文件头返回扩展名；不是支持的图片类型时返回 None"""
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+class BlobStore:
+    def __init__(self, root, max_size=10 * 1024 * 1024):
+        self.root = root
+        self.max_size = max_size
+
+    def relative_path(self, name):
+        return os.path.join(name[:2], name[2:4], name)
+
+    def path_for(self, name):
+        return os.path.join(self.root, self.relative_path(name))
+
+    def put(self, data):
+        """保存图片，返回 (文件名, 是否新写入)"""
+        if len(data) > self.max_size:
+            raise BlobError(f'Image exceeds {self.max_size // (1024 * 1024)}MB limit')
+        ext = sniff_image_type(data)
+        if ext is None:
+            raise BlobError('Unsupported image type')
+
+        name = f'{hashlib.sha256(data).hexdigest()}.{ext}'
+        path = self.path_for(name)
+        if os.path.exists(path):
+            return name, False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return name, True
+
+    def exists(self, name):
+        return bool(BLOB_NAME_RE.match(name)) and os.path.exists(self.path_for(name))
+
+
+def blob_mimetype(name):
+    """原图或变体文件名对应的 Content-Type；文件名无效时返回 None"""
+    match = BLOB_NAME_RE.match(name) or BLOB_VARIANT_RE.match(name)
+    return CONTENT_TYPES[match.groups()[-1]] if match else None
+
+
+def find_original(store, sha):
+    """按哈希查找原图文件名（扩展名未知）"""
+    for ext in CONTENT_TYPES:
+        name = f'{sha}.{ext}'
+        if os.path.exists(store.path_for(name)):
+            return name
+    return None
+
+
+def blob_url(name):
+    return BLOB_URL_PREFIX + name
+
+
+def externalize_data_urls(text, store):
+    """
+    把文本中的 data:image/...;base64,... 存入图片存储并替换为 /api/blobs/ URL。
+    返回 (新文本, 替换数量)；无法解码或不是支持的图片时保留原文。
+    """
+    if not text or 'data:image/' not in text:
+        return text, 0
+
+    replaced = 0
+
+    def _replace(match):
+        nonlocal replaced
+        try:
+            data = base64.b64decode(match.group(1), validate=True)
+            name, _ = store.put(data)
+        except (binascii.Error, BlobError):
+            return match.group(0)
+        replaced += 1
+        return blob_url(name)
+
+    return DATA_URL_RE.sub(_replace, text), replaced
+
+
+def _rewrite_batch(table, rows, store):
+    """转存一批行中的图片，返回 (替换的图片数, 被修改的行)"""
+    changed = []
+    images = 0
+    for row in rows:
+        content, n = externalize_data_urls(row.content, store)
+        if n:
+            images += n
+            changed.append((row, content))
+    if changed:
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(content=bindparam('b_content')),
+            [{'b_id': row.id, 'b_content': content} for row, content in changed],
+        )
+    return images, changed
+
+
+def migrate_inline_images(store, batch_size=50, dry_run=False, log=print):
+    """
+    把 codes.content 与 results.content 中的内联 base64 图片转存为文件。
+    按主键分批读取（每批 batch_size 行）并逐批提交，单批失败不影响已提交的批次，可重复执行。
+    结果行被改写时同时刷新所属代码的 updated_at，使详情 ETag 失效。
+    """
+    stats = {'codes': 0, 'results': 0, 'images': 0}
+    for model, key in ((Code, 'codes'), (Result, 'results')):
+        table = model.__table__
+        columns = [table.c.id, table.c.content] + ([table.c.code_id] if model is Result else [])
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(*columns)
+                .where(table.c.id > last_id, table.c.content.like('%data:image/%'))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            images, changed = _rewrite_batch(table, rows, store)
+            if changed and model is Result:
+                db.session.execute(
+                    update(Code.__table__)
+                    .where(Code.__table__.c.id.in_({row.code_id for row, _ in changed}))
+                    .values(updated_at=datetime.utcnow())
+                )
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            stats[key] += len(changed)
+            stats['images'] += images
+            log(f'{key}: 已处理至 id={last_id}，本批改写 {len(changed)} 行 / {images} 张图片')
+    return stats
+
+
+def get_blob_store(app=None):
+    from flask import current_app
+    return (app or current_app).extensions['blob_store']
+
+
+def init_blob_store(app):
+    """
+    BLOB_STORAGE_DIR：存储目录（默认 instance/blobs）
+    BLOB_MAX_SIZE：单张图片字节上限（默认 10MB）
+    BLOB_ACCEL_REDIRECT：nginx internal location 前缀（如 /_blobs/）；设置后下载由 nginx 直接发送文件
+    """
+    root = os.getenv('BLOB_STORAGE_DIR') or os.path.join(app.instance_path, 'blobs')
+    store = BlobStore(root, max_size=int(os.getenv('BLOB_MAX_SIZE', 10 * 1024 * 1024)))
+    app.config.setdefault('BLOB_ACCEL_REDIRECT', os.getenv('BLOB_ACCEL_REDIRECT', ''))
+    app.extensions['blob_store'] = store
+    return store
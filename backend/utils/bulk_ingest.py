@@ -0,0 +1,219 @@
+"""
+批量导入代码（POST /api/codes/bulk）
+- 每条先用 CodeCreateSchema 校验；分类不存在、用户分类不属于当前用户的条目单独报错，不影响其他条目
+- 全部标签一次解析（utils/tags.resolve_tag_ids），不存在的批量创建
+- results / code_tags 用 Core executemany 写入，每 chunk_size 条一个事务；
+  某个事务失败只影响该批条目
+- codes 用多行 INSERT（每条语句至多 INSERT_BATCH_ROWS 行），支持 RETURNING 的数据库直接取回 id，
+  MySQL 从 lastrowid（首行 id）起按作者取回 id
+- 计数列按批汇总，增量相同的行合并为一条 UPDATE；SQLite 全文索引批量写入
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+from marshmallow import ValidationError
+from sqlalchemy import insert, select
+
+from models import db
+from models.category import Category
+from models.code import Code
+from models.code_tag import CodeTag
+from models.result import Result
+from models.tag import Tag
+from models.user_category import UserCategory
+from schemas.validation import CodeCreateSchema
+from utils.blob_store import externalize_data_urls, get_blob_store
+from utils.counters import adjust_counters
+from utils.search import index_codes
+from utils.tags import normalize_tag_names, resolve_tag_ids
+
+RESULT_TYPES = ('image', 'text', 'chart', 'table', 'markdown')
+
+# 每条多行 INSERT 的行数：17 列 × 100 行的参数量在 SQLite 变量上限（32766）以内
+INSERT_BATCH_ROWS = 100
+
+
+def _validate_results(results):
+    """结果列表：type 取值与 content 类型；返回 (清洗后的列表, 错误)"""
+    cleaned = []
+    for index, result in enumerate(results):
+        result_type = result.get('type', 'text')
+        content = result.get('content', '')
+        description = result.get('description', '') or ''
+        if result_type not in RESULT_TYPES:
+            return None, {'results': {index: [f'type must be one of {", ".join(RESULT_TYPES)}']}}
+        if not isinstance(content, str) or not isinstance(description, str):
+            return None, {'results': {index: ['content and description must be strings']}}
+        cleaned.append({'type': result_type, 'content': content, 'description': description[:200]})
+    return cleaned, None
+
+
+def validate_items(items, user_id):
+    """
+    校验全部条目，返回 (有效条目 [(下标, 数据)], 错误 {下标: errors})。
+    分类与用户分类各用一条 IN 查询检查。
+    """
+    schema = CodeCreateSchema()
+    valid = []
+    errors = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {'_schema': ['item must be an object']}
+            continue
+        try:
+            data = schema.load(item)
+        except ValidationError as e:
+            errors[index] = e.messages
+            continue
+        data['results'], result_errors = _validate_results(data['results'])
+        if result_errors:
+            errors[index] = result_errors
+            continue
+        valid.append((index, data))
+
+    category_ids = {data['category_id'] for _, data in valid}
+    user_category_ids = {data['user_category_id'] for _, data in valid if data['user_category_id']}
+    known_categories = set(db.session.execute(
+        select(Category.id).where(Category.id.in_(category_ids))
+    ).scalars()) if category_ids else set()
+    own_user_categories = set(db.session.execute(
+        select(UserCategory.id).where(UserCategory.id.in_(user_category_ids), UserCategory.user_id == user_id)
+    ).scalars()) if user_category_ids else set()
+
+    checked = []
+    for index, data in valid:
+        if data['category_id'] not in known_categories:
+            errors[index] = {'category_id': ['分类不存在']}
+        elif data['user_category_id'] and data['user_category_id'] not in own_user_categories:
+            errors[index] = {'user_category_id': ['用户分类不存在']}
+        else:
+            checked.append((index, data))
+    return checked, errors
+
+
+def _insert_codes(connection, rows):
+    """写入一批代码，返回与 rows 顺序一致的 id 列表"""
+    ids = []
+    for start in range(0, len(rows), INSERT_BATCH_ROWS):
+        ids.extend(_insert_code_batch(connection, rows[start:start + INSERT_BATCH_ROWS]))
+    return ids
+
+
+def _insert_code_batch(connection, rows):
+    """
+    一条多行 INSERT 写入 rows。同一语句生成的自增 id 按 VALUES 顺序递增：
+    - 支持 RETURNING（SQLite 3.35+、PostgreSQL、MariaDB 10.5+）：取回 id 后排序即为行顺序
+    - MySQL：lastrowid 为首行 id；innodb_autoinc_lock_mode=2 时并发插入可能使 id 不连续，
+      因此不按区间推算，而是从首行 id 起按作者取回
+    """
+    table = Code.__table__
+    statement = insert(table).values(rows)
+    if connection.dialect.insert_returning:
+        return sorted(connection.execute(statement.returning(table.c.id)).scalars())
+    first_id = connection.execute(statement).lastrowid
+    ids = list(connection.execute(
+        select(table.c.id)
+        .where(table.c.id >= first_id, table.c.author_id == rows[0]['author_id'])
+        .order_by(table.c.id)
+        .limit(len(rows))
+    ).scalars())
+    if len(ids) != len(rows):
+        raise RuntimeError(f'bulk insert returned {len(ids)} ids for {len(rows)} rows')
+    return ids
+
+
+def _write_chunk(chunk, tag_ids, user_id, store):
+    """在当前事务中写入一批 (下标, 数据)，返回代码 id 列表"""
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    rows = [{
+        'title': data['title'],
+        'description': data['description'],
+        'content': externalize_data_urls(data['content'], store)[0],
+        'language': data['language'],
+        'category_id': data['category_id'],
+        'user_category_id': data['user_category_id'],
+        'author_id': user_id,
+        'environment': data['environment'],
+        'license': data['license'],
+        'status': 'pending',
+        'views': 0,
+        'likes': 0,
+        'downloads': 0,
+        'comment_count': 0,
+        'favorite_count': 0,
+        'created_at': now,
+        'updated_at': now,
+    } for _, data in chunk]
+    ids = _insert_codes(connection, rows)
+
+    results = []
+    code_tags = []
+    category_deltas = {}
+    user_category_deltas = {}
+    tag_deltas = {}
+    for code_id, (_, data) in zip(ids, chunk):
+        for result in data['results']:
+            results.append({
+                'code_id': code_id,
+                'type': result['type'],
+                'content': externalize_data_urls(result['content'], store)[0],
+                'description': result['description'],
+                'created_at': now,
+            })
+        for name in normalize_tag_names(data['tags']):
+            if name in tag_ids:
+                code_tags.append({'code_id': code_id, 'tag_id': tag_ids[name]})
+                tag_deltas[tag_ids[name]] = tag_deltas.get(tag_ids[name], 0) + 1
+        category_deltas[data['category_id']] = category_deltas.get(data['category_id'], 0) + 1
+        if data['user_category_id']:
+            user_category_deltas[data['user_category_id']] = user_category_deltas.get(data['user_category_id'], 0) + 1
+
+    if results:
+        connection.execute(insert(Result.__table__), results)
+    if code_tags:
+        connection.execute(insert(CodeTag.__table__), code_tags)
+    adjust_counters(Category, 'code_count', category_deltas)
+    adjust_counters(UserCategory, 'code_count', user_category_deltas)
+    adjust_counters(Tag, 'code_count', tag_deltas)
+    index_codes(connection, [
+        SimpleNamespace(id=code_id, title=row['title'], description=row['description'])
+        for code_id, row in zip(ids, rows)
+    ])
+    return ids, results
+
+
+def ingest_codes(items, user_id, chunk_size=200, logger=None):
+    """
+    批量导入，返回 (逐条状态列表, 写入的图片结果)。
+    状态：{'index', 'status': 'created', 'id'} 或 {'index', 'status': 'error', 'errors'}
+    """
+    valid, errors = validate_items(items, user_id)
+    statuses = {index: {'index': index, 'status': 'error', 'errors': messages} for index, messages in errors.items()}
+    image_results = []
+
+    # 标签单独提交：后续某批失败回滚时不会让缓存中留下未提交的标签 id
+    all_tags = [name for _, data in valid for name in data['tags']]
+    tag_ids = resolve_tag_ids(all_tags)
+    db.session.commit()
+
+    store = get_blob_store()
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            ids, results = _write_chunk(chunk, tag_ids, user_id, store)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            if logger is not None:
+                logger.exception('Bulk code import chunk failed')
+            for index, _ in chunk:
+                statuses[index] = {'index': index, 'status': 'error', 'errors': {'_schema': ['Internal server error']}}
+            continue
+        for code_id, (index, _) in zip(ids, chunk):
+            statuses[index] = {'index': index, 'status': 'created', 'id': code_id}
+        image_results.extend(
+            Result(type=result['type'], content=result['content']) for result in results if result['type'] == 'image'
+        )
+
+    return [statuses[index] for index in sorted(statuses)], image_results
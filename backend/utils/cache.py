@@ -1,136 +1,435 @@
+from collections import OrderedDict
 from functools import wraps
 from flask import current_app, request
 import json
 import hashlib
+import os
+import sys
+import threading
 import time
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
+
+from utils.metrics import record_cache_result
+from utils.redis_client import get_redis_client
+
+# 未按分类筛选的列表页使用该标签，任何可见性变化都需要清理
+CATEGORY_ALL_TAG = 'category:all'
+
+# 列表版本号：每次缓存失效时递增，用于生成列表 ETag（见 utils/conditional.py）
+LIST_VERSION = 'list'
+
+
+def _initial_version() -> int:
+    # 以毫秒时间戳起步：进程重启/版本键被清理后不会与旧版本号重复
+    return int(time.time() * 1000)
+
 
 class SimpleMemoryCache:
-    """简单内存缓存实现"""
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
-    
+    """
+    进程内 LRU 缓存（Redis 不可用时的回退）
+    - OrderedDict 维护访问顺序，get/set/淘汰均为 O(1)
+    - TTL 在访问时惰性检查；容量按条目数与字节预算（序列化后大小）双重限制
+    - 使用锁保证 gunicorn --threads 下的线程安全
+    """
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # key -> (value, expires_at, size)
+        self._tags = {}              # tag -> set(key)
+        self._key_tags = {}          # key -> set(tag)
+        self._versions = {}          # name -> int
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
     def get(self, key: str) -> Optional[Any]:
         """获取缓存值"""
-        if key in self._cache:
-            timestamp, ttl = self._timestamps.get(key, (0, 0))
-            if ttl == 0 or (time.time() - timestamp) < ttl:
-                return self._cache[key]
-            else:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at and expires_at <= time.monotonic():
                 # 过期删除
-                self.delete(key)
-        return None
-    
-    def set(self, key: str, value: Any, ttl: int = 300) -> None:
-        """设置缓存值，ttl为过期时间（秒）"""
-        self._cache[key] = value
-        self._timestamps[key] = (time.time(), ttl)
-        
-        # 简单的内存清理：超过1000条时清理过期项
-        if len(self._cache) > 1000:
-            self._cleanup_expired()
-    
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: int = 300, tags: Iterable[str] = ()) -> None:
+        """设置缓存值，ttl为过期时间（秒，0表示不过期），tags为依赖标签"""
+        size = _value_size(value)
+        expires_at = time.monotonic() + ttl if ttl else 0
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                # 单条超过预算的值不缓存；旧值已删除，避免之后读到过期数据
+                return
+            self._cache[key] = (value, expires_at, size)
+            self._bytes += size
+            self._attach_tags(key, tags)
+            while len(self._cache) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._cache))
+                self._remove(oldest)
+                self.evictions += 1
+
     def delete(self, key: str) -> None:
         """删除缓存项"""
-        self._cache.pop(key, None)
-        self._timestamps.pop(key, None)
-    
+        with self._lock:
+            self._remove(key)
+
     def clear(self) -> None:
         """清空所有缓存"""
-        self._cache.clear()
-        self._timestamps.clear()
-    
-    def _cleanup_expired(self) -> None:
-        """清理过期缓存项"""
-        now = time.time()
-        expired_keys = []
-        
-        for key, (timestamp, ttl) in self._timestamps.items():
-            if ttl > 0 and (now - timestamp) >= ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            self.delete(key)
-
-# 全局缓存实例
-_memory_cache = SimpleMemoryCache()
-
-def cached_response(ttl: int = 300, key_prefix: str = ""):
-    """API响应缓存装饰器"""
+        with self._lock:
+            self._cache.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+            self._bytes = 0
+
+    def keys(self):
+        """当前所有缓存键"""
+        with self._lock:
+            return list(self._cache.keys())
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """删除带有任一标签的缓存项，返回删除条数"""
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def get_version(self, name: str) -> int:
+        """读取版本号"""
+        with self._lock:
+            return self._versions.setdefault(name, _initial_version())
+
+    def bump_version(self, name: str) -> int:
+        """版本号加一"""
+        with self._lock:
+            version = self._versions.get(name, _initial_version()) + 1
+            self._versions[name] = version
+            return version
+
+    def stats(self) -> dict:
+        """命中/未命中/淘汰计数与内存占用"""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._cache),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _remove(self, key: str) -> None:
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _attach_tags(self, key: str, tags: Iterable[str]) -> None:
+        tags = set(tags or ())
+        if tags:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+
+def _value_size(value: Any) -> int:
+    """估算缓存值占用的字节数（按 JSON 序列化后的长度）"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class RedisCache:
+    """
+    Redis 缓存实现（多 worker / 多容器共享）
+    - 值以 JSON 存储；(data, status_code) 元组会还原为元组
+    - 每个标签对应一个 Redis SET，记录依赖该标签的缓存键
+    - client 可注入（例如 fakeredis.FakeRedis()），便于测试
+    """
+    TAG_TTL = 86400
+
+    def __init__(self, client, namespace: str = 'cache'):
+        self._client = client
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self._namespace}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self._namespace}:tag:{tag}"
+
+    def _version_key(self, name: str) -> str:
+        return f"{self._namespace}:version:{name}"
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._key(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        if payload.get('tuple'):
+            return tuple(payload['value'])
+        return payload['value']
+
+    def set(self, key: str, value: Any, ttl: int = 300, tags: Iterable[str] = ()) -> None:
+        payload = json.dumps({'tuple': isinstance(value, tuple), 'value': value}, ensure_ascii=False)
+        pipe = self._client.pipeline()
+        if ttl:
+            pipe.set(self._key(key), payload, ex=ttl)
+        else:
+            pipe.set(self._key(key), payload)
+        for tag in set(tags or ()):
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, key)
+            # 标签集合按最长 TTL 续期；集合里残留的过期键在失效时 DEL 不存在的键即可
+            pipe.expire(tag_key, self.TAG_TTL)
+        pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def clear(self) -> None:
+        keys = list(self._client.scan_iter(match=f"{self._namespace}:*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def keys(self):
+        prefix = f"{self._namespace}:"
+        tag_prefix = f"{self._namespace}:tag:"
+        result = []
+        for raw in self._client.scan_iter(match=f"{prefix}*"):
+            name = raw.decode() if isinstance(raw, bytes) else raw
+            if not name.startswith(tag_prefix):
+                result.append(name[len(prefix):])
+        return result
+
+    def get_version(self, name: str) -> int:
+        key = self._version_key(name)
+        raw = self._client.get(key)
+        if raw is None:
+            self._client.set(key, _initial_version(), nx=True)
+            raw = self._client.get(key)
+        return int(raw)
+
+    def bump_version(self, name: str) -> int:
+        key = self._version_key(name)
+        pipe = self._client.pipeline()
+        pipe.set(key, _initial_version(), nx=True)
+        pipe.incr(key)
+        return int(pipe.execute()[-1])
+
+    def stats(self) -> dict:
+        """本进程的命中/未命中计数（容量与淘汰由 Redis maxmemory 策略负责）"""
+        with self._lock:
+            return {'backend': 'redis', 'hits': self.hits, 'misses': self.misses}
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [self._tag_key(tag) for tag in set(tags)]
+        if not tag_keys:
+            return 0
+        members = self._client.sunion(tag_keys)
+        keys = [self._key(m.decode() if isinstance(m, bytes) else m) for m in members]
+        self._client.delete(*(keys + tag_keys))
+        return len(keys)
+
+
+# 全局缓存实例（init_cache 之前为进程内缓存）
+_cache = SimpleMemoryCache()
+
+
+def init_cache(app, client=None):
+    """
+    根据配置选择缓存后端：
+    - CACHE_BACKEND=memory：进程内 LRU 缓存（CACHE_MAX_ENTRIES / CACHE_MAX_BYTES 控制容量）
+    - 默认：设置了 REDIS_URL 且可连接时使用 Redis，否则回退到进程内缓存
+    - client：直接注入 Redis 兼容客户端（测试可传入 fakeredis）
+    """
+    global _cache
+    backend = os.getenv('CACHE_BACKEND', '').lower()
+
+    if client is None and backend != 'memory':
+        client = get_redis_client(app.logger)
+        if client is None and backend == 'redis':
+            app.logger.warning("Redis cache unavailable, falling back to memory cache")
+
+    if client is not None:
+        _cache = RedisCache(client)
+    else:
+        _cache = SimpleMemoryCache(
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 1000)),
+            max_bytes=int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        )
+    app.extensions['cache'] = _cache
+    return _cache
+
+
+def get_cache():
+    """当前缓存后端"""
+    return _cache
+
+
+def cached_response(ttl: int = 300, key_prefix: str = "", tags=None):
+    """
+    API响应缓存装饰器
+    tags：依赖标签列表，或 callable(data, kwargs) -> 标签列表（可根据响应内容生成 code:<id> 等标签）
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             # 生成缓存键
-            cache_key = _generate_cache_key(f.__name__, key_prefix, request)
-            
-            # 尝试从缓存获取
-            cached_result = _memory_cache.get(cache_key)
+            cache_key, user_id = _generate_cache_key(f.__name__, key_prefix, request)
+
+            # 尝试从缓存获取；缓存故障时直接执行原函数
+            try:
+                cached_result = _cache.get(cache_key)
+            except Exception as e:
+                current_app.logger.warning(f"Cache get failed: {e}")
+                cached_result = None
+            record_cache_result(key_prefix or f.__name__, cached_result is not None)
             if cached_result is not None:
                 current_app.logger.debug(f"Cache hit: {cache_key}")
                 return cached_result
-            
+
             # 执行原函数
             result = f(*args, **kwargs)
-            
+
             # 只缓存成功的响应
             if isinstance(result, tuple):
                 data, status_code = result
-                if 200 <= status_code < 300:
-                    _memory_cache.set(cache_key, result, ttl)
-                    current_app.logger.debug(f"Cache set: {cache_key}")
+                if not 200 <= status_code < 300:
+                    return result
             elif isinstance(result, dict):
-                _memory_cache.set(cache_key, result, ttl)
+                data = result
+            else:
+                return result
+
+            entry_tags = {key_prefix} if key_prefix else set()
+            if tags:
+                entry_tags.update(tags(data, kwargs) if callable(tags) else tags)
+            if user_id:
+                entry_tags.add(f"user:{user_id}")
+
+            try:
+                _cache.set(cache_key, result, ttl, tags=entry_tags)
                 current_app.logger.debug(f"Cache set: {cache_key}")
-            
+            except Exception as e:
+                current_app.logger.warning(f"Cache set failed: {e}")
+
             return result
         return decorated_function
     return decorator
 
-def _generate_cache_key(func_name: str, prefix: str, request_obj) -> str:
-    """生成缓存键"""
+def _generate_cache_key(func_name: str, prefix: str, request_obj):
+    """生成缓存键，返回 (cache_key, user_id)"""
     # 基础键
     key_parts = [prefix or func_name]
-    
+
     # 添加查询参数
     if request_obj.args:
         sorted_params = sorted(request_obj.args.items())
         params_str = "&".join([f"{k}={v}" for k, v in sorted_params])
         key_parts.append(params_str)
-    
+
     # 添加用户ID（对于需要用户权限的接口）
-    try:
-        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-        verify_jwt_in_request(optional=True)
-        user_id = get_jwt_identity()
-        if user_id:
-            key_parts.append(f"user_{user_id}")
-    except Exception:
-        pass
-    
+    from utils.identity import current_user_id
+    user_id = current_user_id()
+    if user_id:
+        key_parts.append(f"user_{user_id}")
+
     # 生成最终键
     cache_key = ":".join(key_parts)
-    
+
     # 如果键太长，使用hash
     if len(cache_key) > 200:
         cache_key = hashlib.md5(cache_key.encode()).hexdigest()
-    
-    return cache_key
+
+    return cache_key, user_id
 
 def invalidate_cache(pattern: str = None):
     """清理缓存"""
     if pattern:
         # 模式匹配清理（简单实现）
-        keys_to_delete = [key for key in _memory_cache._cache.keys() if pattern in key]
+        keys_to_delete = [key for key in _cache.keys() if pattern in key]
         for key in keys_to_delete:
-            _memory_cache.delete(key)
+            _cache.delete(key)
     else:
-        _memory_cache.clear()
+        _cache.clear()
+    try:
+        _cache.bump_version(LIST_VERSION)
+    except Exception as e:
+        current_app.logger.warning(f"Cache version bump failed: {e}")
+
+def invalidate_tags(*tags: str) -> None:
+    """按依赖标签精确清理缓存（写接口提交成功后调用）"""
+    tags = [t for t in tags if t]
+    if not tags:
+        return
+    try:
+        count = _cache.invalidate_tags(tags)
+        current_app.logger.debug(f"Cache invalidated {count} entries for tags {tags}")
+    except Exception as e:
+        current_app.logger.warning(f"Cache invalidation failed: {e}")
+    # 先清缓存再递增版本号：读到新版本号的请求不会再命中旧缓存
+    try:
+        _cache.bump_version(LIST_VERSION)
+    except Exception as e:
+        current_app.logger.warning(f"Cache version bump failed: {e}")
+
+def get_list_version() -> Optional[int]:
+    """当前列表版本号；缓存后端故障时返回 None"""
+    try:
+        return _cache.get_version(LIST_VERSION)
+    except Exception as e:
+        current_app.logger.warning(f"Cache version read failed: {e}")
+        return None
+
+def invalidate_code(code, *extra_tags: str) -> None:
+    """
+    代码写入后的缓存清理：
+    - code:<id>：包含该代码的列表页
+    - category:<id> / category:all：该代码可能新出现（或消失）的列表页
+    """
+    invalidate_tags(
+        f"code:{code.id}",
+        f"category:{code.category_id}",
+        CATEGORY_ALL_TAG,
+        *extra_tags,
+    )
 
 # 预定义缓存时间常量
 CACHE_TTL = {
     'SHORT': 60,      # 1分钟
-    'MEDIUM': 300,    # 5分钟  
+    'MEDIUM': 300,    # 5分钟
     'LONG': 900,      # 15分钟
     'HOUR': 3600,     # 1小时
     'DAY': 86400      # 1天
@@ -0,0 +1,208 @@
+"""
+代码批量导出：边查询边生成 ZIP（GET /api/codes/export）
+- zipfile 写入不可 seek 的缓冲区（使用数据描述符），每写完一个条目就把已压缩的字节交给响应，
+  服务器内存只与单个条目大小有关，与导出数量无关
+- 目录结构：<分类>/<标题>_<id>/
+    <标题>.<扩展名>          源码（扩展名按 language，与前端 utils/export.ts 一致）
+    README.md                标题、描述、作者、标签等元数据
+    environment.yml / Dockerfile / environment.txt   运行环境（按内容判断）
+    results/                 效果展示：图片从图片存储原样写入，表格转 CSV，图表 JSON，文本/Markdown
+  根目录附带 导出信息.md（统计在生成过程中累计）
+"""
+import csv
+import io
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+from datetime import datetime
+
+from utils.blob_store import BLOB_NAME_RE, BLOB_URL_PREFIX
+
+LANGUAGE_EXTENSIONS = {
+    'Python': '.py',
+    'R': '.r',
+    'JavaScript': '.js',
+    'TypeScript': '.ts',
+    'Java': '.java',
+    'C++': '.cpp',
+    'C': '.c',
+    'Go': '.go',
+    'Rust': '.rs',
+    'PHP': '.php',
+    'Ruby': '.rb',
+    'Swift': '.swift',
+    'Kotlin': '.kt',
+    'Scala': '.scala',
+    'HTML': '.html',
+    'CSS': '.css',
+    'SQL': '.sql',
+    'Shell': '.sh',
+    'Bash': '.sh',
+    'PowerShell': '.ps1',
+    'YAML': '.yml',
+    'JSON': '.json',
+    'XML': '.xml',
+    'Markdown': '.md',
+    # 生物信息学常用语言
+    'Perl': '.pl',
+    'MATLAB': '.m',
+    'Julia': '.jl',
+    'Nextflow': '.nf',
+    'Snakemake': '.smk',
+    'WDL': '.wdl',
+    'AWK': '.awk',
+}
+
+RESULT_EXTENSIONS = {'text': '.txt', 'markdown': '.md', 'chart': '.json', 'table': '.csv'}
+
+_UNSAFE_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+_DOCKERFILE_RE = re.compile(r'^\s*FROM\s+\S+', re.IGNORECASE)
+_CONDA_RE = re.compile(r'^\s*(name|channels|dependencies)\s*:', re.MULTILINE)
+
+
+def sanitize_filename(name, default='untitled'):
+    """与前端 sanitizeFilename 相同的规则：替换非法字符与空白，限制长度"""
+    name = re.sub(r'\s+', '_', _UNSAFE_CHARS.sub('_', name or '')).strip('.')
+    return name[:100] or default
+
+
+def source_filename(code):
+    return sanitize_filename(code.title) + LANGUAGE_EXTENSIONS.get(code.language, '.txt')
+
+
+def environment_filename(environment):
+    """Dockerfile（FROM 开头）/ environment.yml（conda 环境）/ environment.txt（其他说明文字）"""
+    lines = [line for line in environment.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    if lines and _DOCKERFILE_RE.match(lines[0]):
+        return 'Dockerfile'
+    if _CONDA_RE.search(environment):
+        return 'environment.yml'
+    return 'environment.txt'
+
+
+def _readme(code):
+    tags = ' '.join(f'`{tag.name}`' for tag in code.tags)
+    category = code.user_category.name if code.user_category else (code.category.name if code.category else '未分类')
+    lines = [
+        f'# {code.title}',
+        '',
+        f'- **作者**: {code.author.username if code.author else ""}',
+        f'- **创建时间**: {code.created_at.isoformat() if code.created_at else ""}',
+        f'- **编程语言**: {code.language}',
+        f'- **分类**: {category}',
+        f'- **许可证**: {code.license or ""}',
+    ]
+    if tags:
+        lines.append(f'- **标签**: {tags}')
+    lines += ['', '## 代码描述', '', code.description or '暂无描述', '']
+    return '\n'.join(lines)
+
+
+def _table_csv(content):
+    """表格结果 {columns, data} 转 CSV；格式不符时返回 None"""
+    try:
+        table = json.loads(content)
+        columns = table['columns']
+        rows = table['data']
+    except (ValueError, KeyError, TypeError):
+        return None
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(row for row in rows if isinstance(row, dict))
+    return out.getvalue()
+
+
+class _StreamSink:
+    """只追加的写缓冲；zipfile 发现不可 seek 时改用数据描述符"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class CodeArchive:
+    """逐条写入代码并产出 ZIP 字节；`codes` 可以是 yield_per 的查询结果"""
+
+    def __init__(self, store=None, compresslevel=6):
+        self.store = store
+        self.compresslevel = compresslevel
+        self.exported_ids = []
+        self._categories = {}
+        self._languages = set()
+
+    def _write_result(self, zf, folder, index, result):
+        base = f'{folder}/results/{index:02d}_{sanitize_filename(result.description, default=result.type)}'
+        content = result.content or ''
+        if result.type == 'image':
+            name = content[len(BLOB_URL_PREFIX):]
+            if self.store is not None and content.startswith(BLOB_URL_PREFIX) and BLOB_NAME_RE.match(name):
+                path = self.store.path_for(name)
+                if os.path.exists(path):
+                    # 图片已压缩，存储不再 deflate；分块复制，不整体读入内存
+                    with open(path, 'rb') as src, zf.open(zipfile.ZipInfo(base + os.path.splitext(name)[1], time.localtime()[:6]), 'w') as dst:
+                        shutil.copyfileobj(src, dst, 64 * 1024)
+                    return
+            zf.writestr(base + '.url.txt', content)
+            return
+        if result.type == 'table':
+            csv_text = _table_csv(content)
+            if csv_text is not None:
+                zf.writestr(base + '.csv', csv_text)
+                return
+            zf.writestr(base + '.json', content)
+            return
+        zf.writestr(base + RESULT_EXTENSIONS.get(result.type, '.txt'), content)
+
+    def _write_code(self, zf, code):
+        category = code.user_category.name if code.user_category else (code.category.name if code.category else '未分类')
+        folder = f'{sanitize_filename(category)}/{sanitize_filename(code.title)}_{code.id}'
+        zf.writestr(f'{folder}/{source_filename(code)}', code.content or '')
+        zf.writestr(f'{folder}/README.md', _readme(code))
+        if code.environment and code.environment.strip():
+            zf.writestr(f'{folder}/{environment_filename(code.environment)}', code.environment)
+        for index, result in enumerate(code.results, 1):
+            self._write_result(zf, folder, index, result)
+
+        self.exported_ids.append(code.id)
+        self._categories[category] = self._categories.get(category, 0) + 1
+        self._languages.add(code.language)
+
+    def _export_info(self):
+        lines = [
+            '# 代码导出信息',
+            '',
+            f'- **导出时间**: {datetime.utcnow().isoformat()}Z',
+            f'- **代码总数**: {len(self.exported_ids)} 个',
+            f'- **编程语言**: {", ".join(sorted(self._languages))}',
+            '',
+            '## 文件结构',
+            '',
+        ]
+        lines += [f'- **{name}**: {count} 个代码' for name, count in self._categories.items()]
+        return '\n'.join(lines) + '\n'
+
+    def iter_bytes(self, codes):
+        sink = _StreamSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.compresslevel) as zf:
+            for code in codes:
+                self._write_code(zf, code)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            zf.writestr('导出信息.md', self._export_info())
+        yield sink.drain()
@@ -0,0 +1,94 @@
+"""
+响应压缩（按 Accept-Encoding 协商 br / gzip）
+- 只压缩 JSON/文本类响应，且响应体不小于 COMPRESS_MIN_SIZE 字节（默认 1024）
+- 安装了 brotli 时客户端同等偏好下优先 br（COMPRESS_BR_QUALITY，默认 4），
+  否则 gzip（COMPRESS_GZIP_LEVEL，默认 6）；动态响应取中低压缩级别，压缩耗时远小于节省的传输时间
+- 流式/文件响应、已编码响应、HEAD 请求与 204/304 不处理
+- COMPRESSION=0 关闭（由前置代理统一压缩时）
+
+nginx 默认不压缩反向代理的响应（gzip_proxied off），/api 的 JSON 需要在应用层压缩；
+已带 Content-Encoding 的响应 nginx 不会重复压缩。
+"""
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml',
+}
+
+
+def _is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, gzip_level=6, br_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=br_quality)
+    # mtime=0：相同内容得到相同字节
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+class Compressor:
+    def __init__(self, min_size=1024, gzip_level=6, br_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.br_quality = br_quality
+        self.encodings = available_encodings()
+
+    def after_request(self, response):
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not _is_compressible(response.mimetype)
+        ):
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding, self.gzip_level, self.br_quality))
+        response.headers['Content-Encoding'] = encoding
+        # 编码不同的响应不能共用强 ETag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def init_compression(app):
+    """注册压缩钩子；在 init_metrics 之后调用，使压缩耗时计入请求耗时"""
+    if os.getenv('COMPRESSION', '1').lower() in {'0', 'false', 'no', 'off'}:
+        return None
+    compressor = Compressor(
+        min_size=int(os.getenv('COMPRESS_MIN_SIZE', 1024)),
+        gzip_level=int(os.getenv('COMPRESS_GZIP_LEVEL', 6)),
+        br_quality=int(os.getenv('COMPRESS_BR_QUALITY', 4)),
+    )
+    app.after_request(compressor.after_request)
+    app.extensions['compression'] = compressor
+    return compressor
@@ -0,0 +1,96 @@
+"""
+条件请求：ETag / Last-Modified → 304 Not Modified
+- 详情：弱 ETag 由 id + updated_at + 评论/收藏/下载计数生成（计数 UPDATE 保留 updated_at，
+  见 utils/counters.py）；Last-Modified 无法反映计数变化，详情只按 If-None-Match 判断；
+  浏览量走缓冲计数（utils/view_counter.py），不参与 ETag
+- 列表：弱 ETag 由列表版本号（每次缓存失效递增，见 utils/cache.py）+ 查询参数 + 当前用户
+  + 缓存 TTL 时间片生成，最长与响应缓存同时过期；命中时不查库、不读缓存、不序列化
+- If-None-Match 优先；未携带时才比较 If-Modified-Since（秒级）
+- 响应带 Cache-Control: private, no-cache：浏览器每次携带校验头重新验证，不做启发式缓存
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request
+from werkzeug.http import http_date
+
+from utils.cache import get_list_version
+
+
+def make_etag(*parts) -> str:
+    raw = ':'.join(str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def _utc(value):
+    # 模型中的时间为 naive UTC；HTTP 日期只到秒
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def validator_headers(etag, last_modified=None):
+    headers = {'ETag': f'W/"{etag}"', 'Cache-Control': 'private, no-cache'}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(_utc(last_modified))
+    return headers
+
+
+def is_not_modified(etag, last_modified=None):
+    """客户端缓存的版本是否仍然有效"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def not_modified(etag, last_modified=None):
+    """304 响应（无响应体）"""
+    return current_app.response_class(status=304, headers=validator_headers(etag, last_modified))
+
+
+def _latest_updated_at(items):
+    latest = None
+    for item in items:
+        value = item.get('updated_at')
+        if value:
+            value = datetime.fromisoformat(value)
+            latest = value if latest is None or value > latest else latest
+    return latest
+
+
+def conditional_list(key_prefix, ttl, items_key):
+    """
+    列表接口条件请求装饰器，放在 @cached_response 外层
+    - items_key：响应中列表字段名，Last-Modified 取其中最新的 updated_at
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = get_list_version()
+            if version is None:
+                return f(*args, **kwargs)
+
+            from utils.identity import current_user_id
+            etag = make_etag(
+                key_prefix,
+                version,
+                int(time.time() // ttl),
+                sorted(request.args.items(multi=True)),
+                current_user_id() or '',
+            )
+            if is_not_modified(etag):
+                return not_modified(etag)
+
+            result = f(*args, **kwargs)
+            if not isinstance(result, tuple) or len(result) != 2:
+                return result
+            data, status_code = result
+            if not 200 <= status_code < 300:
+                return result
+            return data, status_code, validator_headers(etag, _latest_updated_at(data.get(items_key) or []))
+        return decorated_function
+    return decorator
@@ -0,0 +1,120 @@
+"""
+计数列维护
+- categories / user_categories / tags.code_count：分类或标签下的代码数
+- codes.comment_count / codes.favorite_count：评论数、收藏数
+
+计数在写路径的同一事务内以 UPDATE ... SET col = col + delta 原子更新，
+避免“读-改-写”在并发请求下丢失增量；列表页直接读取计数列，不再加载行计数。
+计数出现偏差（手工改库、历史数据）时用 `flask repair-counters` 以 GROUP BY 批量重算。
+计数更新不是内容修改：UPDATE 显式保留 updated_at（否则 onupdate 会刷新它，使详情 ETag 失效）。
+"""
+from sqlalchemy import bindparam, case, func, select, update
+
+from models import db
+from models.category import Category
+from models.code import Code
+from models.code_tag import CodeTag
+from models.comment import Comment
+from models.favorite import Favorite
+from models.tag import Tag
+from models.user_category import UserCategory
+
+# (计数所在模型, 计数列, 被计数表上指向该模型的外键列)
+COUNTERS = (
+    (Category, 'code_count', Code.category_id),
+    (UserCategory, 'code_count', Code.user_category_id),
+    (Tag, 'code_count', CodeTag.tag_id),
+    (Code, 'comment_count', Comment.code_id),
+    (Code, 'favorite_count', Favorite.code_id),
+)
+
+
+def keep_updated_at(table):
+    """计数类 UPDATE 的附加 SET：updated_at = updated_at，阻止 onupdate 生效（表没有该列时为空）"""
+    column = table.c.get('updated_at')
+    return {'updated_at': column} if column is not None else {}
+
+
+def adjust_counter(model, pk, column, delta=1):
+    """
+    在当前事务中增减计数列（结果不小于 0），返回受影响行数。
+    pk 可以是单个主键或主键集合（同一 delta 的多行合并为一条 UPDATE）。
+    """
+    if isinstance(pk, (list, tuple, set, frozenset)):
+        pks = [p for p in pk if p]
+        condition = model.id.in_(pks)
+    else:
+        pks = [pk] if pk else []
+        condition = model.id == pk
+    if not pks or not delta:
+        return 0
+    col = getattr(model, column)
+    result = db.session.execute(
+        update(model)
+        .where(condition)
+        .values({column: case((col + delta < 0, 0), else_=col + delta), **keep_updated_at(model.__table__)})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def adjust_counters(model, column, deltas):
+    """按 {主键: 增量} 调整计数列；增量相同的行合并为一条 UPDATE（批量导入使用）"""
+    by_delta = {}
+    for pk, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        adjust_counter(model, pks, column, delta)
+
+
+def code_counter_keys(code):
+    """代码参与计数的维度快照：(category_id, user_category_id, tag_ids)"""
+    return code.category_id, code.user_category_id, frozenset(tag.id for tag in code.tags)
+
+
+def update_code_counters(before=None, after=None):
+    """
+    按代码写入前后的维度快照调整分类/用户分类/标签的 code_count。
+    新建时 before=None，删除时 after=None。
+    """
+    old_category, old_user_category, old_tags = before or (None, None, frozenset())
+    new_category, new_user_category, new_tags = after or (None, None, frozenset())
+
+    if old_category != new_category:
+        adjust_counter(Category, old_category, 'code_count', -1)
+        adjust_counter(Category, new_category, 'code_count', 1)
+    if old_user_category != new_user_category:
+        adjust_counter(UserCategory, old_user_category, 'code_count', -1)
+        adjust_counter(UserCategory, new_user_category, 'code_count', 1)
+    adjust_counter(Tag, old_tags - new_tags, 'code_count', -1)
+    adjust_counter(Tag, new_tags - old_tags, 'code_count', 1)
+
+
+def repair_counters():
+    """以 GROUP BY 重算全部计数列，只写回有偏差的行；返回 {'表.列': 修正行数}"""
+    fixed = {}
+    for model, column, foreign_key in COUNTERS:
+        actual = dict(
+            db.session.execute(
+                select(foreign_key, func.count())
+                .where(foreign_key.isnot(None))
+                .group_by(foreign_key)
+            ).all()
+        )
+        stored = db.session.execute(select(model.id, getattr(model, column))).all()
+        changed = [
+            {'pk': pk, 'value': actual.get(pk, 0)}
+            for pk, value in stored
+            if (value or 0) != actual.get(pk, 0)
+        ]
+        if changed:
+            table = model.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam('pk'))
+                .values({column: bindparam('value'), **keep_updated_at(table)}),
+                changed,
+            )
+        fixed[f'{model.__tablename__}.{column}'] = len(changed)
+    db.session.commit()
+    return fixed
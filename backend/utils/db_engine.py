@@ -0,0 +1,131 @@
+"""
+数据库引擎配置
+MySQL/PostgreSQL（环境变量，括号内为默认值）：
+- DB_POOL_SIZE(5) / DB_MAX_OVERFLOW(10)：常驻连接数与突发时额外允许的连接数
+- DB_POOL_TIMEOUT(30)：连接池耗尽时等待连接的秒数
+- DB_POOL_RECYCLE(1800)：连接最长复用秒数，应小于 MySQL wait_timeout，避免拿到已被服务端断开的连接
+- DB_POOL_PRE_PING(1)：取出连接前先 ping，自动替换失效连接
+- DB_STATEMENT_TIMEOUT_MS(0=不限)：单条语句超时（MySQL max_execution_time 仅作用于 SELECT）
+SQLite：每个连接自动开启 WAL、synchronous=NORMAL 与 busy_timeout（SQLITE_BUSY_TIMEOUT_MS，默认 5000），
+读写并发时读请求不再被写锁阻塞。
+
+连接池统计（取出/溢出/等待时间）由 pool_stats() 提供，见 /api/health 与 /api/metrics。
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def _env_bool(name, default):
+    return os.getenv(name, default).lower() in {'1', 'true', 'yes', 'on'}
+
+
+class PoolWaitStats:
+    """取连接的等待时间统计（进程内）"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds, timed_out=False):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self.timeouts += int(timed_out)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.count,
+                'wait_avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                'wait_max_ms': round(self.max * 1000, 3),
+                'timeouts': self.timeouts,
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录每次从池中取连接的等待时间"""
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except Exception:
+            timed_out = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            pool_wait_stats.observe(elapsed, timed_out)
+            from utils.metrics import record_pool_wait
+            record_pool_wait(elapsed)
+
+
+def engine_options(uri):
+    """按数据库类型生成 SQLALCHEMY_ENGINE_OPTIONS"""
+    if uri.startswith('sqlite'):
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', '1'),
+    }
+    timeout_ms = _env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+    if timeout_ms > 0:
+        if uri.startswith('mysql'):
+            options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout_ms}'}
+        elif uri.startswith('postgresql'):
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    if type(dbapi_connection).__module__.split('.')[0] != 'sqlite3':
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}")
+    finally:
+        cursor.close()
+
+
+def pool_stats(engine):
+    """连接池当前状态 + 等待时间统计"""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    for name in ('size', 'checkedout', 'overflow', 'checkedin'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if 'overflow' in stats:
+        # QueuePool 在连接数未达到 pool_size 时返回负数
+        stats['overflow'] = max(stats['overflow'], 0)
+    stats.update(pool_wait_stats.snapshot())
+    return stats
+
+
+def init_engine_options(app):
+    """在 db.init_app 之前调用"""
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
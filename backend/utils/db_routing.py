@@ -0,0 +1,174 @@
+"""
+读写分离（可选）
+DATABASE_REPLICA_URIS=uri1,uri2 配置只读副本；未配置时所有查询走主库，行为不变。
+
+- 资源方法用 @replica_read 声明为只读：方法内的查询发往副本（多个副本按请求轮询，同一请求固定一个副本）
+- 写入（flush / INSERT / UPDATE / DELETE）始终走主库；请求内一旦写入，后续查询都回到主库（读己之写）
+- 副本健康：最多每 REPLICA_CHECK_INTERVAL 秒（默认 5）用 SELECT 1 探测一次；不可用的副本
+  REPLICA_RETRY_INTERVAL 秒（默认 30）后再探测。没有可用副本时回退主库；
+  副本在请求中途出现连接错误时标记为不可用，并在主库上重新执行该只读方法；
+  因此只读方法中的副作用（如记录浏览）须放在全部查询之后，否则重试时会执行两次
+- 请求之外的查询（后台线程、CLI）与未声明的方法始终走主库
+
+注意：副本存在复制延迟，刚写入的数据在下一个请求中可能暂时读不到。
+本地测试：主库与副本使用两个 SQLite 文件（副本为主库的拷贝），或两个本地 MySQL 实例。
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+def replica_uris():
+    return [uri.strip() for uri in os.getenv('DATABASE_REPLICA_URIS', '').split(',') if uri.strip()]
+
+
+class ReplicaSet:
+    """只读副本引擎 + 健康状态（进程内）"""
+    def __init__(self, engines, check_interval=5, retry_interval=30):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self._healthy = [True] * len(engines)
+        self._checked_at = [0.0] * len(engines)
+        self._checking = [threading.Lock() for _ in engines]
+        self._counter = itertools.count()
+        for engine in engines:
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def _index(self, engine):
+        for i, candidate in enumerate(self.engines):
+            if candidate is engine:
+                return i
+        return None
+
+    def _on_error(self, context):
+        if context.is_disconnect or isinstance(context.original_exception, OperationalError) \
+                or isinstance(context.sqlalchemy_exception, OperationalError):
+            self.mark_unhealthy(context.engine)
+
+    def mark_unhealthy(self, engine):
+        i = self._index(engine)
+        if i is not None and self._healthy[i]:
+            logger.warning(f'Replica {engine.url!r} unavailable, falling back to primary')
+            self._healthy[i] = False
+            self._checked_at[i] = time.monotonic()
+
+    def _ping(self, i):
+        try:
+            with self.engines[i].connect() as connection:
+                connection.execute(text('SELECT 1'))
+            return True
+        except DBAPIError:
+            return False
+
+    def is_healthy(self, i):
+        interval = self.check_interval if self._healthy[i] else self.retry_interval
+        if time.monotonic() - self._checked_at[i] < interval:
+            return self._healthy[i]
+        # 同一时刻只有一个线程探测，其余线程沿用上次结果
+        if not self._checking[i].acquire(blocking=False):
+            return self._healthy[i]
+        try:
+            healthy = self._ping(i)
+            if healthy and not self._healthy[i]:
+                logger.info(f'Replica {self.engines[i].url!r} recovered')
+            elif not healthy and self._healthy[i]:
+                logger.warning(f'Replica {self.engines[i].url!r} unavailable, falling back to primary')
+            self._healthy[i] = healthy
+            self._checked_at[i] = time.monotonic()
+            return healthy
+        finally:
+            self._checking[i].release()
+
+    def pick(self):
+        """轮询选择一个健康副本；都不可用时返回 None"""
+        start = next(self._counter)
+        for offset in range(len(self.engines)):
+            i = (start + offset) % len(self.engines)
+            if self.is_healthy(i):
+                return self.engines[i]
+        return None
+
+    def stats(self):
+        return [
+            {'url': engine.url.render_as_string(hide_password=True), 'healthy': self._healthy[i]}
+            for i, engine in enumerate(self.engines)
+        ]
+
+
+def get_replicas(app=None):
+    app = app or current_app
+    return app.extensions.get('db_replicas')
+
+
+def _request_replica():
+    """当前请求使用的副本；不在只读方法内、已写入或无可用副本时返回 None"""
+    if not has_request_context() or not g.get('_db_read_only') or g.get('_db_wrote'):
+        return None
+    if '_db_replica' not in g:
+        replicas = get_replicas()
+        g._db_replica = replicas.pick() if replicas else None
+    return g._db_replica
+
+
+class RoutingSession(Session):
+    """只读方法内的查询发往副本，其余（含全部写入）走主库"""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g._db_wrote = True
+            else:
+                engine = _request_replica()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_read(fn):
+    """声明资源方法为只读，允许其查询发往副本（副本故障时整个方法在主库上重新执行）"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not get_replicas():
+            return fn(*args, **kwargs)
+        g._db_read_only = True
+        try:
+            return fn(*args, **kwargs)
+        except OperationalError:
+            engine = g.pop('_db_replica', None)
+            if engine is None:
+                raise
+            # 副本中途故障：标记后在主库上重新执行
+            from models import db
+            get_replicas().mark_unhealthy(engine)
+            db.session.rollback()
+            g._db_replica = None
+            return fn(*args, **kwargs)
+        finally:
+            g._db_read_only = False
+    return wrapper
+
+
+def init_replicas(app):
+    """在 db.init_app 之后调用；未配置 DATABASE_REPLICA_URIS 时不做任何事"""
+    uris = replica_uris()
+    if not uris:
+        return None
+    from utils.db_engine import engine_options
+    engines = [create_engine(uri, **engine_options(uri)) for uri in uris]
+    replicas = ReplicaSet(
+        engines,
+        check_interval=float(os.getenv('REPLICA_CHECK_INTERVAL', 5)),
+        retry_interval=float(os.getenv('REPLICA_RETRY_INTERVAL', 30)),
+    )
+    app.extensions['db_replicas'] = replicas
+    return replicas
@@ -0,0 +1,101 @@
+"""
+请求级身份
+每个请求只解码一次 JWT，结果保存在 g 中，供限流键、缓存键与资源方法共用：
+- current_user_id()：当前用户 ID（int），未登录或令牌无效时为 None
+- current_role() / is_admin()：当前用户角色
+
+角色来源：
+- UserLogin 签发令牌时写入 role 声明；声明为普通用户时直接采用，不查库
+  （被提升为管理员的用户重新登录后生效）
+- 声明为 admin 或旧令牌没有该声明时，查询角色缓存 user_role:<id>
+  （共享缓存后端，ROLE_CACHE_TTL 秒），未命中才查库；
+  AdminUserDetail.patch 修改角色/状态时失效，降级与禁用立即生效
+"""
+import os
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import select
+
+from models import db
+from models.user import User
+from utils.cache import get_cache
+
+ROLE_CACHE_TTL = int(os.getenv('ROLE_CACHE_TTL', 60))
+_MISSING = object()
+
+
+def _role_cache_key(user_id):
+    return f"user_role:{user_id}"
+
+
+def _resolve_identity():
+    identity = g.get('_identity')
+    if identity is not None:
+        return identity
+
+    user_id, claims = None, {}
+    try:
+        if verify_jwt_in_request(optional=True):
+            user_id = int(get_jwt_identity())
+            claims = get_jwt()
+    except Exception:
+        # 令牌缺失/无效按匿名处理；需要登录的接口仍由 @jwt_required 返回 401
+        user_id, claims = None, {}
+
+    g._identity = (user_id, claims)
+    return g._identity
+
+
+def current_user_id():
+    """当前请求的用户 ID（int），匿名为 None"""
+    return _resolve_identity()[0]
+
+
+def get_user_role(user_id):
+    """用户角色（禁用或不存在的用户返回 None），优先读取角色缓存"""
+    cache = get_cache()
+    key = _role_cache_key(user_id)
+    try:
+        cached = cache.get(key)
+    except Exception:
+        cached = None
+    if cached is not None:
+        return cached.get('role')
+
+    row = db.session.execute(select(User.role, User.is_active).where(User.id == user_id)).first()
+    role = row.role if row is not None and row.is_active is not False else None
+    try:
+        cache.set(key, {'role': role}, ttl=ROLE_CACHE_TTL)
+    except Exception:
+        pass
+    return role
+
+
+def invalidate_user_role(user_id):
+    """角色或启用状态变化后调用"""
+    try:
+        get_cache().delete(_role_cache_key(user_id))
+    except Exception:
+        pass
+
+
+def current_role():
+    """当前用户角色，匿名为 None"""
+    role = g.get('_identity_role', _MISSING)
+    if role is not _MISSING:
+        return role
+
+    user_id, claims = _resolve_identity()
+    if user_id is None:
+        role = None
+    elif claims.get('role') not in (None, 'admin'):
+        role = claims['role']
+    else:
+        role = get_user_role(user_id)
+    g._identity_role = role
+    return role
+
+
+def is_admin():
+    return current_role() == 'admin'
@@ -0,0 +1,189 @@
+"""
+结果图片的尺寸变体
+- thumb：卡片缩略图（宽 320）；detail：详情页（宽 1280）；只缩小不放大
+- 格式：WebP（Pillow 支持时）否则 JPEG；与原图同目录，命名 <sha256>.<变体>.<webp|jpg>
+- 解码与缩放在进程池中执行（IMAGE_WORKERS，默认 2），请求线程从不解码图片
+- 上传图片、发布含图片结果的代码时后台提交生成；访问尚不存在的变体时按需生成：
+  进程内同一文件只提交一次，跨进程由文件锁保证只生成一次
+- 工作进程异常退出（OOM 被杀等）会使整个进程池不可用：丢弃后下次提交时重建
+- Pillow 未安装时不生成变体，Result.to_dict 的 variants 为 None，前端使用原图
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - 可选依赖
+    Image = None
+
+ENABLED = Image is not None
+VARIANT_FORMAT = 'webp' if ENABLED and features.check('webp') else 'jpg'
+VARIANT_WIDTHS = {'thumb': 320, 'detail': 1280}
+VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', 80))
+
+
+def render_variant(src_path, dest_path, width, fmt, quality=80):
+    """在工作进程中执行：生成一个变体文件（已存在则跳过）"""
+    if os.path.exists(dest_path):
+        return dest_path
+    lock_path = os.path.join(os.path.dirname(dest_path), '.' + os.path.basename(dest_path) + '.lock')
+    with open(lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # 等锁期间其他进程可能已经生成
+        if os.path.exists(dest_path):
+            return dest_path
+
+        with Image.open(src_path) as im:
+            im = ImageOps.exif_transpose(im)
+            if im.width > width:
+                height = max(1, round(im.height * width / im.width))
+                im = im.resize((width, height), Image.LANCZOS)
+            has_alpha = im.mode in ('RGBA', 'LA') or (im.mode == 'P' and 'transparency' in im.info)
+            if fmt == 'webp' and has_alpha:
+                im = im.convert('RGBA')
+            elif has_alpha:
+                # JPEG 不支持透明，铺白底
+                background = Image.new('RGB', im.size, (255, 255, 255))
+                background.paste(im.convert('RGBA'), mask=im.convert('RGBA').split()[-1])
+                im = background
+            else:
+                im = im.convert('RGB')
+
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path), prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    im.save(f, format='WEBP' if fmt == 'webp' else 'JPEG', quality=quality, method=4 if fmt == 'webp' else 0)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, dest_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+    return dest_path
+
+
+_executor = None
+_executor_pid = None
+_inflight = {}  # 目标路径 -> Future
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        # spawn：gunicorn 多线程 worker 中 fork 可能继承被其他线程持有的锁
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv('IMAGE_WORKERS', 2)),
+            mp_context=multiprocessing.get_context('spawn'),
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _discard_executor():
+    """丢弃已损坏的进程池（不等待、不取消），下次提交时重建"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _submit(src_path, dest_path, width, fmt):
+    """提交生成任务；同一目标文件已在生成时复用同一个 Future。进程池已损坏时重建一次"""
+    global _executor
+    with _lock:
+        future = _inflight.get(dest_path)
+        if future is not None:
+            return future
+        args = (render_variant, src_path, dest_path, width, fmt, VARIANT_QUALITY)
+        try:
+            future = _get_executor().submit(*args)
+        except BrokenProcessPool:
+            _executor.shutdown(wait=False)
+            _executor = None
+            future = _get_executor().submit(*args)
+        _inflight[dest_path] = future
+    # 在锁外注册：Future 已完成时回调在当前线程立即执行，持锁注册会死锁
+    future.add_done_callback(lambda f: _forget(dest_path, f))
+    return future
+
+
+def _forget(dest_path, future):
+    with _lock:
+        # 只移除自己：失败后重新提交的新 Future 不受旧回调影响
+        if _inflight.get(dest_path) is future:
+            del _inflight[dest_path]
+
+
+def variant_name(original_name, variant, fmt=VARIANT_FORMAT):
+    return f"{original_name.split('.')[0]}.{variant}.{fmt}"
+
+
+def schedule_variants(store, original_name, logger=None):
+    """后台生成原图缺失的全部变体（不等待）"""
+    if not ENABLED:
+        return
+    src_path = store.path_for(original_name)
+    for variant, width in VARIANT_WIDTHS.items():
+        dest_path = store.path_for(variant_name(original_name, variant))
+        if not os.path.exists(dest_path):
+            future = _submit(src_path, dest_path, width, VARIANT_FORMAT)
+            if logger is not None:
+                future.add_done_callback(
+                    lambda f, name=original_name: f.exception() and logger.warning(
+                        f'Image variant generation failed for {name}: {f.exception()}'
+                    )
+                )
+
+
+def ensure_variant(store, name, timeout=30):
+    """
+    返回变体文件路径；不存在时提交生成并等待（请求线程只等待，不解码）。
+    原图不存在、Pillow 不可用或生成失败时返回 None。
+    """
+    from utils.blob_store import BLOB_VARIANT_RE, find_original
+
+    match = BLOB_VARIANT_RE.match(name)
+    if not ENABLED or match is None:
+        return None
+    dest_path = store.path_for(name)
+    if os.path.exists(dest_path):
+        return dest_path
+    original = find_original(store, match.group(1))
+    if original is None:
+        return None
+    try:
+        future = _submit(store.path_for(original), dest_path, VARIANT_WIDTHS[match.group(2)], match.group(3))
+        return future.result(timeout=timeout)
+    except BrokenProcessPool:
+        # 工作进程在生成期间退出：本次按不存在处理，丢弃进程池
+        _discard_executor()
+        return None
+    except (CancelledError, FutureTimeoutError, OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def variant_urls(content):
+    """图片结果的变体 URL；内容不是图片存储中的原图时返回 None"""
+    from utils.blob_store import BLOB_NAME_RE, BLOB_URL_PREFIX, blob_url
+
+    if not ENABLED or not content or not content.startswith(BLOB_URL_PREFIX):
+        return None
+    name = content[len(BLOB_URL_PREFIX):]
+    if not BLOB_NAME_RE.match(name):
+        return None
+    urls = {'original': content}
+    for variant in VARIANT_WIDTHS:
+        urls[variant] = blob_url(variant_name(name, variant))
+    return urls
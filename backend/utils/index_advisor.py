@@ -0,0 +1,110 @@
+"""
+索引顾问
+对热点接口的查询形状执行 EXPLAIN，报告仍然全表扫描或需要额外排序的查询。
+查询形状与 resources 中的构造方式一致（筛选条件 + 排序 + LIMIT），参数取代表值。
+
+判定：
+- SQLite：EXPLAIN QUERY PLAN 中出现 `SCAN <表>` 且未使用索引 → 全表扫描；
+  `USE TEMP B-TREE FOR ORDER BY` → 额外排序
+- MySQL：type=ALL → 全表扫描；Extra 含 Using filesort → 额外排序
+- PostgreSQL：Seq Scan → 全表扫描；Sort 节点 → 额外排序
+注意：表中数据很少时优化器可能主动选择全表扫描，应在有代表性数据的库上运行。
+"""
+import re
+
+from sqlalchemy import func, select
+
+from models.code import Code
+from models.code_tag import CodeTag
+from models.comment import Comment
+from models.favorite import Favorite
+from models.tag import Tag
+from models.user_category import UserCategory
+
+_PUBLIC = Code.visible_filter()
+_NEWEST = (Code.created_at.desc(), Code.id.desc())
+
+
+def hot_queries():
+    """(名称, 语句) 列表，对应 CodeList / UserCodes / AdminCodes / FavoriteList 等接口"""
+    return [
+        ('CodeList 公开列表', select(Code.id).where(_PUBLIC).order_by(*_NEWEST).limit(21)),
+        ('CodeList 页码总数', select(func.count()).select_from(Code).where(_PUBLIC)),
+        ('CodeList 登录用户', select(Code.id).where(Code.visible_filter(1)).order_by(*_NEWEST).limit(21)),
+        ('CodeList 按分类', select(Code.id).where(_PUBLIC, Code.category_id == 1).order_by(*_NEWEST).limit(21)),
+        ('CodeList 按语言', select(Code.id).where(_PUBLIC, Code.language == 'Python').order_by(*_NEWEST).limit(21)),
+        ('CodeList 按用户分类', select(Code.id).where(_PUBLIC, Code.user_category_id == 1).order_by(*_NEWEST).limit(21)),
+        ('CodeList 按标签', select(Code.id).join(CodeTag, CodeTag.code_id == Code.id).join(Tag, Tag.id == CodeTag.tag_id)
+            .where(_PUBLIC, Tag.name == 'Python').order_by(*_NEWEST).limit(21)),
+        ('UserCodes', select(Code.id).where(Code.author_id == 1).order_by(Code.created_at.desc())),
+        ('AdminCodes 全部', select(Code.id).order_by(*_NEWEST).limit(21)),
+        ('AdminCodes 按状态', select(Code.id).where(Code.status == 'pending').order_by(*_NEWEST).limit(21)),
+        ('FavoriteList', select(Favorite.code_id).where(Favorite.user_id == 1)),
+        ('CommentList', select(Comment.id).where(Comment.code_id == 1)
+            .order_by(Comment.created_at.desc(), Comment.id.desc()).limit(51)),
+        ('AdminComments', select(Comment.id).order_by(Comment.created_at.desc(), Comment.id.desc()).limit(21)),
+        ('UserCategoryList', select(UserCategory.id).where(UserCategory.user_id == 1).order_by(UserCategory.sort_order)),
+    ]
+
+
+def _explain_sqlite(connection, sql, params):
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).all()
+    details = [row[-1] for row in rows]
+    full_scans = [
+        d for d in details
+        if re.match(r'SCAN (TABLE )?\w+', d) and 'USING' not in d
+    ]
+    sorts = [d for d in details if 'TEMP B-TREE' in d and 'ORDER BY' in d]
+    return details, full_scans, sorts
+
+
+def _explain_mysql(connection, sql, params):
+    rows = [dict(row._mapping) for row in connection.exec_driver_sql('EXPLAIN ' + sql, params)]
+    details = [
+        f"{r.get('table')}: type={r.get('type')} key={r.get('key')} rows={r.get('rows')} {r.get('Extra') or ''}".strip()
+        for r in rows
+    ]
+    full_scans = [d for d, r in zip(details, rows) if r.get('type') == 'ALL']
+    sorts = [d for d, r in zip(details, rows) if 'filesort' in (r.get('Extra') or '')]
+    return details, full_scans, sorts
+
+
+def _explain_postgresql(connection, sql, params):
+    details = [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql, params)]
+    full_scans = [d for d in details if 'Seq Scan' in d]
+    sorts = [d for d in details if re.search(r'\bSort\b', d)]
+    return details, full_scans, sorts
+
+
+_EXPLAINERS = {
+    'sqlite': _explain_sqlite,
+    'mysql': _explain_mysql,
+    'postgresql': _explain_postgresql,
+}
+
+
+def explain(connection, statement):
+    """对单条语句执行 EXPLAIN，返回 (计划明细, 全表扫描项, 额外排序项)"""
+    explainer = _EXPLAINERS.get(connection.dialect.name)
+    if explainer is None:
+        raise ValueError(f'Unsupported dialect: {connection.dialect.name}')
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+    return explainer(connection, str(compiled), params)
+
+
+def analyze_hot_queries(connection):
+    """返回每条热点查询的分析结果列表"""
+    report = []
+    for name, statement in hot_queries():
+        details, full_scans, sorts = explain(connection, statement)
+        report.append({
+            'name': name,
+            'plan': details,
+            'full_scans': full_scans,
+            'sorts': sorts,
+        })
+    return report
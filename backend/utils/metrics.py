@@ -0,0 +1,192 @@
+"""
+Prometheus 指标
+- 每个资源/方法/状态码的请求耗时直方图
+- 每个请求的 SQL 语句数与 SQL 总耗时（SQLAlchemy 引擎事件）
+- 响应缓存命中/未命中计数（utils/cache.py 调用 record_cache_result）
+- 数据库连接池：已取出/溢出连接数（每个请求结束时更新），取连接等待时间直方图
+- /api/metrics 以 Prometheus 文本格式导出
+
+多 worker 聚合：设置 PROMETHEUS_MULTIPROC_DIR 后 prometheus_client 以多进程模式写入该目录，
+导出时由 MultiProcessCollector 汇总所有 worker（gunicorn.conf.py 在 worker 退出时清理其文件）。
+prometheus_client 未安装时所有记录函数为空操作，/api/metrics 返回 503。
+"""
+import os
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # pragma: no cover - 可选依赖
+    CONTENT_TYPE_LATEST = None
+    Counter = Gauge = Histogram = None
+
+ENABLED = Histogram is not None
+
+if ENABLED:
+    REQUEST_LATENCY = Histogram(
+        'http_request_duration_seconds',
+        'HTTP request latency by resource, method and status code',
+        ['endpoint', 'method', 'status'],
+    )
+    REQUEST_QUERIES = Histogram(
+        'db_queries_per_request',
+        'Number of SQL statements executed per request',
+        ['endpoint', 'method'],
+        buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, float('inf')),
+    )
+    REQUEST_QUERY_TIME = Histogram(
+        'db_query_duration_seconds_per_request',
+        'Total SQL execution time per request',
+        ['endpoint', 'method'],
+    )
+    DB_QUERIES = Counter(
+        'db_queries_total',
+        'SQL statements executed',
+        ['endpoint'],
+    )
+    CACHE_REQUESTS = Counter(
+        'response_cache_requests_total',
+        'Response cache lookups',
+        ['prefix', 'result'],
+    )
+    POOL_CHECKED_OUT = Gauge(
+        'db_pool_checked_out',
+        'Connections currently checked out of the pool',
+        multiprocess_mode='livesum',
+    )
+    POOL_OVERFLOW = Gauge(
+        'db_pool_overflow',
+        'Connections opened beyond pool_size',
+        multiprocess_mode='livesum',
+    )
+    POOL_WAIT = Histogram(
+        'db_pool_wait_seconds',
+        'Time spent waiting for a pooled connection',
+        buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, float('inf')),
+    )
+    VIEW_COUNTER_PENDING = Gauge(
+        'view_counter_pending',
+        'View increments buffered and not yet written to the database',
+        multiprocess_mode='mostrecent',
+    )
+
+
+def _endpoint():
+    # 使用路由端点名（flask_restful 为资源类名小写）而非原始 URL，避免标签基数爆炸
+    rule = request.url_rule
+    return rule.endpoint if rule is not None else 'unmatched'
+
+
+def record_cache_result(prefix, hit):
+    """记录一次缓存查找结果"""
+    if ENABLED:
+        CACHE_REQUESTS.labels(prefix=prefix or 'default', result='hit' if hit else 'miss').inc()
+
+
+def record_pool_wait(seconds):
+    """记录一次取连接的等待时间（utils/db_engine.InstrumentedQueuePool 调用）"""
+    if ENABLED:
+        POOL_WAIT.observe(seconds)
+
+
+def _update_pool_gauges():
+    engine = current_app.extensions['sqlalchemy'].engine
+    pool = engine.pool
+    if hasattr(pool, 'checkedout'):
+        POOL_CHECKED_OUT.set(pool.checkedout())
+    if hasattr(pool, 'overflow'):
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        context._metrics_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is None or not has_request_context():
+        return
+    g._metrics_queries = g.get('_metrics_queries', 0) + 1
+    g._metrics_query_time = g.get('_metrics_query_time', 0.0) + (time.perf_counter() - start)
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    g._metrics_queries = 0
+    g._metrics_query_time = 0.0
+
+
+def _after_request(response):
+    start = g.get('_metrics_start')
+    if start is None or request.path == '/api/metrics':
+        return response
+    endpoint = _endpoint()
+    method = request.method
+    REQUEST_LATENCY.labels(endpoint=endpoint, method=method, status=str(response.status_code)).observe(
+        time.perf_counter() - start
+    )
+    queries = g.get('_metrics_queries', 0)
+    REQUEST_QUERIES.labels(endpoint=endpoint, method=method).observe(queries)
+    REQUEST_QUERY_TIME.labels(endpoint=endpoint, method=method).observe(g.get('_metrics_query_time', 0.0))
+    if queries:
+        DB_QUERIES.labels(endpoint=endpoint).inc(queries)
+    try:
+        _update_pool_gauges()
+    except Exception:
+        pass
+    return response
+
+
+def _collect_gauges():
+    """导出前刷新按需计算的指标"""
+    try:
+        _update_pool_gauges()
+    except Exception:
+        current_app.logger.warning('Failed to read connection pool stats')
+    view_counter = current_app.extensions.get('view_counter')
+    if view_counter is not None:
+        try:
+            VIEW_COUNTER_PENDING.set(view_counter.stats()['pending'])
+        except Exception:
+            current_app.logger.warning('Failed to read view counter stats')
+
+
+def metrics_view():
+    """GET /api/metrics：Prometheus 文本格式"""
+    if not ENABLED:
+        return Response('prometheus_client is not installed\n', status=503, mimetype='text/plain')
+
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    _collect_gauges()
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """注册请求计时钩子与 /api/metrics 路由"""
+    if ENABLED:
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+    app.add_url_rule('/api/metrics', 'metrics', metrics_view)
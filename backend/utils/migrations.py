@@ -0,0 +1,118 @@
+"""
+内置数据库迁移
+db.create_all() 只创建缺失的表，不会给已有表补列或索引；已有数据库通过 `flask db-upgrade` 升级。
+
+- 已执行的版本记录在 schema_migrations 表中，每个版本只执行一次
+- 每个迁移都先检查列/索引是否存在，对新建数据库（create_all 已建好）重复执行也安全
+- 使用 SQLAlchemy DDL，SQLite 与 MySQL 通用
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+
+from models import db
+
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations',
+    _migration_metadata,
+    Column('version', String(64), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version):
+    """注册迁移：fn(connection) 在单个事务中执行"""
+    def decorator(fn):
+        MIGRATIONS.append((version, fn))
+        return fn
+    return decorator
+
+
+def _add_column_if_missing(connection, table, column_sql, name):
+    columns = {c['name'] for c in inspect(connection).get_columns(table)}
+    if name in columns:
+        return False
+    connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column_sql}'))
+    return True
+
+
+@migration('0001_counter_columns')
+def add_counter_columns(connection):
+    """
+    计数列：codes.comment_count/favorite_count，分类/用户分类/标签的 code_count
+    取代手工脚本 migrations/add_comment_count.sql（评论数）与 add_counters.sql（代码数、收藏数）；
+    执行过脚本的数据库列已存在，跳过即可。
+    新增的列由 upgrade() 调用 repair_counters 回填。
+    """
+    added = [
+        _add_column_if_missing(connection, 'codes', 'comment_count INTEGER NOT NULL DEFAULT 0', 'comment_count'),
+        _add_column_if_missing(connection, 'codes', 'favorite_count INTEGER NOT NULL DEFAULT 0', 'favorite_count'),
+        _add_column_if_missing(connection, 'categories', 'code_count INTEGER NOT NULL DEFAULT 0', 'code_count'),
+        _add_column_if_missing(connection, 'user_categories', 'code_count INTEGER NOT NULL DEFAULT 0', 'code_count'),
+        _add_column_if_missing(connection, 'tags', 'code_count INTEGER NOT NULL DEFAULT 0', 'code_count'),
+    ]
+    return any(added)
+
+
+@migration('0002_hot_path_indexes')
+def add_hot_path_indexes(connection):
+    """
+    创建模型中声明的全部二级索引（列表/筛选/排序热路径）
+    包括原 migrations/add_search_indexes.sql 中仍有对应查询的 idx_comments_author、idx_users_role_active
+    """
+    inspector = inspect(connection)
+    created = False
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created = True
+    return created
+
+
+@migration('0003_backfill_code_status')
+def backfill_code_status(connection):
+    """
+    历史数据中 status 为 NULL 的代码按已审核处理：回填为 approved，
+    可见性条件不再需要 OR status IS NULL（该分支使列表查询无法按索引顺序取行）
+    """
+    result = connection.execute(text("UPDATE codes SET status = 'approved' WHERE status IS NULL"))
+    return result.rowcount > 0
+
+
+def applied_versions(connection):
+    _migration_metadata.create_all(connection)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(engine=None):
+    engine = engine or db.engine
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(engine=None, log=print):
+    """执行全部未执行的迁移，返回本次执行的版本列表"""
+    engine = engine or db.engine
+    done = []
+    for version, fn in MIGRATIONS:
+        with engine.begin() as connection:
+            if version in applied_versions(connection):
+                continue
+            changed = fn(connection)
+            connection.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+        log(f'{version}: {"已执行" if changed else "无需变更（已是最新结构）"}')
+        done.append(version)
+
+    if '0001_counter_columns' in done:
+        # 新增的计数列需要回填
+        from utils.counters import repair_counters
+        repair_counters()
+    return done
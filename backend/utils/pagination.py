@@ -0,0 +1,78 @@
+"""
+列表分页
+- 页码模式（默认）：page/per_page，返回 total/pages/current_page（OFFSET + COUNT）
+- 游标模式（传入 cursor= 时启用）：按 (created_at, id) 倒序 keyset 分页，
+  返回不透明的 next_cursor，不执行 COUNT；with_total=1 时才额外返回 total
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask_restful import abort, inputs
+from sqlalchemy import and_, or_
+
+MAX_PER_PAGE = 100
+
+
+def add_pagination_arguments(parser, default_per_page=20):
+    """为 RequestParser 注册分页参数"""
+    parser.add_argument('page', type=int, default=1, location='args', help='Page number')
+    parser.add_argument('per_page', type=int, default=default_per_page, location='args', help='Items per page')
+    parser.add_argument('cursor', type=str, location='args', help='Opaque cursor; empty value requests the first page')
+    parser.add_argument('with_total', type=inputs.boolean, default=False, location='args', help='Include total in cursor mode')
+
+
+def encode_cursor(created_at, item_id):
+    payload = json.dumps([created_at.isoformat() if created_at else None, item_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(item_id)
+    except (ValueError, TypeError):
+        abort(400, message='Invalid cursor')
+
+
+def is_cursor_mode(args):
+    return args.get('cursor') is not None
+
+
+def paginate_query(query, model, args):
+    """
+    按请求参数分页，返回 (items, meta)。
+    query 上已有的 order_by 会保留（页码模式下作为主排序），随后追加 created_at 倒序。
+    """
+    if not is_cursor_mode(args):
+        pagination = query.order_by(model.created_at.desc()).paginate(
+            page=args['page'], per_page=args['per_page'], error_out=False
+        )
+        return pagination.items, {
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'current_page': pagination.page,
+        }
+
+    per_page = max(1, min(args['per_page'] or 1, MAX_PER_PAGE))
+    meta = {}
+    if args.get('with_total'):
+        meta['total'] = query.order_by(None).count()
+
+    if args['cursor']:
+        created_at, last_id = decode_cursor(args['cursor'])
+        query = query.filter(
+            or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < last_id),
+            )
+        )
+
+    # 多取一条判断是否还有下一页
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_more = len(rows) > per_page
+    meta['next_cursor'] = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+    meta['has_more'] = has_more
+    return items, meta
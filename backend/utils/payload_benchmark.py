@@ -0,0 +1,193 @@
+"""
+响应体基准：CodeList 一页（默认 20 条）的序列化耗时与传输字节数
+样例为常见生信分析片段（Seurat / Scanpy / DESeq2 / GATK / samtools 等），
+以未入库的模型对象调用 to_dict()，不访问数据库。
+每条代码附带一张随机生成的差异基因结果表，避免整页只是少数片段的重复而高估压缩率。
+"""
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from models.category import Category
+from models.code import Code
+from models.result import Result
+from models.tag import Tag
+from models.user import User
+from utils.compression import available_encodings, compress
+from utils.serialization import ENCODERS, get_encoder
+
+SNIPPETS = [
+    ('R', 'Seurat 单细胞标准流程', ['Seurat', 'scRNA-seq', 'R'], '''library(Seurat)
+library(dplyr)
+pbmc.data <- Read10X(data.dir = "filtered_gene_bc_matrices/hg19/")
+pbmc <- CreateSeuratObject(counts = pbmc.data, project = "pbmc3k", min.cells = 3, min.features = 200)
+pbmc[["percent.mt"]] <- PercentageFeatureSet(pbmc, pattern = "^MT-")
+pbmc <- subset(pbmc, subset = nFeature_RNA > 200 & nFeature_RNA < 2500 & percent.mt < 5)
+pbmc <- NormalizeData(pbmc, normalization.method = "LogNormalize", scale.factor = 10000)
+pbmc <- FindVariableFeatures(pbmc, selection.method = "vst", nfeatures = 2000)
+all.genes <- rownames(pbmc)
+pbmc <- ScaleData(pbmc, features = all.genes)
+pbmc <- RunPCA(pbmc, features = VariableFeatures(object = pbmc))
+pbmc <- FindNeighbors(pbmc, dims = 1:10)
+pbmc <- FindClusters(pbmc, resolution = 0.5)
+pbmc <- RunUMAP(pbmc, dims = 1:10)
+pbmc.markers <- FindAllMarkers(pbmc, only.pos = TRUE, min.pct = 0.25, logfc.threshold = 0.25)
+top10 <- pbmc.markers %>% group_by(cluster) %>% top_n(n = 10, wt = avg_log2FC)
+DoHeatmap(pbmc, features = top10$gene) + NoLegend()
+'''),
+    ('Python', 'Scanpy 聚类与差异基因', ['Scanpy', 'scRNA-seq', 'Python'], '''import scanpy as sc
+
+adata = sc.read_10x_mtx("data/filtered_gene_bc_matrices/hg19/", var_names="gene_symbols", cache=True)
+adata.var_names_make_unique()
+sc.pp.filter_cells(adata, min_genes=200)
+sc.pp.filter_genes(adata, min_cells=3)
+adata.var["mt"] = adata.var_names.str.startswith("MT-")
+sc.pp.calculate_qc_metrics(adata, qc_vars=["mt"], percent_top=None, log1p=False, inplace=True)
+adata = adata[adata.obs.n_genes_by_counts < 2500, :]
+adata = adata[adata.obs.pct_counts_mt < 5, :]
+sc.pp.normalize_total(adata, target_sum=1e4)
+sc.pp.log1p(adata)
+sc.pp.highly_variable_genes(adata, min_mean=0.0125, max_mean=3, min_disp=0.5)
+adata.raw = adata
+adata = adata[:, adata.var.highly_variable]
+sc.pp.regress_out(adata, ["total_counts", "pct_counts_mt"])
+sc.pp.scale(adata, max_value=10)
+sc.tl.pca(adata, svd_solver="arpack")
+sc.pp.neighbors(adata, n_neighbors=10, n_pcs=40)
+sc.tl.leiden(adata)
+sc.tl.umap(adata)
+sc.tl.rank_genes_groups(adata, "leiden", method="wilcoxon")
+sc.pl.rank_genes_groups(adata, n_genes=25, sharey=False)
+'''),
+    ('R', 'DESeq2 差异表达分析', ['DESeq2', 'RNA-seq', 'R'], '''library(DESeq2)
+counts <- read.csv("counts.csv", row.names = 1, check.names = FALSE)
+coldata <- read.csv("samples.csv", row.names = 1)
+stopifnot(all(colnames(counts) == rownames(coldata)))
+dds <- DESeqDataSetFromMatrix(countData = round(counts), colData = coldata, design = ~ batch + condition)
+keep <- rowSums(counts(dds) >= 10) >= 3
+dds <- dds[keep, ]
+dds$condition <- relevel(dds$condition, ref = "control")
+dds <- DESeq(dds)
+res <- results(dds, contrast = c("condition", "treated", "control"), alpha = 0.05)
+resLFC <- lfcShrink(dds, coef = "condition_treated_vs_control", type = "apeglm")
+summary(res)
+res_ordered <- res[order(res$padj), ]
+write.csv(as.data.frame(res_ordered), file = "deseq2_results.csv")
+vsd <- vst(dds, blind = FALSE)
+plotPCA(vsd, intgroup = c("condition", "batch"))
+'''),
+    ('Shell', 'GATK 胚系变异检测', ['GATK', 'WGS', 'Shell'], '''#!/usr/bin/env bash
+set -euo pipefail
+REF=ref/Homo_sapiens_assembly38.fasta
+SAMPLE=$1
+bwa mem -t 16 -R "@RG\\tID:${SAMPLE}\\tSM:${SAMPLE}\\tPL:ILLUMINA" $REF fastq/${SAMPLE}_R1.fq.gz fastq/${SAMPLE}_R2.fq.gz \\
+  | samtools sort -@ 8 -o bam/${SAMPLE}.sorted.bam -
+samtools index bam/${SAMPLE}.sorted.bam
+gatk MarkDuplicates -I bam/${SAMPLE}.sorted.bam -O bam/${SAMPLE}.dedup.bam -M qc/${SAMPLE}.dup_metrics.txt
+gatk BaseRecalibrator -I bam/${SAMPLE}.dedup.bam -R $REF \\
+  --known-sites ref/dbsnp_146.hg38.vcf.gz --known-sites ref/Mills_and_1000G_gold_standard.indels.hg38.vcf.gz \\
+  -O bqsr/${SAMPLE}.recal.table
+gatk ApplyBQSR -R $REF -I bam/${SAMPLE}.dedup.bam --bqsr-recal-file bqsr/${SAMPLE}.recal.table -O bam/${SAMPLE}.bqsr.bam
+gatk HaplotypeCaller -R $REF -I bam/${SAMPLE}.bqsr.bam -O gvcf/${SAMPLE}.g.vcf.gz -ERC GVCF
+'''),
+    ('Python', 'pysam 统计覆盖度', ['pysam', 'BAM', 'Python'], '''import pysam
+import numpy as np
+import pandas as pd
+
+def coverage_by_region(bam_path, bed_path, min_mapq=20):
+    bam = pysam.AlignmentFile(bam_path, "rb")
+    rows = []
+    for line in open(bed_path):
+        chrom, start, end, name = line.rstrip("\\n").split("\\t")[:4]
+        start, end = int(start), int(end)
+        depth = np.zeros(end - start, dtype=np.int32)
+        for column in bam.pileup(chrom, start, end, truncate=True, min_mapping_quality=min_mapq):
+            depth[column.reference_pos - start] = column.get_num_aligned()
+        rows.append({"region": name, "mean": depth.mean(), "pct_20x": (depth >= 20).mean() * 100})
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    df = coverage_by_region("sample.bqsr.bam", "targets.bed")
+    df.to_csv("coverage.tsv", sep="\\t", index=False)
+'''),
+]
+
+
+def _marker_table(rng, rows=40):
+    lines = ['gene\tcluster\tavg_log2FC\tpct.1\tpct.2\tp_val_adj']
+    for _ in range(rows):
+        gene = rng.choice(['CD3E', 'MS4A1', 'CD14', 'LYZ', 'NKG7', 'GNLY', 'FCGR3A', 'PPBP', 'IL7R', 'CCR7']) + f'-{rng.randint(1, 99)}'
+        lines.append(
+            f'{gene}\t{rng.randint(0, 11)}\t{rng.uniform(0.25, 6):.4f}\t{rng.random():.3f}'
+            f'\t{rng.random():.3f}\t{rng.uniform(1e-300, 1e-5):.3e}'
+        )
+    return '\n'.join(lines)
+
+
+def sample_code_page(n=20, content_repeat=2, seed=42):
+    """构造 n 条代码（未入库），content 重复 content_repeat 次模拟较长脚本"""
+    rng = random.Random(seed)
+    author = User(id=1, username='bioinfo_lab', email='lab@example.com')
+    now = datetime(2024, 5, 1, 8, 0, 0)
+    codes = []
+    for i in range(n):
+        language, title, tags, content = SNIPPETS[i % len(SNIPPETS)]
+        code = Code(
+            id=i + 1,
+            title=f'{title} #{i + 1}',
+            description=f'{title}：包含质控、标准化、降维与可视化步骤，可直接用于公开数据集复现。',
+            content=content * content_repeat,
+            language=language,
+            category_id=1,
+            author_id=author.id,
+            environment=f'{language} 4.3 / conda env bioinfo-2024',
+            license='MIT',
+            status='approved',
+            views=100 + i,
+            likes=i,
+            downloads=i * 2,
+            comment_count=i % 4,
+            favorite_count=i % 7,
+            created_at=now - timedelta(hours=i),
+            updated_at=now - timedelta(hours=i),
+        )
+        code.author = author
+        code.category = Category(id=1, name='单细胞测序', description='scRNA-seq 分析流程', code_count=n, created_at=now, updated_at=now)
+        code.tags = [Tag(id=j + 1, name=name) for j, name in enumerate(tags)]
+        code.results = [Result(
+            id=i + 1, code_id=i + 1, type='text', created_at=now,
+            content=_marker_table(rng),
+            description='各聚类的差异基因',
+        )]
+        codes.append(code)
+    return {
+        'codes': [code.to_dict() for code in codes],
+        'total': n * 10,
+        'pages': 10,
+        'current_page': 1,
+        'per_page': n,
+    }
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def run_benchmark(page, repeat=200):
+    """返回 [(项目, 每次耗时 ms, 字节数)]"""
+    rows = []
+    # 对照：Flask-RESTful 默认的 json.dumps（ensure_ascii=True，中文转义为 \uXXXX）
+    ms, body = _timed(lambda: json.dumps(page).encode('utf-8'), repeat)
+    rows.append(('encode flask-restful default', ms, len(body)))
+    for name, dumps in ENCODERS.items():
+        ms, body = _timed(lambda: dumps(page), repeat)
+        rows.append((f'encode {name}', ms, len(body)))
+    encoded = ENCODERS[get_encoder()[0]](page)
+    for encoding in available_encodings():
+        ms, body = _timed(lambda: compress(encoded, encoding), max(repeat // 4, 1))
+        rows.append((f'compress {encoding}', ms, len(body)))
+    return rows
@@ -0,0 +1,92 @@
+"""
+SQL 查询预算与 N+1 检测（开发/测试环境）
+- 记录每个请求执行的 SQL 语句，按“语句形状”（折叠 IN 列表与空白）分组
+- 同一形状重复达到 QUERY_N1_THRESHOLD 次时记录 N+1 警告
+- @query_budget(n) 声明资源方法的查询上限：超出时记录警告；
+  TESTING 或 QUERY_BUDGET_STRICT=1 时抛出 QueryBudgetExceeded，让测试直接失败
+
+启用条件：app.debug / app.testing，或 QUERY_DEBUG=1；生产环境默认关闭，几乎无开销。
+"""
+import os
+import re
+from collections import Counter
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_IN_LIST_RE = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """请求执行的 SQL 语句数超过了声明的预算"""
+
+
+def statement_shape(statement):
+    """归一化 SQL：折叠 IN (?, ?, ...) 与空白，便于识别重复执行的同一语句"""
+    shape = _IN_LIST_RE.sub('(?)', statement)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def _enabled(app):
+    return app.extensions.get('query_budget', False) or app.testing
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and _enabled(current_app):
+        g.setdefault('_query_log', []).append(statement)
+
+
+def repeated_statements(statements, threshold):
+    """返回重复次数达到阈值的语句形状 {shape: count}"""
+    counts = Counter(statement_shape(s) for s in statements)
+    return {shape: n for shape, n in counts.items() if n >= threshold}
+
+
+def _after_request(response):
+    statements = g.get('_query_log')
+    if statements is None:
+        return response
+    response.headers['X-Query-Count'] = str(len(statements))
+    threshold = int(os.getenv('QUERY_N1_THRESHOLD', 3))
+    for shape, n in repeated_statements(statements, threshold).items():
+        current_app.logger.warning(
+            f"Possible N+1 on {request.method} {request.path}: {n}x {shape[:200]}"
+        )
+    return response
+
+
+def query_budget(limit):
+    """声明资源方法最多执行 limit 条 SQL（仅统计被装饰函数执行期间的语句）"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not _enabled(current_app):
+                return f(*args, **kwargs)
+
+            log = g.setdefault('_query_log', [])
+            start = len(log)
+            result = f(*args, **kwargs)
+            executed = log[start:]
+            if len(executed) > limit:
+                message = (
+                    f"{f.__qualname__} executed {len(executed)} queries, budget is {limit}:\n"
+                    + '\n'.join(statement_shape(s)[:200] for s in executed)
+                )
+                if current_app.testing or os.getenv('QUERY_BUDGET_STRICT', '').lower() in {'1', 'true', 'yes', 'on'}:
+                    raise QueryBudgetExceeded(message)
+                current_app.logger.warning(message)
+            return result
+        decorated_function.query_budget = limit
+        return decorated_function
+    return decorator
+
+
+def init_query_budget(app):
+    """开发/测试环境启用 SQL 统计"""
+    enabled = app.debug or app.testing or os.getenv('QUERY_DEBUG', '').lower() in {'1', 'true', 'yes', 'on'}
+    app.extensions['query_budget'] = enabled
+    app.after_request(_after_request)
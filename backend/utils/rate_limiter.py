@@ -1,30 +1,113 @@
+"""
+限流
+- 存储：RATE_LIMIT_STORAGE_URI（如 redis://redis:6379/1、memory://）；未设置时使用 REDIS_URL，
+  都没有时为进程内存储。共享存储让所有 gunicorn worker / 容器共用同一份配额；
+  存储不可用时回退到进程内存储，不阻断请求。
+- 策略：batched-fixed-window，固定窗口 + 进程内令牌预留（见 BatchedFixedWindowRateLimiter）
+- 资源通过 decorators.rate_limit('<分级>') 声明 RATE_LIMITS 中的分级，同级接口共享配额
+"""
+import os
+import threading
+import time
+
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask import request
+from limits.strategies import STRATEGIES, FixedWindowRateLimiter
+
+# 每次向共享存储预留的最大配额数；1 表示逐次同步
+RATE_LIMIT_BATCH_SIZE = int(os.getenv('RATE_LIMIT_BATCH_SIZE', 10))
+# 预留量不超过限额的 1/LEASE_DIVISOR，小限额（如 10 per minute）逐次同步以保持精确
+LEASE_DIVISOR = 20
+MAX_LEASES = 10000
+
+
+class BatchedFixedWindowRateLimiter(FixedWindowRateLimiter):
+    """
+    固定窗口 + 进程内令牌预留：
+    worker 每次用一条 INCRBY 从共享存储预留一批配额，在本地扣减，用完后再同步。
+    代价：窗口结束时未用完的预留作废，最坏情况下可用配额少 worker 数 × (预留量 - 1)。
+    """
+    def __init__(self, storage):
+        super().__init__(storage)
+        self._leases = {}  # key -> [剩余预留配额, 窗口结束时间, 全局配额是否已耗尽]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def lease_size(item):
+        return max(1, min(RATE_LIMIT_BATCH_SIZE, item.amount // LEASE_DIVISOR))
+
+    def hit(self, item, *identifiers, cost=1):
+        lease_size = self.lease_size(item)
+        if lease_size <= cost:
+            return super().hit(item, *identifiers, cost=cost)
+
+        key = item.key_for(*identifiers)
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > now:
+                if lease[0] >= cost:
+                    lease[0] -= cost
+                    return True
+                if lease[2]:
+                    # 本窗口的全局配额已耗尽，窗口结束前不再访问共享存储
+                    return False
+
+        count = self.storage.incr(key, item.get_expiry(), amount=lease_size)
+        granted = min(lease_size, item.amount - (count - lease_size))
+        window_end = self.storage.get_expiry(key)
+        exhausted = count >= item.amount
+        with self._lock:
+            if len(self._leases) >= MAX_LEASES:
+                self._leases = {k: v for k, v in self._leases.items() if v[1] > now}
+            remaining = max(granted, 0)
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] == window_end:
+                remaining += lease[0]
+            allowed = remaining >= cost
+            self._leases[key] = [remaining - cost if allowed else remaining, window_end, exhausted]
+        return allowed
+
+    def clear(self, item, *identifiers):
+        with self._lock:
+            self._leases.pop(item.key_for(*identifiers), None)
+        super().clear(item, *identifiers)
+
+
+STRATEGIES['batched-fixed-window'] = BatchedFixedWindowRateLimiter
+
 
 def get_user_id():
     """获取用户ID用于限流，未登录用户使用IP"""
-    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
-    try:
-        verify_jwt_in_request(optional=True)
-        user_id = get_jwt_identity()
-        return f"user_{user_id}" if user_id else get_remote_address()
-    except Exception:
-        return get_remote_address()
+    from utils.identity import current_user_id
+    user_id = current_user_id()
+    return f"user_{user_id}" if user_id else get_remote_address()
+
+
+def get_storage_uri():
+    return os.getenv('RATE_LIMIT_STORAGE_URI') or os.getenv('REDIS_URL') or 'memory://'
+
+
+limiter = Limiter(
+    key_func=get_user_id,
+    default_limits=["1000 per hour"],  # 默认每小时1000次请求
+    strategy='batched-fixed-window',
+    in_memory_fallback_enabled=True,
+    swallow_errors=True,
+)
+
 
 def create_limiter(app):
-    """创建限流器"""
-    return Limiter(
-        app=app,
-        key_func=get_user_id,
-        default_limits=["1000 per hour"],  # 默认每小时1000次请求
-        storage_uri="memory://"  # 使用内存存储，生产环境可用Redis
-    )
+    """初始化限流器（共享存储见模块说明）"""
+    app.config.setdefault('RATELIMIT_STORAGE_URI', get_storage_uri())
+    limiter.init_app(app)
+    return limiter
 
 # 预定义限流规则
 RATE_LIMITS = {
     'auth': "10 per minute",      # 登录注册限制
     'upload': "20 per minute",    # 上传限制
     'search': "100 per minute",   # 搜索限制
+    'export': "10 per minute",    # 批量导出限制
     'api': "200 per minute"       # 一般API限制
 }
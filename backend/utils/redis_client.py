@@ -0,0 +1,30 @@
+"""
+共享 Redis 客户端（缓存、浏览量缓冲、限流等共用）
+- 由 REDIS_URL 配置；未配置或连接失败时返回 None，调用方回退到进程内实现
+"""
+import os
+
+_client = None
+_resolved = False
+
+
+def get_redis_client(logger=None):
+    """返回可用的 Redis 客户端；不可用时返回 None（结果在进程内缓存）"""
+    global _client, _resolved
+    if _resolved:
+        return _client
+
+    _resolved = True
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        return None
+    try:
+        import redis
+        client = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        client.ping()
+        _client = client
+    except Exception as e:
+        if logger:
+            logger.warning(f"Redis unavailable at {redis_url}: {e}")
+        _client = None
+    return _client
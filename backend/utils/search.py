@@ -0,0 +1,259 @@
+"""
+代码全文检索
+- SQLite：FTS5 虚拟表 codes_fts（rowid 即 codes.id），由 ORM 事件同步
+- MySQL：codes(title, description) 上的 FULLTEXT 索引（ngram 解析器），由数据库自动维护
+- 其他数据库或索引不可用时回退到 LIKE 匹配
+
+中文分词：CJK 连续字符切分为重叠二元组（bigram），与 MySQL ngram_token_size=2 的行为一致；
+英文/数字按单词切分并转小写。
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import Float, Integer, event, inspect as sa_inspect, or_, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from models import db
+from models.code import Code
+
+FTS_TABLE = 'codes_fts'
+MYSQL_FULLTEXT_INDEX = 'ft_codes_title_description'
+
+# bm25 列权重：标题命中比描述命中更重要
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_CJK_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_WORD_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9_]+')
+
+# 已确认 FTS 可用的 engine url，避免每次请求都查询 sqlite_master；
+# 只缓存可用结果，search-reindex 建表后无需重启即可切换到 FTS
+_fts_ready = {}
+
+
+def tokenize(value):
+    """将文本切分为检索词：CJK 按二元组，英文数字按单词"""
+    tokens = []
+    for word in _WORD_RE.findall(value or ''):
+        if _CJK_RE.fullmatch(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def _dialect(bind):
+    return bind.dialect.name
+
+
+def _fts_available(bind):
+    key = str(bind.engine.url)
+    if key not in _fts_ready:
+        row = bind.execute(
+            text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
+            {'name': FTS_TABLE},
+        ).first()
+        if row is None:
+            return False
+        _fts_ready[key] = True
+    return True
+
+
+def _is_single_cjk(term):
+    return len(term) == 1 and _CJK_RE.fullmatch(term) is not None
+
+
+def _build_fts_query(keyword):
+    """
+    构造 FTS5 MATCH 表达式：所有词都必须出现，最后一个词允许前缀匹配。
+    返回 (表达式, 单字词)：单个 CJK 字在索引中只作为二元组的一部分出现，无法用 MATCH 命中，交给 LIKE。
+    """
+    tokens = tokenize(keyword)
+    singles = [t for t in tokens if _is_single_cjk(t)]
+    tokens = [t for t in tokens if not _is_single_cjk(t)]
+    if not tokens:
+        return None, singles
+    quoted = ['"%s"' % t.replace('"', '""') for t in tokens]
+    quoted[-1] += '*'
+    return ' AND '.join(quoted), singles
+
+
+def _build_mysql_query(keyword):
+    """
+    构造 MySQL BOOLEAN MODE 表达式：每个空白分隔的词按短语必须出现。
+    返回 (表达式, 单字词)：单个 CJK 字短于 ngram_token_size，交给 LIKE。
+    """
+    terms = [t.replace('"', '') for t in keyword.split()]
+    singles = [t for t in terms if _is_single_cjk(t)]
+    against = ' '.join('+"%s"' % t for t in terms if t and not _is_single_cjk(t))
+    return against, singles
+
+
+def _like_filter(query, keyword):
+    """回退方案：标题/描述 LIKE 匹配"""
+    pattern = f"%{keyword}%"
+    return query.filter(or_(Code.title.like(pattern), Code.description.like(pattern)))
+
+
+def _like_terms(query, terms):
+    """每个词都必须出现在标题或描述中"""
+    for term in terms:
+        query = _like_filter(query, term)
+    return query
+
+
+def search_codes(query, keyword, order_by_relevance=False):
+    """
+    为 Code 查询追加关键词检索条件。
+    order_by_relevance=True 时先按相关度排序（调用方可继续追加 order_by 作为次级排序）。
+    """
+    keyword = (keyword or '').strip()
+    if not keyword:
+        return query
+
+    bind = db.session.connection()
+    dialect = _dialect(bind)
+
+    # 单字关键词无法命中二元组索引，直接走 LIKE；混合查询中的单个 CJK 字逐个追加 LIKE 条件
+    if dialect == 'sqlite' and len(keyword) >= 2 and _fts_available(bind):
+        match_expr, singles = _build_fts_query(keyword)
+        if match_expr:
+            fts = (
+                text(
+                    f"SELECT rowid AS code_id, bm25({FTS_TABLE}, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}) AS score "
+                    f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_query"
+                )
+                .bindparams(fts_query=match_expr)
+                .columns(code_id=Integer, score=Float)
+                .subquery('fts')
+            )
+            query = _like_terms(query.join(fts, fts.c.code_id == Code.id), singles)
+            if order_by_relevance:
+                # bm25 越小越相关
+                query = query.order_by(fts.c.score.asc())
+            return query
+
+    if dialect == 'mysql' and len(keyword) >= 2:
+        against, singles = _build_mysql_query(keyword)
+        if against:
+            score = mysql_match(Code.title, Code.description, against=against).in_boolean_mode()
+            query = _like_terms(query.filter(score > 0), singles)
+            if order_by_relevance:
+                query = query.order_by(score.desc())
+            return query
+
+    return _like_filter(query, keyword)
+
+
+#############################
+# 索引维护
+#############################
+
+def _fts_row(code):
+    return {
+        'id': code.id,
+        'title': ' '.join(tokenize(code.title)),
+        'description': ' '.join(tokenize(code.description)),
+    }
+
+
+def _upsert_fts(connection, code):
+    connection.execute(
+        text(f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, description) VALUES (:id, :title, :description)"),
+        _fts_row(code),
+    )
+
+
+def index_codes(connection, codes):
+    """批量写入/更新 FTS 索引（供批量导入等绕过 ORM 事件的路径使用）"""
+    if _dialect(connection) != 'sqlite' or not _fts_available(connection):
+        return
+    rows = [_fts_row(code) for code in codes]
+    if rows:
+        connection.execute(
+            text(f"INSERT OR REPLACE INTO {FTS_TABLE} (rowid, title, description) VALUES (:id, :title, :description)"),
+            rows,
+        )
+
+
+@event.listens_for(Code, 'after_insert')
+def _code_inserted(mapper, connection, target):
+    if _dialect(connection) == 'sqlite' and _fts_available(connection):
+        _upsert_fts(connection, target)
+
+
+@event.listens_for(Code, 'after_update')
+def _code_updated(mapper, connection, target):
+    if _dialect(connection) != 'sqlite' or not _fts_available(connection):
+        return
+    state = sa_inspect(target)
+    # views/status 等字段变化不需要重建索引
+    if state.attrs.title.history.has_changes() or state.attrs.description.history.has_changes():
+        _upsert_fts(connection, target)
+
+
+@event.listens_for(Code, 'after_delete')
+def _code_deleted(mapper, connection, target):
+    if _dialect(connection) == 'sqlite' and _fts_available(connection):
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': target.id})
+
+
+def rebuild_search_index(connection, batch_size=500):
+    """全量重建 FTS 索引，返回写入条数"""
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    total = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text("SELECT id, title, description FROM codes WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {'last_id': last_id, 'limit': batch_size},
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            text(f"INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (:id, :title, :description)"),
+            [_fts_row(row) for row in rows],
+        )
+        total += len(rows)
+        last_id = rows[-1].id
+    return total
+
+
+def ensure_search_index(connection):
+    """创建全文索引（幂等）；SQLite 新建 FTS 表时顺带回填已有数据"""
+    dialect = _dialect(connection)
+    if dialect == 'sqlite':
+        exists = connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
+            {'name': FTS_TABLE},
+        ).first()
+        if not exists:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(title, description, tokenize='unicode61')"
+            ))
+            rebuild_search_index(connection)
+        _fts_ready[str(connection.engine.url)] = True
+    elif dialect == 'mysql':
+        exists = connection.execute(
+            text(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'codes' AND index_name = :name"
+            ),
+            {'name': MYSQL_FULLTEXT_INDEX},
+        ).first()
+        if not exists:
+            connection.execute(text(
+                f"ALTER TABLE codes ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} (title, description) WITH PARSER ngram"
+            ))
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    # db.create_all() 之后自动建立全文索引
+    try:
+        ensure_search_index(connection)
+    except Exception:
+        current_app.logger.exception('Failed to create full-text search index')
@@ -0,0 +1,65 @@
+"""
+JSON 序列化（Flask-RESTful 的 application/json 表示）
+- JSON_ENCODER=auto（默认）：安装了 orjson 时使用 orjson，否则使用标准库 json
+- JSON_ENCODER=orjson / json：强制指定；指定的实现不可用时回退标准库并记录警告
+- 均使用紧凑分隔符，debug 模式下缩进；orjson 以 UTF-8 直出中文，
+  标准库保持 ensure_ascii（转义为 \\uXXXX，比 ensure_ascii=False 更快）
+- 无法直接序列化的值（Decimal 等）按 str() 输出
+"""
+import json
+import os
+
+from flask import current_app, make_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def dumps_json(data, indent=False) -> bytes:
+    """标准库实现"""
+    if indent:
+        return json.dumps(data, indent=4, default=str).encode('utf-8')
+    return json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def dumps_orjson(data, indent=False) -> bytes:
+    """orjson 实现（比标准库快数倍，直接输出 bytes）"""
+    option = orjson.OPT_NON_STR_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(data, default=str, option=option)
+
+
+ENCODERS = {'json': dumps_json}
+if orjson is not None:
+    ENCODERS['orjson'] = dumps_orjson
+
+
+def get_encoder(name=None, logger=None):
+    """返回 (实现名, dumps 函数)"""
+    name = (name or os.getenv('JSON_ENCODER', 'auto')).lower()
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in ENCODERS else 'json'
+    if name not in ENCODERS:
+        if logger:
+            logger.warning(f"JSON encoder '{name}' unavailable, falling back to json")
+        name = 'json'
+    return name, ENCODERS[name]
+
+
+def output_json(data, code, headers=None):
+    """替换 Flask-RESTful 默认的 application/json 表示"""
+    dumps = current_app.extensions['json_encoder'][1]
+    resp = make_response(dumps(data, indent=current_app.debug) + b'\n', code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = 'application/json'
+    return resp
+
+
+def init_json(app, api):
+    """为 Api 注册 JSON 表示"""
+    app.extensions['json_encoder'] = get_encoder(logger=app.logger)
+    api.representations['application/json'] = output_json
+    return app.extensions['json_encoder'][0]
@@ -0,0 +1,80 @@
+"""
+系统资源后台采样
+健康检查不再在请求线程里调用 psutil.cpu_percent(interval=1) 阻塞 1 秒，
+而是由后台线程定时刷新 CPU/内存/磁盘信息，请求直接读取最近一次快照。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import psutil
+
+
+class SystemSampler:
+    """定时采样系统信息（gunicorn fork 后按 pid 懒启动线程）"""
+    def __init__(self, interval=15):
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+
+    def snapshot(self):
+        """返回最近一次采样结果；首次调用时同步做一次非阻塞采样"""
+        self._ensure_thread()
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._sample()
+        return snapshot
+
+    def _sample(self):
+        try:
+            # interval=None：返回与上次调用之间的 CPU 使用率，不阻塞
+            cpu_percent = psutil.cpu_percent(interval=None)
+            memory = psutil.virtual_memory()
+            disk = psutil.disk_usage('/')
+
+            snapshot = {
+                'cpu_usage_percent': cpu_percent,
+                'memory': {
+                    'total_mb': round(memory.total / 1024 / 1024, 2),
+                    'available_mb': round(memory.available / 1024 / 1024, 2),
+                    'used_percent': memory.percent
+                },
+                'disk': {
+                    'total_gb': round(disk.total / 1024 / 1024 / 1024, 2),
+                    'free_gb': round(disk.free / 1024 / 1024 / 1024, 2),
+                    'used_percent': round((disk.used / disk.total) * 100, 2)
+                },
+                'uptime_seconds': time.time() - psutil.boot_time(),
+                'sampled_at': datetime.now().isoformat(),
+            }
+        except Exception:
+            snapshot = {
+                'error': 'Unable to retrieve system information'
+            }
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _ensure_thread(self):
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        # 并发的首批健康检查只启动一个采样线程
+        with self._thread_lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._sample()
+            time.sleep(self.interval)
+
+
+system_sampler = SystemSampler(interval=float(os.getenv('HEALTH_SAMPLE_INTERVAL', 15)))
@@ -0,0 +1,137 @@
+"""
+标签解析服务
+把标签名列表解析为 Tag 对象：一次 IN 查询取已有标签，缺失的标签用
+INSERT ... ON CONFLICT DO NOTHING（MySQL 为 INSERT IGNORE）批量写入，并发创建同名标签不会冲突。
+
+进程内维护 name -> id 缓存，TagDetail 更新/删除时失效；
+其他 worker 中的过期缓存项在取回 Tag 后按名称校验，不一致时自动重新解析。
+"""
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import db
+from models.tag import Tag
+
+MAX_CACHED_TAGS = 10000
+
+
+class TagIdCache:
+    """标签 name -> id 的进程级缓存"""
+    def __init__(self, max_size=MAX_CACHED_TAGS):
+        self.max_size = max_size
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, names):
+        with self._lock:
+            return {name: self._ids[name] for name in names if name in self._ids}
+
+    def update(self, mapping):
+        with self._lock:
+            if len(self._ids) + len(mapping) > self.max_size:
+                self._ids.clear()
+            self._ids.update(mapping)
+
+    def invalidate(self, *names):
+        with self._lock:
+            for name in names:
+                self._ids.pop(name, None)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+
+tag_id_cache = TagIdCache()
+
+
+def normalize_tag_names(names):
+    """去掉首尾空白、空值与重复项，保持原有顺序"""
+    result = []
+    seen = set()
+    for name in names or []:
+        if not isinstance(name, str):
+            continue
+        name = name.strip()
+        if name and name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+
+def _insert_ignore(dialect_name):
+    if dialect_name == 'sqlite':
+        return sqlite.insert(Tag).on_conflict_do_nothing(index_elements=['name'])
+    if dialect_name == 'postgresql':
+        return postgresql.insert(Tag).on_conflict_do_nothing(index_elements=['name'])
+    if dialect_name == 'mysql':
+        return mysql.insert(Tag).prefix_with('IGNORE')
+    return insert(Tag)
+
+
+def _lookup_ids(names, locking=False):
+    stmt = select(Tag.id, Tag.name).where(Tag.name.in_(names))
+    if locking:
+        # MySQL 可重复读下需要锁定读才能看到并发事务刚提交的标签
+        stmt = stmt.with_for_update(read=True)
+    return {name: tag_id for tag_id, name in db.session.execute(stmt)}
+
+
+def _resolve_ids(names):
+    ids = tag_id_cache.get_many(names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        found = _lookup_ids(missing)
+        to_create = [name for name in missing if name not in found]
+        if to_create:
+            now = datetime.utcnow()
+            dialect_name = db.session.get_bind().dialect.name
+            db.session.execute(
+                _insert_ignore(dialect_name),
+                [{'name': name, 'created_at': now} for name in to_create],
+            )
+            found.update(_lookup_ids(to_create, locking=True))
+        tag_id_cache.update(found)
+        ids.update(found)
+    return ids
+
+
+def resolve_tags(names):
+    """把标签名解析为 Tag 对象列表（不存在的自动创建），顺序与输入一致"""
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+
+    ids = _resolve_ids(names)
+    tags = {tag.id: tag for tag in Tag.query.filter(Tag.id.in_(list(ids.values()))).all()}
+
+    # 缓存过期（标签在其他进程被删除或改名）时重新解析一次
+    stale = [name for name in names if tags.get(ids[name]) is None or tags[ids[name]].name != name]
+    if stale:
+        tag_id_cache.invalidate(*stale)
+        ids.update(_resolve_ids(stale))
+        tags.update({tag.id: tag for tag in Tag.query.filter(Tag.id.in_([ids[n] for n in stale])).all()})
+
+    return [tags[ids[name]] for name in names if ids.get(name) in tags]
+
+
+def resolve_tag_ids(names):
+    """
+    把标签名解析为 {name: id}（不存在的自动创建），不加载 Tag 对象；
+    供批量导入一次解析全部标签后直接写 code_tags。
+    """
+    names = normalize_tag_names(names)
+    if not names:
+        return {}
+
+    ids = _resolve_ids(names)
+    current = dict(db.session.execute(select(Tag.id, Tag.name).where(Tag.id.in_(list(ids.values())))).all())
+
+    stale = [name for name in names if current.get(ids.get(name)) != name]
+    if stale:
+        tag_id_cache.invalidate(*stale)
+        ids.update(_resolve_ids(stale))
+    return {name: ids[name] for name in names if name in ids}
@@ -0,0 +1,216 @@
+"""
+浏览量缓冲计数
+CodeDetail.get 不再每次请求提交一次 UPDATE，而是把增量累积在内存（或 Redis 哈希）中，
+按时间间隔或累计阈值合并为一条 UPDATE codes SET views = views + CASE id ... END 批量写回。
+
+- 内存后端：每个 worker 独立累积；进程正常退出（gunicorn 优雅关闭）时 atexit 刷盘
+- Redis 后端：所有 worker 写入同一个哈希，刷盘时 RENAME 取走快照，保证每个增量只写回一次
+- 两种后端都维护待写回总数（内存计数 / Redis 计数键），记录浏览时不需要遍历全部增量
+"""
+import atexit
+import os
+import threading
+import uuid
+
+from sqlalchemy import case, update
+
+from models import db
+from models.code import Code
+from utils.counters import keep_updated_at
+from utils.redis_client import get_redis_client
+
+
+class MemoryViewBuffer:
+    """进程内增量缓冲"""
+    def __init__(self):
+        self._pending = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def add(self, code_id, n=1):
+        """累加增量，返回待写回总数"""
+        with self._lock:
+            self._pending[code_id] = self._pending.get(code_id, 0) + n
+            self._total += n
+            return self._total
+
+    def pending_for(self, code_id):
+        with self._lock:
+            return self._pending.get(code_id, 0)
+
+    def pending(self):
+        with self._lock:
+            return self._total
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._total = 0
+            return pending
+
+    def restore(self, counts):
+        """写回失败时把增量放回缓冲"""
+        with self._lock:
+            for code_id, n in counts.items():
+                self._pending[code_id] = self._pending.get(code_id, 0) + n
+                self._total += n
+
+
+class RedisViewBuffer:
+    """
+    Redis 哈希增量缓冲（多 worker 共享）
+    <key>:total 记录待写回总数：HINCRBY 与 INCRBY 在同一个 MULTI 中执行，取走快照后 DECRBY 扣除
+    """
+    def __init__(self, client, key='views:pending'):
+        self._client = client
+        self._key = key
+        self._total_key = f"{key}:total"
+
+    def add(self, code_id, n=1):
+        """累加增量，返回待写回总数"""
+        pipe = self._client.pipeline()
+        pipe.hincrby(self._key, code_id, n)
+        pipe.incrby(self._total_key, n)
+        _, total = pipe.execute()
+        return total
+
+    def pending_for(self, code_id):
+        return int(self._client.hget(self._key, code_id) or 0)
+
+    def pending(self):
+        return max(0, int(self._client.get(self._total_key) or 0))
+
+    def drain(self):
+        snapshot = f"{self._key}:flushing:{uuid.uuid4().hex}"
+        try:
+            # RENAME 是原子的：其他 worker 之后的 HINCRBY 会写入新的哈希
+            self._client.rename(self._key, snapshot)
+        except Exception:
+            # 键不存在（没有待写回的增量）或已被其他 worker 取走
+            return {}
+        pipe = self._client.pipeline()
+        pipe.hgetall(snapshot)
+        pipe.delete(snapshot)
+        raw, _ = pipe.execute()
+        counts = {int(k): int(v) for k, v in raw.items()}
+        self._client.decrby(self._total_key, sum(counts.values()))
+        return counts
+
+    def restore(self, counts):
+        pipe = self._client.pipeline()
+        for code_id, n in counts.items():
+            pipe.hincrby(self._key, code_id, n)
+        pipe.incrby(self._total_key, sum(counts.values()))
+        pipe.execute()
+
+
+class ViewCounter:
+    """
+    浏览量计数器
+    - flush_interval：后台线程定时写回的间隔（秒）
+    - flush_threshold：待写回增量达到该值时立即写回
+    """
+    def __init__(self, buffer, flush_interval=10, flush_threshold=100):
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.flushed_total = 0
+        self._app = None
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._thread_lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        app.extensions['view_counter'] = self
+        atexit.register(self.shutdown)
+
+    def record(self, code_id, n=1):
+        """记录一次浏览；达到阈值时同步写回"""
+        self._ensure_thread()
+        if self.buffer.add(code_id, n) >= self.flush_threshold:
+            self.flush()
+
+    def pending_for(self, code_id):
+        return self.buffer.pending_for(code_id)
+
+    def stats(self):
+        return {
+            'backend': 'redis' if isinstance(self.buffer, RedisViewBuffer) else 'memory',
+            'pending': self.buffer.pending(),
+            'flushed_total': self.flushed_total,
+        }
+
+    def flush(self):
+        """把缓冲的增量合并为一条 UPDATE 写回，返回写回的增量总数"""
+        with self._flush_lock:
+            counts = self.buffer.drain()
+            if not counts:
+                return 0
+            try:
+                with self._app.app_context():
+                    db.session.execute(
+                        update(Code)
+                        .where(Code.id.in_(list(counts)))
+                        .values(
+                            views=Code.views + case(counts, value=Code.id, else_=0),
+                            # 浏览量不是内容修改，保留 updated_at（否则详情 ETag 失效）
+                            **keep_updated_at(Code.__table__),
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+            except Exception:
+                self.buffer.restore(counts)
+                self._app.logger.exception('Failed to flush view counts')
+                return 0
+            total = sum(counts.values())
+            self.flushed_total += total
+            return total
+
+    def shutdown(self):
+        """停止后台线程并写回剩余增量（进程退出时调用）"""
+        self._stop.set()
+        if self._app is not None:
+            self.flush()
+
+    def _ensure_thread(self):
+        # gunicorn fork 之后线程不会继承，按 pid 懒启动
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        # 并发的首批请求只启动一个线程
+        with self._thread_lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='view-counter-flush', daemon=True)
+            self._thread.start()
+            self._thread_pid = os.getpid()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+def init_view_counter(app, client=None):
+    """
+    初始化浏览量计数器：
+    - VIEW_COUNTER_BACKEND=memory 强制进程内缓冲；默认 REDIS_URL 可用时使用 Redis
+    - VIEW_FLUSH_INTERVAL / VIEW_FLUSH_THRESHOLD 控制写回频率
+    """
+    if client is None and os.getenv('VIEW_COUNTER_BACKEND', '').lower() != 'memory':
+        client = get_redis_client(app.logger)
+    buffer = RedisViewBuffer(client) if client is not None else MemoryViewBuffer()
+    counter = ViewCounter(
+        buffer,
+        flush_interval=float(os.getenv('VIEW_FLUSH_INTERVAL', 10)),
+        flush_threshold=int(os.getenv('VIEW_FLUSH_THRESHOLD', 100)),
+    )
+    counter.init_app(app)
+    return counter
+
+
+def get_view_counter():
+    from flask import current_app
+    return current_app.extensions['view_counter']
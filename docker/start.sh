@@ -28,6 +28,10 @@ fi
 # 创建必要目录
 mkdir -p /app/backend/instance /app/backend/logs
 
+# Prometheus 多进程指标目录：每次启动清空，避免残留上次运行的计数
+rm -rf /tmp/prometheus_multiproc
+mkdir -p /tmp/prometheus_multiproc
+
 # 初始化数据库
 cd /app/backend
 echo "[INFO] 初始化数据库..."
@@ -83,28 +87,9 @@ with app.app_context():
         print(f'    [WARNING] 请登录后立即修改默认密码！')
 "
 
-# 执行数据库索引优化（如果存在）
-if [ -f "/app/backend/migrations/add_search_indexes.sql" ]; then
-    echo "[INFO] 执行数据库索引优化..."
-    python -c "
-import sqlite3
-import os
-from app import app
-
-with app.app_context():
-    db_uri = app.config['SQLALCHEMY_DATABASE_URI']
-    if db_uri.startswith('sqlite'):
-        db_path = db_uri.replace('sqlite:///', '')
-        if os.path.exists(db_path):
-            conn = sqlite3.connect(db_path)
-            with open('migrations/add_search_indexes.sql', 'r') as f:
-                conn.executescript(f.read())
-            conn.close()
-            print('索引优化完成')
-    else:
-        print('跳过SQLite索引优化（使用外部数据库）')
-"
-fi
+# 执行数据库迁移（补齐计数列与热点查询索引，已执行的版本自动跳过）
+echo "[INFO] 执行数据库迁移..."
+FLASK_APP=app.py flask db-upgrade
 
 echo "[OK] 应用初始化完成"
 
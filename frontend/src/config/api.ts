@@ -25,6 +25,8 @@ export const API_CONFIG = {
     codes: '/api/codes',
     codeDetail: (id: number) => `/api/codes/${id}`,
     codeComments: (id: number) => `/api/codes/${id}/comments`,
+    // 批量导出 ZIP（服务器流式生成；ids=1,2,3 或列表筛选参数）
+    codeExport: '/api/codes/export',
     
     // 用户
     userCodes: '/api/user/codes',
@@ -49,6 +51,9 @@ export const API_CONFIG = {
     adminUserDetail: (id: number) => `/api/admin/users/${id}`,
     adminCodeReview: (id: number) => `/api/admin/codes/${id}/review`,
     adminCommentDetail: (id: number) => `/api/admin/comments/${id}`,
+    
+    // 图片上传（返回 /api/blobs/<sha256>.<ext>）
+    uploadImage: '/api/uploads/images',
   }
 }
 
@@ -56,3 +61,8 @@ export const API_CONFIG = {
 export const buildApiUrl = (endpoint: string): string => {
   return `${API_CONFIG.baseURL}${endpoint}`
 }
+
+// 内容中保存的是 /api/blobs/... 相对地址，开发环境前后端不同源时补全为 API 地址
+export const resolveAssetUrl = (url: string): string => {
+  return url?.startsWith('/api/') ? buildApiUrl(url) : url
+}
@@ -6,6 +6,8 @@
 import { downloadFile } from './ui-helpers'
 import JSZip from 'jszip'
 import { ElMessage } from 'element-plus'
+import http from './http'
+import { API_CONFIG } from '../config/api'
 
 // 编程语言文件扩展名映射
 const LANGUAGE_EXTENSIONS: Record<string, string> = {
@@ -214,6 +216,42 @@ export async function exportMultipleCodes(
   }
 }
 
+/**
+ * 服务器端打包导出（含运行环境与效果展示）
+ * 由 GET /api/codes/export 流式生成 ZIP，浏览器无需先下载每个代码的完整 JSON
+ */
+export async function exportCodesArchive(
+  ids: number[],
+  zipFilename: string = 'codes_export'
+): Promise<void> {
+  if (ids.length === 0) {
+    ElMessage.warning('没有可导出的代码')
+    return
+  }
+
+  try {
+    const response = await http.get(API_CONFIG.endpoints.codeExport, {
+      params: { ids: ids.join(',') },
+      responseType: 'blob',
+      timeout: 0,
+    })
+    const zipUrl = URL.createObjectURL(response.data)
+
+    const link = document.createElement('a')
+    link.href = zipUrl
+    link.download = `${sanitizeFilename(zipFilename)}_${new Date().toISOString().split('T')[0]}.zip`
+    document.body.appendChild(link)
+    link.click()
+    document.body.removeChild(link)
+
+    URL.revokeObjectURL(zipUrl)
+    ElMessage.success(`成功导出 ${ids.length} 个代码`)
+  } catch (error) {
+    console.error('打包导出失败:', error)
+    ElMessage.error('打包导出失败，请重试')
+  }
+}
+
 /**
  * 生成源码格式内容
  */
@@ -146,6 +146,7 @@ async function uploadImage(file: File, uploadEndpoint: string): Promise<string>
     }
     
     const result = await response.json()
+    // 返回相对地址（/api/blobs/...），保存到内容中不依赖部署域名
     return result.url || result.data?.url
   } catch (error) {
     console.error('图片上传失败:', error)
@@ -13,6 +13,7 @@
  */
 
 import { marked } from 'marked'
+import { resolveAssetUrl } from '../config/api'
 import hljs from 'highlight.js'
 import 'highlight.js/styles/vs.css'
 
@@ -82,6 +83,11 @@ renderer.link = function(href: string, title: string, text: string) {
   return `<a href="${href}"${title ? ` title="${title}"` : ''}${target} class="markdown-link">${text}${icon}</a>`
 }
 
+// 图片：/api/blobs/ 短 URL 补全为 API 地址，懒加载
+renderer.image = function(href: string, title: string | null, text: string) {
+  return `<img src="${resolveAssetUrl(href)}" alt="${text}"${title ? ` title="${title}"` : ''} loading="lazy">`
+}
+
 // 任务列表支持
 renderer.listitem = function(text: string, task?: boolean, checked?: boolean) {
   if (task) {